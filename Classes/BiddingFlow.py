@@ -5,7 +5,7 @@ class BiddingFlow:
     """
     Handles the flow of steps to player bids
     """
-    def __init__(self, player_queue: list[Player]):
+    def __init__(self, player_queue: list[Player], advisor=None):
         
         self.context = {
             "": [],
@@ -13,6 +13,7 @@ class BiddingFlow:
         
         self.stepManager = StepManager()
         self.player_queue = player_queue
+        self.advisor = advisor
     
     def run(self, round_no: int, max_cards: int,
             players: list[Player], 
@@ -90,7 +91,12 @@ class BiddingFlow:
             int: Legal bid made by player
         """
 
-        while True:
+        # search in the background while the prompt waits for input
+        if self.advisor:
+            self.advisor.advise_bid(player, forbidden_bid)
+
+        try:
+            while True:
                 clear_screen()
                 print(
 f"""Round {round_no}: {max_cards} cards per hand""")
@@ -102,8 +108,12 @@ f"""Round {round_no}: {max_cards} cards per hand""")
                         "trump_suit": trump_suit,
                         "current_bids": bidding_manager.current_bids,
                         "forbidden_bid": forbidden_bid,
-                        "max_cards": max_cards},
+                        "max_cards": max_cards,
+                        "advisor": self.advisor},
                     validate_args={"forbidden_bid" : forbidden_bid}
                     )
                 
-                return result
\ No newline at end of file
+                return result
+        finally:
+            if self.advisor:
+                self.advisor.cancel()
\ No newline at end of file
@@ -5,6 +5,19 @@ from typing import List
 from Utils.tools import clear_screen
 
 
+def banned_bid(bids, max_cards: int) -> int:
+    """
+    Returns the bid the last bidder may not make, so the bids cannot add
+    up to max_cards, or -1 if the bids placed already exceed it
+
+    Args:
+        bids (iterable): Bids placed so far this round
+        max_cards (int): Cards dealt to each player this round
+    """
+    banned_number = max_cards - sum(bids)
+    return banned_number if banned_number > -1 else -1
+
+
 class BiddingManager:
     """
     Manages the rules and context of the bidding logic for players
@@ -59,9 +72,8 @@ class BiddingManager:
         Function for calculating the banned number the player is unable to bid this round
         """
 
-        total_bids = sum(int(bid) for bid in self.current_bids.values() if bid != 'X')
-        banned_number = max_cards - total_bids 
-        return banned_number if banned_number > -1 else -1
+        return banned_bid((int(bid) for bid in self.current_bids.values() if bid != 'X'),
+                          max_cards)
 
 
     def get_round_difference(self, max_cards: int) -> int:
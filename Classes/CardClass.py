@@ -1,4 +1,5 @@
 # Class script for the cards in the deck
+from Utils import bitboard
 
 class Card:
 
@@ -13,13 +14,20 @@ class Card:
         suit (tuple): The suit of the card, e.g., ("Heart", "♥").
         value (tuple): The value of the card, e.g., ("10", 10) or ("Ace", 14).
         owner (Player, optional): The owner of the card.
+        card_id (int): Compact id of the card (0-51) used by the simulation code,
+            None if the card is not part of a standard deck.
+        mask (int): Single bit mask of the card, 0 if it has no id.
+
+    Cards are slotted and their initials, id, mask and hash are computed once
+    when they are created, as the simulations compare and hash cards often.
 
     Methods:
         generate_picture():
             Generates and returns an ASCII representation of the card.
 
         __eq__(other):
-            Checks equality between two Card objects based on suit and value.
+            Checks equality between two Card objects based on their id,
+            or their initials if either has none.
 
         __str__():
             Returns a string representation of the card (e.g., "10 Heart").
@@ -28,14 +36,20 @@ class Card:
             Returns a hash value for the card, allowing it to be used in sets and dictionaries.
     """
 
+    __slots__ = ("suit", "value", "owner", "initials", "card_id", "mask", "_hash")
+
     def __init__(self, suit: tuple, value: tuple, owner: 'Player' = None): # Forward reference to avoid nameError
         self.suit = suit
         self.value = value
         self.owner = owner
-        self.initials = "".join([
-            self.value[0],
-            self.suit[0][0].upper(),
-        ])
+        self.initials = value[0] + suit[0][0].upper()
+        self.card_id = bitboard.card_to_id(suit, value)
+        if self.card_id is None:
+            self.mask = 0
+            self._hash = hash(self.initials)
+        else:
+            self.mask = bitboard.CARD_MASKS[self.card_id]
+            self._hash = hash(self.card_id)
 
     @classmethod
     def from_initials(cls, initials: str):
@@ -52,8 +66,16 @@ class Card:
         suit_part = initials[-1].upper()  # suit part is the last character
 
         return value_part, suit_part
-    
-    
+
+    @classmethod
+    def from_id(cls, card_id: int, owner: 'Player' = None):
+        """
+        Creates the card with the given compact id (0-51)
+        """
+        return cls(bitboard.SUITS[bitboard.suit_of(card_id)],
+                   bitboard.VALUES[card_id % bitboard.RANKS],
+                   owner)
+
     def to_initials(self) -> str:
         """Returns initials form for card"""
         return f"{self.value[0]}{self.suit[0][0]}"
@@ -61,10 +83,14 @@ class Card:
 
 
     def __eq__(self, other):
-        return self.initials == other.initials
+        if not isinstance(other, Card):
+            return NotImplemented
+        if self.card_id is None or other.card_id is None:
+            return self.initials == other.initials
+        return self.card_id == other.card_id
     
     def __str__(self):
         return f"{self.value[0]} {self.suit[1]}"
     
     def __hash__(self):
-        return hash(str(self))
\ No newline at end of file
+        return self._hash
@@ -1,5 +1,6 @@
 #Classes script for the Card deck
 from .CardClass import Card
+from Utils import bitboard
 import random
 
 class Deck:
@@ -9,21 +10,33 @@ class Deck:
     It acts as more of a deck manager, as opposed to a deck itself
     This class is responsible for managing card objects in it
 
+    The 52 Card objects are created once, when the deck is, and kept in a
+    table indexed by card id and by initials. Which of them are still in
+    the deck is a bit mask, so drawing, finding and removing a card take
+    constant time and resetting the deck is a single mask assignment.
+
+    Attributes:
+        cards (tuple): The deck's Card of every card id
+        mask (int): Bit mask of the cards still in the deck
+        order (list): Every card in shuffled order, the deck tuple is the
+            cards of order still in the deck
+
     Functions:
 
-    generate_deck populates the local deck list
+    generate_deck resets and shuffles the deck and returns the deck tuple
+    reset puts every card back in the deck
     generate_valid_initials returns a set of valid initials
     remove_card removes the card selected and takes the suit and value as the parameter
     draw_card_from_initials returns a card if the initials match to a card and removes the card from deck
     find_card returns boolean depending on whether the suit and value in the parameters are found
-    
+    pop removes and returns the last card of the deck tuple
+
     """
     def __init__(self):
-        
+
         self.single_value_gen = ("2","3","4","5","6","7","8","9","10","J","Q","K","A" )
         self.value_gen = set()
-        self.removed_suit_initials = set()
-        
+
         #ensures that the picture cards still have a value
         for index, item in enumerate(self.single_value_gen):
             self.value_gen.add((item,index+2))
@@ -31,61 +44,91 @@ class Deck:
         self.suit_gen = (("Diamonds","♦"), ("Spades","♠"),("Clubs","♣"),("Hearts","♥"))
         self.first_letter_suits = {
             "D" : "Diamonds",
-            "S" : "Spades", 
+            "S" : "Spades",
             "C" : "Clubs",
             "H" : "Hearts"
         }
-        self.deck = self.generate_deck()
+
+        # the deck's cards, created once and reused every round
+        self.cards = tuple(Card.from_id(card_id) for card_id in range(bitboard.NUM_CARDS))
+        self.by_initials = {card.initials: card for card in self.cards}
+        self.by_name = {(card.suit[0].lower(), card.value[0].lower()): card
+                        for card in self.cards}
+        self.order = list(self.cards)
+        self.top = len(self.order)
+        self.mask = bitboard.FULL_MASK
+
+        self.generate_deck()
         self.valid_card_initials = self.generate_valid_card_initials()
 
         # This does not change when cards are removed from the deck
-        self.permanent_valid_card_initials = self.valid_card_initials  
-        
-    def generate_deck(self):
+        self.permanent_valid_card_initials = self.valid_card_initials
+
+    @property
+    def deck(self) -> tuple:
         """
-        Logic for iterating through both lists to create a full deck of cards.
-        Also resets the local deck list
+        The cards still in the deck, in shuffled order
+
+        A tuple, as changing it would not change the deck: cards are taken
+        out with pop, draw_card_from_initials or remove_card.
         """
-        self.deck = []
-        for value in self.value_gen:
-            for suit in self.suit_gen:
-                self.deck.append(Card(suit, value))
-        random.shuffle(self.deck) #always shuffle deck after generation
-        self.removed_suit_initials = set()
+        return tuple(card for card in self.order if self.mask & card.mask)
+
+    @deck.setter
+    def deck(self, cards: list):
+        self.order = [self.cards[card.card_id] for card in cards]
+        self.top = len(self.order)
+        self.mask = bitboard.hand_mask(self.order)
+
+    @property
+    def removed_suit_initials(self) -> set:
+        """Initials of the cards no longer in the deck"""
+        return set(bitboard.mask_to_initials(bitboard.FULL_MASK & ~self.mask))
 
+    def reset(self):
+        """Puts every card back in the deck, keeping its order"""
+        self.mask = bitboard.FULL_MASK
+        self.top = len(self.order)
+
+    def shuffle(self, rng: random.Random = random):
+        """Shuffles the order cards are listed and popped in"""
+        order = list(self.cards)
+        rng.shuffle(order)
+        self.order = order
+        self.top = len(order)
+
+    def generate_deck(self):
+        """
+        Puts every card back in the deck and shuffles it.
+        Returns the deck tuple
+        """
+        self.reset()
+        self.shuffle() #always shuffle deck after generation
         return self.deck
-    
+
     def generate_valid_card_initials(self) -> set:
         """
-        Logic for iterating through both lists to create a set of valid card initials
+        Returns the set of initials of the cards still in the deck
         """
-        valid_card_initials = set()
-        for character in self.single_value_gen:
-            for suit in self.first_letter_suits.keys():
-                valid_card_initials.add((character + suit))
-        return valid_card_initials - self.removed_suit_initials
-        
+        return set(bitboard.mask_to_initials(self.mask))
+
     def remove_card(self, card: Card):
         """
         Function for removing card from current deck
 
         Requires card instance inside of current deck
         """
-        if not card:
+        if not card or not self.mask & bitboard.CARD_MASKS[card.card_id]:
             raise ValueError("Card not found in deck")
-        
-        self.deck.remove(card)
-        self.removed_suit_initials.add(card.initials)
+        self.mask &= ~bitboard.CARD_MASKS[card.card_id]
 
     def find_card(self, selected_suit:str, selected_value:str):
         """
-        Function which returns True or False to verify 
+        Function which returns True or False to verify
         whether the card is in the current hand
         """
-        for card in self.deck:
-            if (card.suit[0].lower() == selected_suit.lower()) and (card.value[0].lower() == selected_value.lower()):
-                return True
-        return False
+        card = self.by_name.get((selected_suit.lower(), selected_value.lower()))
+        return card is not None and bool(self.mask & card.mask)
 
 
     def draw_card_from_initials(self, initials: str) -> Card | None:
@@ -96,17 +139,31 @@ class Deck:
         """
 
         value_str, suit_letter = Card.from_initials(initials)
-        
-
-        for card in self.deck:
-            if (
-                card.value[0].upper() == value_str and
-                card.suit[0][0].upper() == suit_letter
-            ):
-                self.remove_card(card)
-                self.removed_suit_initials.add(card.initials)
-                return card
-        return None
-    
+        card = self.by_initials.get(value_str + suit_letter)
+        if card is None or not self.mask & card.mask:
+            return None
+        return self._take(card)
+
+    def pop(self) -> Card:
+        """Removes and returns the last card of the deck tuple"""
+        while self.top:
+            self.top -= 1
+            card = self.order[self.top]
+            if self.mask & card.mask:
+                return self._take(card)
+        raise IndexError("pop from an empty deck")
+
+    def _take(self, card: Card) -> Card:
+        self.mask &= ~card.mask
+        # the card may have been owned in an earlier round
+        card.owner = None
+        return card
+
     def get_card(self, card:Card) -> Card | None:
-        """Returns a card if card passed is in deck"""
\ No newline at end of file
+        """Returns a card if card passed is in deck"""
+        if card is None or card.card_id is None or not self.mask & card.mask:
+            return None
+        return self.cards[card.card_id]
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
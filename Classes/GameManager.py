@@ -19,6 +19,10 @@ from .LocalCardAssignmentFlow import LocalCardAssignmentFlow
 from .IterativeTrumpFlow import IterativeTrumpFlow
 from enum import Enum
 from .CardClass import Card
+from advisor import BackgroundAdvisor
+import event_log
+from game_state import revealed_void
+from Utils import bitboard
 
 class Phase(Enum):
         PLAYER_SELECTION = "player_selection"
@@ -41,12 +45,24 @@ class Game:
         round (int): An integer value of the current round the game is in
         cards_per_round (list): A ;ist of the maximum cards per round
         phase (str): A string which indicates the current action of the game object
+        output (callable): Prints the game's messages, replaced by HeadlessGame
+        clear_screen (callable): Waits and clears the console, replaced by HeadlessGame
+        event_log (EventLog): Optional log every event of the game is written to
+        seats (dict): Seat of each player in the event log, by name
+        void_flags (dict): Suits each player has shown to be void in this
+            round, as game_state void flags, by name
     """
 
-    def __init__(self,*args, **kwargs):
+    output = print
+    clear_screen = staticmethod(clear_screen)
+
+    def __init__(self,*args, event_log: "event_log.EventLog" = None, **kwargs):
         """
         When initialised, the game object should receive the player parameters
         """
+        self.event_log = event_log
+        self.seats = None
+        self.void_flags = {}
         self.menu_options = {
             "S": "SHOW HAND",
             "B": "BID" 
@@ -69,6 +85,7 @@ class Game:
         self.trump_suit = ''
 
         self.player_queue = [] #queue for playing during rounds
+        self.advisor = BackgroundAdvisor(self)
 
         #IF SHUFFLE IS NECEESARY
         #places the shuffled players into the actual list in their new order
@@ -79,7 +96,7 @@ class Game:
     def start(self):
         self.create_game()
         self.run_game_phases()
-        clear_screen(2)    
+        self.clear_screen(2)    
 
     def create_game(self):
         """
@@ -96,7 +113,7 @@ class Game:
         self.playerStateManager = PlayerStateManager(self.player_queue)
         self.trumpManager = TrumpManager(self.UIManager)
         self.playerSetupFlow = PlayerSetupFlow()
-        self.biddingFlow = BiddingFlow(self.player_queue)
+        self.biddingFlow = BiddingFlow(self.player_queue, self.advisor)
         self.initialTrumpFlow = InitialTrumpFlow()
         self.localCardAssignmentFlow = LocalCardAssignmentFlow(
             self.deck.generate_valid_card_initials())
@@ -106,11 +123,37 @@ class Game:
         Starts the game 
         """
         while self.phase != Phase.GAME_OVER:
+                self.log_phase()
                 _phase_handler = self.phases.get(self.phase)
                 if _phase_handler:
                     _phase_handler() # function from the dictionary is performed
                 else:
                     raise ValueError(f"Unknown game phase: {self.phase}") 
+        self.log_phase()
+
+    def log_phase(self):
+        """
+        Logs the phase about to run, starting the game in the event log once
+        the players are known and ending it at GAME_OVER
+        """
+        if self.event_log is None or not self.player_queue:
+            return
+        if self.seats is None:
+            self.seats = {player.name: seat for seat, player in enumerate(self.player_queue)}
+            self.event_log.start_game(
+                [player.name for player in self.player_queue],
+                [player.opponent for player in self.player_queue],
+                self.cards_per_round)
+        self.log_event(event_log.PHASE, value=list(Phase).index(self.phase))
+        if self.phase == Phase.GAME_OVER:
+            self.event_log.end_game()
+
+    def log_event(self, kind: int, player: Player = None, value: int = 0, extra: int = 0):
+        """Writes an event to the event log, if the game has one"""
+        if self.event_log is None or self.seats is None:
+            return
+        seat = self.seats[player.name] if player else event_log.NO_SEAT
+        self.event_log.append(kind, seat, value, extra)
 
         
     def handle_player_selection(self):
@@ -149,9 +192,11 @@ class Game:
         """
         
         #initialise objects and reset
-        self.deck.deck = self.deck.generate_deck()
+        self.deck.generate_deck()
         max_cards = self.cards_per_round[self.round-1]
-        self.scoreboard = Scoreboard(self.player_queue)
+        # the total scores are kept for the whole game
+        if self.round == 1:
+            self.scoreboard = Scoreboard(self.player_queue)
         self.scoreboard.reset_round_scoreboard()
 
 
@@ -161,7 +206,7 @@ class Game:
             """
             if player.opponent:
                 for _ in range(self.cards_per_round[self.round-1]):
-                    card = self.deck.deck.pop()
+                    card = self.deck.pop()
                     player.hand.append(card)
                     player.own_hand()
                 continue
@@ -183,11 +228,12 @@ class Game:
                     # choice of initials has already been sanitised
                     chosen_card = self.deck.draw_card_from_initials(choice_of_initials)
                     if chosen_card:
+                        self.log_event(event_log.DRAW, player, chosen_card.card_id)
                         player.hand.append(chosen_card)
                         player.own_hand()
                     else:
-                        print(f"{choice_of_initials} is no longer in the deck")
-                        print(len(self.deck.deck))
+                        self.output(f"{choice_of_initials} is no longer in the deck")
+                        self.output(len(self.deck))
 
         
         if self.round == 1:
@@ -201,9 +247,9 @@ class Game:
         
         """
 
-        clear_screen(2)
+        self.clear_screen(2)
         cards =  self.cards_per_round[self.round-1]
-        print(f"ROUND {self.round} - Bidding Phase ({cards} cards per hand)\n")
+        self.output(f"ROUND {self.round} - Bidding Phase ({cards} cards per hand)\n")
 
         context = self.initialTrumpFlow.run(self.deck.valid_card_initials)
         manual_trump_generation = context['manual_trump_generation']
@@ -217,8 +263,9 @@ class Game:
         else:
             card = self.deck.draw_card_from_initials(trump_card_initials)
             if not card:
-                print("Invalid card")
+                self.output("Invalid card")
                 return
+            self.log_event(event_log.DRAW, value=card.card_id)
         
             self.trump_suit = card.suit[0]
 
@@ -226,14 +273,14 @@ class Game:
     
     def select_trump_automatically(self):
 
-        clear_screen()
+        self.clear_screen()
         trump_card = self.deck.deck[0]
         #determine trump
         #since deck is already shuffled, pick first card
         # choose the trump after cards have been assinged to players
         self.trump_suit = trump_card.suit[0]
-        print(f"Random trump card - {str(trump_card)}")
-        print("Trump suit: ", self.trump_suit)
+        self.output(f"Random trump card - {str(trump_card)}")
+        self.output("Trump suit: ", self.trump_suit)
 
         return trump_card
     
@@ -244,6 +291,8 @@ class Game:
         """
 
         self.max_cards = self.cards_per_round[self.round-1]
+        self.log_event(event_log.ROUND, value=self.round, extra=self.max_cards)
+        self.log_event(event_log.TRUMP, value=bitboard.suit_index(self.trump_suit))
         self.playerStateManager.reset_players_handicap()
 
         #dealer shifts every time bidding starts
@@ -253,6 +302,7 @@ class Game:
         self.player_queue[-1].handicapped_bid = True
         self.biddingManager.reset_bids(self.player_queue)
         self.biddingManager.update_current_bids(self.player_queue)
+        self.advisor.track_round()
 
         #starts the bidding process
         self.biddingFlow.run(
@@ -262,6 +312,9 @@ class Game:
             bidding_manager=self.biddingManager,
             trump_suit=self.trump_suit,
         )
+        for player in self.player_queue:
+            self.log_event(event_log.BID, player, player.bid)
+            self.advisor.observe_bid(player)
 
         self.phase = Phase.PLAYING
 
@@ -271,6 +324,8 @@ class Game:
         """
         cards = self.cards_per_round[self.round-1]
         self.scoreboard.reset_round_scoreboard()
+        self.advisor.new_round()
+        self.void_flags = {}
 
         for _ in range(cards):
             self.start_round()
@@ -296,23 +351,22 @@ class Game:
         """
         Scoring logic
         """
-        if self.round < 6:
+        #display total scoreboard
+        self.scoreboard.update_total_scoreboard(
+            player_list=self.player_queue,
+            max_cards=self.max_cards
+            )
+        self.clear_screen(5)
+        self.output("Total score: ",(self.scoreboard.display(round=False)))
+
+        if self.round < len(self.cards_per_round):
             self.round += 1
-            #display total scoreboard
-            self.scoreboard.update_total_scoreboard(
-                player_list=self.player_queue,
-                max_cards=self.max_cards
-                )
-            clear_screen(5)
-            print("Total score: ",(self.scoreboard.display(round=False)))
-            
             #reset players
             for player in self.player_queue:
                 player.reset() 
             self.phase = Phase.TRUMP_REDECIDING
         else:
             self.phase = Phase.GAME_OVER
-            return
 
     def start_round(self):
         """
@@ -323,10 +377,7 @@ class Game:
         self.scoreboard.reorder_round_scoreboard(
             player_queue=self.temp_player_queue
             )
-        self.playingFlow = PlayingFlow(
-            self.table,
-            self.scoreboard,
-            self.deck.permanent_valid_card_initials)
+        self.playingFlow = self.create_playing_flow()
         
         for player in self.temp_player_queue:
 
@@ -340,10 +391,10 @@ class Game:
                 if player.opponent:
                     selected_card = self._materialise_played_card(player, choice)
                     if not selected_card:
-                        print(f"invalid card input, card is not longer in the deck")
+                        self.output(f"invalid card input, card is not longer in the deck")
                         continue
 
-                    print(f"{player} selected card", selected_card)
+                    self.output(f"{player} selected card", selected_card)
                     self._remote_play_card(player, selected_card)
                     break  # successful play
 
@@ -352,9 +403,9 @@ class Game:
 
                     try: 
                         selected_card = player.hand[choice-1]
-                        print(f"{player} selected card", selected_card)
+                        self.output(f"{player} selected card", selected_card)
                     except:
-                        print("Invalid Card Index")
+                        self.output("Invalid Card Index")
                         continue
                 
                     if not self._local_play_card(player, selected_card):
@@ -362,7 +413,14 @@ class Game:
                     break 
 
         self.score_hand()
-          
+
+    def create_playing_flow(self) -> PlayingFlow:
+        """Returns the flow that asks each player for their card this trick"""
+        return PlayingFlow(
+            self.table,
+            self.scoreboard,
+            self.deck.permanent_valid_card_initials,
+            self.advisor)
             
 
     def _local_play_card(self, player:Player, selected_card: Card):
@@ -379,6 +437,9 @@ class Game:
         
         #after playing the card remove it from the player hand
         player.remove_card(card=selected_card)
+        self.log_event(event_log.PLAY, player, selected_card.card_id)
+        self._record_void(player, selected_card)
+        self.advisor.observe(player, selected_card)
         return True
 
 
@@ -389,6 +450,19 @@ class Game:
         
         if self.table.play_card_to_table(selected_card, player, self.trump_suit) == False:
             raise ValueError("unable to play card to table")
+        self.log_event(event_log.PLAY, player, selected_card.card_id)
+        self._record_void(player, selected_card)
+        self.advisor.observe(player, selected_card)
+
+    def _record_void(self, player: Player, selected_card: Card):
+        """
+        Records the suit a card just played to the table shows its player
+        to be void in: not following the led suit, nor trumping
+        """
+        led = bitboard.suit_index(self.table.stack[0].suit)
+        void = revealed_void(selected_card.card_id, led, bitboard.suit_index(self.trump_suit))
+        if void != bitboard.NO_SUIT:
+            self.void_flags[player.name] = self.void_flags.get(player.name, 0) | 1 << void
 
         
         
@@ -399,7 +473,8 @@ class Game:
 
         winner_card = self.table.verify_winner(trump_suit=self.trump_suit)
         winning_player = winner_card.owner
-        print(f"\n{winning_player} is the winner with {winner_card}\n")
+        self.log_event(event_log.TRICK, winning_player, winner_card.card_id)
+        self.output(f"\n{winning_player} is the winner with {winner_card}\n")
         
         self.scoreboard.update_round_scoreboard(
             player_list=self.player_queue, 
@@ -421,6 +496,7 @@ class Game:
 
         if not card:
             return None
+        self.log_event(event_log.DRAW, player, card.card_id)
 
         card.owner = player
         return card
@@ -0,0 +1,407 @@
+# Contents of the HeadlessGame class which plays whole games between agents
+
+import random
+import event_log
+import opponent_model
+import probability_engine as pe
+from bid_advisor import bid_score, recommend_bid
+from game_state import GameState
+from .GameManager import Game, Phase
+from .PlayerClass import Player
+from .ScoreboardClass import Scoreboard
+from .DeckClass import Deck
+from .TableClass import Table
+from .UIManager import UIManager
+from .BiddingManager import BiddingManager, banned_bid
+from .PlayerStateManager import PlayerStateManager
+from .TrumpManager import TrumpManager
+from Utils import bitboard
+
+
+class RandomAgent:
+    """
+    Agent that bids and plays at random, used as a baseline
+
+    Agents are called by HeadlessGame instead of prompting a user:
+        choose_trump(game, player) returns the name of the trump suit
+        bid(game, player, forbidden_bid) returns a legal bid
+        play(game, player, legal) returns the id of a card in the legal mask
+
+    These read what they need from the game and pass it on to the bitboard
+    versions, which take only masks and numbers and are what BitboardGame calls:
+        choose_suit() returns the index of the trump suit
+        bid_mask(hand, trump, num_players, max_cards, forbidden_bid) returns a legal bid
+        play_mask(legal, led, best, trump, need) returns the id of a card in the
+            legal mask, best being the opponent_model score of the winning card
+
+    Agents that need the whole game, like AdvisorAgent, set bitboard to False.
+    """
+
+    bitboard = True
+
+    def __init__(self, seed: int = None):
+        self.rng = random.Random(seed)
+
+    def choose_trump(self, game: "HeadlessGame", player: Player) -> str:
+        return bitboard.SUITS[self.choose_suit()][0]
+
+    def bid(self, game: "HeadlessGame", player: Player, forbidden_bid: int) -> int:
+        return self.bid_mask(player.hand_mask(), bitboard.suit_index(game.trump_suit),
+                             len(game.player_queue), game.max_cards, forbidden_bid)
+
+    def play(self, game: "HeadlessGame", player: Player, legal: int) -> int:
+        trump = bitboard.suit_index(game.trump_suit)
+        stack = game.table.stack
+        led = bitboard.suit_index(stack[0].suit) if stack else bitboard.NO_SUIT
+        best = max((opponent_model._score(card.card_id, led, trump) for card in stack),
+                   default=-1)
+        return self.play_mask(legal, led, best, trump, player.bid - player.round_score)
+
+    def choose_suit(self) -> int:
+        return self.rng.randrange(len(bitboard.SUITS))
+
+    def bid_mask(self, hand: int, trump: int, num_players: int, max_cards: int,
+                 forbidden_bid: int) -> int:
+        return self.rng.choice([bid for bid in range(max_cards + 1) if bid != forbidden_bid])
+
+    def play_mask(self, legal: int, led: int, best: int, trump: int, need: int) -> int:
+        # the same draw as choosing from mask_to_ids, without listing the cards
+        for _ in range(self.rng.randrange(legal.bit_count())):
+            legal &= legal - 1
+        return (legal & -legal).bit_length() - 1
+
+
+class GreedyAgent(RandomAgent):
+    """
+    Agent that bids opponent_model.estimate_tricks and plays the greedy
+    policy of opponent_model
+    """
+
+    play_mask = staticmethod(opponent_model.greedy_mask)
+
+    def bid_mask(self, hand: int, trump: int, num_players: int, max_cards: int,
+                 forbidden_bid: int) -> int:
+        estimate = opponent_model.estimate_hand_tricks(hand, trump, num_players)
+        # the closest legal bid to the estimate
+        return min((bid for bid in range(max_cards + 1) if bid != forbidden_bid),
+                   key=lambda bid: abs(bid - estimate))
+
+
+class BidAwareAgent(GreedyAgent):
+    """GreedyAgent that ducks tricks once its bid is made"""
+
+    play_mask = staticmethod(opponent_model.bid_aware_mask)
+
+
+class AdvisorAgent(RandomAgent):
+    """
+    Agent that follows the advisor: bids with bid_advisor.recommend_bid
+    and plays the card of probability_engine.recommend
+
+    Args:
+        budget_ms (float): Search time for each card
+        engine (str): Search engine, one of probability_engine.ENGINES
+        num_worlds (int): Deals simulated for each bid
+    """
+
+    bitboard = False
+
+    def __init__(self, seed: int = None, budget_ms: float = 50,
+                 engine: str = "sampling", num_worlds: int = 500):
+        super().__init__(seed)
+        self.budget_ms = budget_ms
+        self.engine = engine
+        self.num_worlds = num_worlds
+
+    def bid(self, game: "HeadlessGame", player: Player, forbidden_bid: int) -> int:
+        advice = recommend_bid(GameState.from_game(game, player), forbidden_bid,
+                               num_worlds=self.num_worlds,
+                               seed=self.rng.getrandbits(32))
+        return advice.bid
+
+    def play(self, game: "HeadlessGame", player: Player, legal: int) -> int:
+        recommendation = pe.recommend(GameState.from_game(game, player),
+                                      budget_ms=self.budget_ms,
+                                      seed=self.rng.getrandbits(32),
+                                      engine=self.engine)
+        return bitboard.initials_to_id(recommendation.card)
+
+
+class AgentBiddingFlow:
+    """
+    Replaces BiddingFlow in a HeadlessGame, asking each player's agent for
+    their bid instead of prompting
+    """
+
+    def __init__(self, game: "HeadlessGame"):
+        self.game = game
+
+    def run(self, round_no: int, max_cards: int,
+            players: list[Player],
+            bidding_manager: BiddingManager, trump_suit: str):
+        for player in players:
+            # only have forbidden bid if player is last to bid
+            if player.handicapped_bid:
+                forbidden_bid = bidding_manager.calculate_banned_number(max_cards)
+            else:
+                forbidden_bid = -1
+
+            bid = self.game.agents[player.name].bid(self.game, player, forbidden_bid)
+            if not bidding_manager.successful_player_bid(
+                    player=player, forbidden_bid=forbidden_bid, bid_amount=bid):
+                raise ValueError(f"{player.name} made an invalid bid: {bid}")
+            bidding_manager.update_current_bids(player_queue=players)
+
+
+class AgentPlayingFlow:
+    """
+    Replaces PlayingFlow in a HeadlessGame, asking each player's agent for
+    a card from the legal mask of Table.legal_mask instead of prompting
+    """
+
+    def __init__(self, game: "HeadlessGame"):
+        self.game = game
+
+    def play_turn(self, player: Player, trump_suit: str) -> int:
+        """Returns the index, from 1, of the chosen card in the player's hand"""
+        legal = self.game.table.legal_mask(player.hand, trump_suit)
+        card_id = self.game.agents[player.name].play(self.game, player, legal)
+        if not legal & bitboard.CARD_MASKS[card_id]:
+            raise ValueError(f"{player.name} played an illegal card: "
+                             f"{bitboard.id_to_initials(card_id)}")
+        return player.hand.index_of(card_id) + 1
+
+
+class HeadlessGame(Game):
+    """
+    Game played between agents without prompts, sleeps or console output,
+    for self-play and offline evaluation
+
+    The phase machine of Game is reused as is for bidding, playing and
+    scoring; only the deal and the choice of trump, which the console
+    game takes from its users, are done here. Every player is local so
+    every hand is dealt from the deck.
+
+    Attributes:
+        agents (dict): Agent of each player, by name
+        rng (random.Random): Random generator for the deals, only used for
+            dealing so that games with the same seed share their deals
+        decider_rng (random.Random): Random generator for the trump deciders
+        hits (dict): Rounds in which each player won exactly their bid, by name
+    """
+
+    @staticmethod
+    def output(*args, **kwargs):
+        pass
+
+    @staticmethod
+    def clear_screen(delay: float = 1.5):
+        pass
+
+    def __init__(self, agents: list, names: list[str] = None, seed: int = None,
+                 cards_per_round: list[int] = None, event_log=None):
+        """
+        Args:
+            agents (list): Agent of every player, in seat order
+            names (list[str]): Player names, "Player 1" onwards if not given
+            seed (int): Optional seed for reproducible deals
+            cards_per_round (list[int]): Round sizes, the game's if not given
+            event_log (EventLog): Optional log the game's events are written to
+        """
+        super().__init__(event_log=event_log)
+        names = names or [f"Player {index + 1}" for index in range(len(agents))]
+        if len(names) != len(agents) or len(set(names)) != len(names):
+            raise ValueError("Every agent needs a unique player name")
+        if cards_per_round:
+            self.cards_per_round = list(cards_per_round)
+        if max(self.cards_per_round) * len(agents) >= bitboard.NUM_CARDS:
+            raise ValueError("Not enough cards in the deck for every hand and the trump")
+
+        self.agents = dict(zip(names, agents))
+        # agents do not ask the advisor, so no inference is kept for them
+        self.advisor.tracking = False
+        self.rng = random.Random(seed)
+        self.decider_rng = random.Random(seed)
+        self.hits = dict.fromkeys(names, 0)
+
+        self.deck = Deck()
+        self.UIManager = UIManager()
+        self.table = Table(self.UIManager)
+        self.biddingManager = BiddingManager(self.UIManager)
+        self.trumpManager = TrumpManager(self.UIManager)
+        self.biddingFlow = AgentBiddingFlow(self)
+
+        self.player_queue = [Player(name=name, opponent=False) for name in names]
+        self.temp_player_queue = self.player_queue
+        self.playerStateManager = PlayerStateManager(self.player_queue)
+        self.phase = Phase.HAND_ASSIGNMENT
+
+    def play(self) -> dict:
+        """Plays every round and returns the total score of each player, by name"""
+        self.run_game_phases()
+        return dict(self.scoreboard.total_scoreboard)
+
+    def handle_hand_assignment(self):
+        """Deals every hand from a deck shuffled with the game's generator"""
+        self.deck.reset()
+        self.deck.shuffle(self.rng)
+
+        if self.round == 1:
+            self.scoreboard = Scoreboard(self.player_queue)
+        self.scoreboard.reset_round_scoreboard()
+
+        cards = self.cards_per_round[self.round - 1]
+        for player in self.player_queue:
+            player.hand = [self.deck.pop() for _ in range(cards)]
+            player.own_hand()
+            for card in player.hand:
+                self.log_event(event_log.DRAW, player, card.card_id)
+
+        self.phase = Phase.TRUMP_SELECTION if self.round == 1 else Phase.BIDDING
+
+    def handle_trump_selection(self):
+        """The first card left in the deck decides the trump of the first round"""
+        self.trump_suit = self.deck.deck[0].suit[0]
+        self.phase = Phase.BIDDING
+
+    def handle_redeciding_trump(self):
+        """A top scorer of the last round chooses the trump through their agent"""
+        top_score = max(player.round_score for player in self.player_queue)
+        chosen_player = self.decider_rng.choice(
+            [player for player in self.player_queue if player.round_score == top_score])
+        self.trump_suit = self.agents[chosen_player.name].choose_trump(self, chosen_player)
+        self.phase = Phase.HAND_ASSIGNMENT
+
+    def handle_scoring_phase(self):
+        for player in self.player_queue:
+            self.hits[player.name] += player.bid == player.round_score
+        super().handle_scoring_phase()
+
+    def create_playing_flow(self) -> AgentPlayingFlow:
+        return AgentPlayingFlow(self)
+
+
+class BitboardGame:
+    """
+    The game of HeadlessGame played on card masks alone, for agent against
+    agent play
+
+    No Card, Player, Table or Scoreboard is made and no phase machine runs:
+    each seat's hand is a mask and the agents are called through their
+    bitboard methods, so every agent must have bitboard set. Deals, seat
+    order, bids, tricks and scores follow HeadlessGame exactly, so a game
+    with the same agents and seed ends with the same scores. Forbidden
+    bids and scores come from BiddingManager.banned_bid and
+    bid_advisor.bid_score, as in the full game.
+
+    Four players of the default rounds play about 650 games a second with
+    RandomAgent and 400 with GreedyAgent on one core of a slow machine,
+    about four times HeadlessGame's rate on the same agents.
+
+    Attributes:
+        agents (dict): Agent of each player, by name
+        cards_per_round (list[int]): Cards dealt to each hand every round
+        rng (random.Random): Random generator for the deals
+        decider_rng (random.Random): Random generator for the trump deciders
+        hits (dict): Rounds in which each player won exactly their bid, by name
+    """
+
+    def __init__(self, agents: list, names: list[str] = None, seed: int = None,
+                 cards_per_round: list[int] = None):
+        """
+        Args:
+            agents (list): Agent of every player, in seat order
+            names (list[str]): Player names, "Player 1" onwards if not given
+            seed (int): Optional seed for reproducible deals
+            cards_per_round (list[int]): Round sizes, the game's if not given
+        """
+        names = names or [f"Player {index + 1}" for index in range(len(agents))]
+        if len(names) != len(agents) or len(set(names)) != len(names):
+            raise ValueError("Every agent needs a unique player name")
+        self.cards_per_round = list(cards_per_round or [8, 7, 6, 6, 7, 8])
+        if max(self.cards_per_round) * len(agents) >= bitboard.NUM_CARDS:
+            raise ValueError("Not enough cards in the deck for every hand and the trump")
+        if not all(agent.bitboard for agent in agents):
+            raise ValueError("Every agent needs the bitboard methods, use HeadlessGame")
+
+        self.agents = dict(zip(names, agents))
+        self.rng = random.Random(seed)
+        self.decider_rng = random.Random(seed)
+        self.hits = dict.fromkeys(names, 0)
+
+    def play(self) -> dict:
+        """Plays every round and returns the total score of each player, by name"""
+        names = list(self.agents)
+        agents = list(self.agents.values())
+        num_players = len(agents)
+        # looked up once, the trick loop runs for every card of every game
+        plays = [agent.play_mask for agent in agents]
+        legal_moves = bitboard.legal_moves
+        card_masks = bitboard.CARD_MASKS
+        no_suit = bitboard.NO_SUIT
+        ranks = bitboard.RANKS
+
+        # the player queue only ever turns, to each trick's winner and on to
+        # the next dealer, so it is kept as the seat at its front
+        rotations = [tuple((first + position) % num_players for position in range(num_players))
+                     for first in range(num_players)]
+        first = 0
+        totals = [0] * num_players
+        trump = no_suit
+
+        for round_index, cards in enumerate(self.cards_per_round):
+            if round_index:
+                # players are reset before the trump is redecided, so every
+                # one of them ties as the top scorer
+                trump = agents[self.decider_rng.choice(rotations[first])].choose_suit()
+
+            deck = list(range(bitboard.NUM_CARDS))
+            self.rng.shuffle(deck)
+            hands = [0] * num_players
+            top = len(deck)
+            for seat in rotations[first]:
+                for card in deck[top - cards:top]:
+                    hands[seat] |= card_masks[card]
+                top -= cards
+            if not round_index:
+                trump = bitboard.suit_of(deck[0])
+
+            if round_index:
+                first = (first + 1) % num_players
+            bids = [-1] * num_players
+            for seat in rotations[first]:
+                forbidden_bid = -1
+                if seat == rotations[first][-1]:
+                    forbidden_bid = banned_bid((bid for bid in bids if bid >= 0), cards)
+                bid = agents[seat].bid_mask(hands[seat], trump, num_players, cards, forbidden_bid)
+                if bid == forbidden_bid or not 0 <= bid <= cards:
+                    raise ValueError(f"{names[seat]} made an invalid bid: {bid}")
+                bids[seat] = bid
+
+            tricks = [0] * num_players
+            for _ in range(cards):
+                led = no_suit
+                best = -1
+                for seat in rotations[first]:
+                    legal = legal_moves(hands[seat], led, trump)
+                    card = plays[seat](legal, led, best, trump, bids[seat] - tricks[seat])
+                    if not legal & card_masks[card]:
+                        raise ValueError(f"{names[seat]} played an illegal card: "
+                                         f"{bitboard.id_to_initials(card)}")
+                    hands[seat] ^= card_masks[card]
+                    # the opponent_model score, trumps over the led suit over the rest
+                    suit, rank = divmod(card, ranks)
+                    if led == no_suit:
+                        led = suit
+                    score = (rank + 2 * ranks if suit == trump
+                             else rank + ranks if suit == led else -1)
+                    if score > best:
+                        best, first = score, seat
+                tricks[first] += 1
+
+            for seat in range(num_players):
+                totals[seat] += bid_score(bids[seat], tricks[seat], cards)
+                if bids[seat] == tricks[seat]:
+                    self.hits[names[seat]] += 1
+
+        return dict(zip(names, totals))
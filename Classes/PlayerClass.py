@@ -1,18 +1,100 @@
 # Contents of the Player class python file
 
 from .CardClass import Card
+from Utils import bitboard
 from dataclasses import dataclass, field
 from typing import List, Optional
 
-@dataclass
+
+def _card_bit(card) -> int:
+    return getattr(card, "mask", 0)
+
+
+class Hand(list):
+    """
+    List of the cards in a player's hand which keeps the mask of the cards
+    up to date as it changes, so checking whether a card is in the hand
+    and building its mask take constant time
+
+    Cards without an id are kept in the list but not in the mask.
+
+    Attributes:
+        mask (int): Bit mask of the cards in the hand
+    """
+
+    __slots__ = ("mask",)
+
+    def __init__(self, cards=()):
+        super().__init__(cards)
+        self._recount()
+
+    def _recount(self):
+        self.mask = 0
+        for card in self:
+            self.mask |= _card_bit(card)
+
+    def append(self, card: Card):
+        super().append(card)
+        self.mask |= _card_bit(card)
+
+    def insert(self, index: int, card: Card):
+        super().insert(index, card)
+        self.mask |= _card_bit(card)
+
+    def extend(self, cards):
+        super().extend(cards)
+        self._recount()
+
+    def __iadd__(self, cards):
+        self.extend(cards)
+        return self
+
+    def remove(self, card: Card):
+        super().remove(card)
+        self.mask &= ~_card_bit(card)
+
+    def pop(self, index: int = -1) -> Card:
+        card = super().pop(index)
+        self.mask &= ~_card_bit(card)
+        return card
+
+    def clear(self):
+        super().clear()
+        self.mask = 0
+
+    def __setitem__(self, index, cards):
+        super().__setitem__(index, cards)
+        self._recount()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._recount()
+
+    def index_of(self, card_id: int) -> int:
+        """Returns the position of the card with the given id, -1 if it is not in the hand"""
+        if self.mask & bitboard.CARD_MASKS[card_id]:
+            for index, card in enumerate(self):
+                if card.card_id == card_id:
+                    return index
+        return -1
+
+    def __contains__(self, card) -> bool:
+        bit = _card_bit(card)
+        if bit:
+            return bool(self.mask & bit)
+        return super().__contains__(card)
+
+
+@dataclass(slots=True, eq=False)
 class Player:
     """
     Handles the hand functionality of players.
     Players are able to collect hands and play cards.
-    
+
+    The hand is always a Hand, lists assigned to it are converted.
     """
     name: str = "AI"
-    hand: List[Card] = field(default_factory=list) #each player gets their own hand list
+    hand: List[Card] = field(default_factory=Hand) #each player gets their own hand list
     total_score: int = 0
     round_score: int = 0
     bid: int = -1 # must be -1 because 0 is a valid bid
@@ -21,6 +103,11 @@ class Player:
     opponent: bool = True
     handicapped_bid:bool = False
 
+    def __setattr__(self, name, value):
+        if name == "hand" and not isinstance(value, Hand):
+            value = Hand(value)
+        object.__setattr__(self, name, value)
+
     def own_hand(self):
         """
         Ensures that the cards in the hand are assigned to the player
@@ -35,17 +122,22 @@ class Player:
         """
         Discards card from player's hand
         """
-        for _card in self.hand:
-            if card == _card:
-                self.hand.remove(_card)
-                return
+        if card in self.hand:
+            self.hand.remove(card)
 
     def find_card(self, selected_suit: str, selected_value: str) -> bool:
         """Determies whether the selectd card is present in player's hand"""
-        for card in self.hand:
-            if card.suit[0].lower() == selected_suit.lower() and card.value[0].lower() == selected_value.lower():
-                return True
-        return False
+        suit = bitboard.suit_index(selected_suit)
+        value = selected_value.upper()
+        if suit == bitboard.NO_SUIT or value not in bitboard.VALUE_STRINGS:
+            return False
+
+        card_id = suit * bitboard.RANKS + bitboard.VALUE_STRINGS.index(value)
+        return bool(self.hand.mask & bitboard.CARD_MASKS[card_id])
+
+    def hand_mask(self) -> int:
+        """Returns the player's hand as a card mask"""
+        return self.hand.mask
     
     def display_hand_str(self, max_cards: int = 8): # currently the hands are empty
         """
@@ -75,7 +167,7 @@ class Player:
         self.bid = -1
         self.trump_decider = False
         self.handicapped_bid = False    
-        self.hand = []    
+        self.hand = Hand()
         self.round_score = 0
 
     def reset_bid(self):
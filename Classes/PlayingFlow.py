@@ -13,7 +13,8 @@ class PlayingFlow:
     def __init__(self, 
                  table: Table,
                  scoreboard: Scoreboard,
-                 valid_card_initials: set):
+                 valid_card_initials: set,
+                 advisor=None):
         
         self.context = {
             "player_results": [],
@@ -23,6 +24,7 @@ class PlayingFlow:
         self.table = table
         self.scoreboard = scoreboard
         self.valid_card_initials = valid_card_initials
+        self.advisor = advisor
     
     def play_turn(self, player: Player, trump_suit: str):
         """
@@ -61,16 +63,28 @@ class PlayingFlow:
 
         trump_suit_symbol = suit_to_symbol[trump_suit.lower()]
         
+        # search in the background while the prompt waits for input
+        if self.advisor:
+            self.advisor.advise_play(player)
 
-        result = self.stepManager.run_step(
-                    step = PlayerPlayCardStep(),
-                    prompt_args={
-                        "player": player,
-                        "trump_suit_symbol": trump_suit_symbol,
-                        "scoreboard": self.scoreboard,
-                        "table": self.table},
-                    validate_args={"player": player}
-                    )
+        try:
+            result = self.stepManager.run_step(
+                        step = PlayerPlayCardStep(),
+                        prompt_args={
+                            "player": player,
+                            "trump_suit_symbol": trump_suit_symbol,
+                            "scoreboard": self.scoreboard,
+                            "table": self.table,
+                            "trump_suit": trump_suit,
+                            "advisor": self.advisor},
+                        validate_args={"player": player,
+                                       "table": self.table,
+                                       "trump_suit": trump_suit,
+                                       "advisor": self.advisor}
+                        )
+        finally:
+            if self.advisor:
+                self.advisor.cancel()
 
         # clear_screen(0)
         return result
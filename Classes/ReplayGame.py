@@ -0,0 +1,188 @@
+# Contents of the ReplayGame class which rebuilds a logged game without prompts
+
+import event_log
+from event_log import GameRecord
+from game_state import GameState
+from .GameManager import Phase
+from .HeadlessGame import HeadlessGame, AgentPlayingFlow
+from .PlayerClass import Player
+from .ScoreboardClass import Scoreboard
+from Utils import bitboard
+
+
+class StopReplay(Exception):
+    """Raised by ReplayCursor once the replay has reached its stop"""
+
+
+class ReplayCursor:
+    """
+    Stands in for the EventLog of a ReplayGame, checking every event the
+    replay logs against the recorded game and stopping it on request
+
+    Attributes:
+        record (GameRecord): Game being replayed
+        stop (int): Number of events after which the replay stops, None
+            to replay the whole game
+        position (int): Events replayed so far
+    """
+
+    def __init__(self, record: GameRecord, stop: int = None):
+        self.record = record
+        self.stop = stop
+        self.position = 0
+
+    def start_game(self, names: list[str], opponents: list[bool], cards_per_round: list[int]):
+        if names != self.record.names:
+            raise ValueError("The replay does not seat the logged players")
+        if self.stop == 0:
+            raise StopReplay()
+
+    def append(self, kind: int, seat: int = event_log.NO_SEAT, value: int = 0, extra: int = 0):
+        expected = tuple(self.record.events[self.position].tolist())
+        if (kind, seat, value, extra) != expected:
+            raise ValueError(f"Replay diverged from the log at event {self.position}: "
+                             f"{(kind, seat, value, extra)} instead of {expected}")
+        self.position += 1
+        if self.position == self.stop:
+            raise StopReplay()
+
+    def end_game(self):
+        self.append(event_log.END)
+
+
+class ReplayAgent:
+    """Answers for one seat with the bids and cards of the log"""
+
+    def __init__(self, bids: list, plays: list):
+        self.bids = iter(bids)
+        self.plays = iter(plays)
+
+    def bid(self, game: "ReplayGame", player: Player, forbidden_bid: int) -> int:
+        return next(self.bids)
+
+    def play(self, game: "ReplayGame", player: Player, legal: int) -> int:
+        return next(self.plays)
+
+
+class ReplayPlayingFlow(AgentPlayingFlow):
+    """
+    AgentPlayingFlow that also plays for remote opponents, whose cards
+    are declared by their initials as in the console game
+    """
+
+    def play_turn(self, player: Player, trump_suit: str):
+        if player.opponent:
+            card_id = self.game.agents[player.name].play(self.game, player, 0)
+            return bitboard.id_to_initials(card_id)
+        return super().play_turn(player, trump_suit)
+
+
+class ReplayGame(HeadlessGame):
+    """
+    Game rebuilt from an event log, every decision being read from the log
+
+    The game runs through the same phases as the logged one, so its state
+    can be inspected after any event. Local hands are drawn from the deck
+    by their logged cards and remote opponents declare their cards as
+    they play them, as in the console game. Every event the replay
+    produces is checked against the log.
+
+    Attributes:
+        record (GameRecord): Game being replayed
+        deals (list): Cards drawn for each seat's hand in each round
+        trump_cards (list): Trump cards drawn from the deck by hand
+        trumps (list): Trump suit index of every round
+    """
+
+    def __init__(self, record: GameRecord, stop: int = None):
+        """
+        Args:
+            record (GameRecord): Logged game
+            stop (int): Number of events after which the replay stops
+        """
+        self.record = record
+        self.deals, self.trump_cards, self.trumps, bids, plays = self._decisions(record)
+        agents = [ReplayAgent(bids[seat], plays[seat])
+                  for seat in range(len(record.names))]
+        super().__init__(agents, record.names, cards_per_round=record.cards_per_round,
+                         event_log=ReplayCursor(record, stop))
+        for player, opponent in zip(self.player_queue, record.opponents):
+            player.opponent = opponent
+
+    @staticmethod
+    def _decisions(record: GameRecord) -> tuple:
+        num_seats = len(record.names)
+        deals, trump_cards, trumps = [], [], []
+        bids = [[] for _ in range(num_seats)]
+        plays = [[] for _ in range(num_seats)]
+        phase = None
+        phases = list(Phase)
+        for kind, seat, value, _ in record.events.tolist():
+            if kind == event_log.PHASE:
+                phase = phases[value]
+                if phase == Phase.HAND_ASSIGNMENT:
+                    deals.append([[] for _ in range(num_seats)])
+            elif kind == event_log.DRAW and phase == Phase.HAND_ASSIGNMENT:
+                deals[-1][seat].append(value)
+            elif kind == event_log.DRAW and seat == event_log.NO_SEAT:
+                trump_cards.append(value)
+            elif kind == event_log.TRUMP:
+                trumps.append(value)
+            elif kind == event_log.BID:
+                bids[seat].append(value)
+            elif kind == event_log.PLAY:
+                plays[seat].append(value)
+        return deals, trump_cards, trumps, bids, plays
+
+    def play(self):
+        """Replays the game up to its stop and returns the game"""
+        try:
+            self.run_game_phases()
+        except StopReplay:
+            pass
+        return self
+
+    def handle_hand_assignment(self):
+        """Draws every local hand from the deck by the cards of the log"""
+        self.deck.generate_deck()
+        if self.round == 1:
+            self.scoreboard = Scoreboard(self.player_queue)
+        self.scoreboard.reset_round_scoreboard()
+
+        deal = self.deals[self.round - 1]
+        for player in self.player_queue:
+            for card_id in deal[self.seats[player.name]]:
+                card = self.deck.draw_card_from_initials(bitboard.id_to_initials(card_id))
+                self.log_event(event_log.DRAW, player, card.card_id)
+                player.hand.append(card)
+                player.own_hand()
+
+        self.phase = Phase.TRUMP_SELECTION if self.round == 1 else Phase.BIDDING
+
+    def handle_trump_selection(self):
+        """Draws the logged trump card, if it was chosen by hand, and sets the trump"""
+        for card_id in self.trump_cards:
+            card = self.deck.draw_card_from_initials(bitboard.id_to_initials(card_id))
+            self.log_event(event_log.DRAW, value=card.card_id)
+        self.trump_suit = bitboard.SUITS[self.trumps[0]][0]
+        self.phase = Phase.BIDDING
+
+    def handle_redeciding_trump(self):
+        """Sets the trump of the next round from the log"""
+        self.trump_suit = bitboard.SUITS[self.trumps[self.round - 1]][0]
+        self.phase = Phase.HAND_ASSIGNMENT
+
+    def create_playing_flow(self) -> ReplayPlayingFlow:
+        return ReplayPlayingFlow(self)
+
+
+def replay(record: GameRecord, stop: int = None) -> ReplayGame:
+    """Returns the logged game replayed through its first stop events, or all of them"""
+    return ReplayGame(record, stop).play()
+
+
+def state_at(record: GameRecord, stop: int, player: str) -> GameState:
+    """Returns the GameState a player saw after the first stop events of a logged game"""
+    game = replay(record, stop)
+    return GameState.from_game(game, next(
+        _player for _player in game.player_queue if _player.name == player))
@@ -3,6 +3,14 @@
 from Utils.tools import *
 from .PlayerClass import Player
 from Utils.ViewFormat import *
+from Utils import bitboard
+
+
+class StepInfo(ValueError):
+    """
+    Raised by validate to show the user some information and ask again,
+    without it being reported as an error
+    """
 
 
 class Step:
@@ -120,17 +128,21 @@ class BiddingMenuStep(Step):
         max_cards = args['max_cards']
         forbidden_bid = args['forbidden_bid']
 
+        advisor = args.get('advisor')
+
         if forbidden_bid > -1 and player.handicapped_bid:
             bidding_line = f"""{player}, enter your bid (BANNED: {forbidden_bid}) > """
         else:
             bidding_line = f"{player} enter your bid > " 
 
+        advice_line = advisor.prompt_line() if advisor else ""
+
         return f"""{player}'s turn bidding\n
 Current bids: {current_bids}
 Trump: {trump_suit}
 Hand: {player.display_hand_str(max_cards)}
 
-{bidding_line}"""
+{advice_line}{bidding_line}"""
 
     
     def validate(self, user_input: str, args: dict = {}):
@@ -330,14 +342,22 @@ class PlayerPlayCardStep(Step):
         player = args['player']
         trump_suit_symbol = args['trump_suit_symbol']
         table = args['table']
+        advisor = args.get('advisor')
+        trump_suit = args.get('trump_suit')
+
+        # the cards that follow the table's rules are marked in the hand
+        playable = table.legal_mask(player.hand, trump_suit) if trump_suit else None
 
         player_headline_string = f"▶\t {player.name} to play\t|\tTrump: {trump_suit_symbol}"
         round_scoreboard_string = f"Round score: {scoreboard.display()}"
         table_string = f"Table:\n{table.display_stack()}"
-        hand_string = f"Hand:\n{format_hand(player.hand)}"
-        choose_card_string = f"Choose card [1-{len(player.hand)}] > "
+        hand_string = f"Hand:\n{format_hand(player.hand, playable=playable)}"
+        choose_card_string = f"Choose card [1-{len(player.hand)}], ?<card> for who holds it > "
         
         clear_screen(3)
+        advice_string = advisor.prompt_line() if advisor else ""
+        if advisor:
+            advice_string = advisor.holders_line(player) + advice_string
         return (
             "".join([
                 player_headline_string,
@@ -351,6 +371,7 @@ class PlayerPlayCardStep(Step):
                 hand_string, 
                 "\n",
                 "\n",
+                advice_string,
                 choose_card_string
             ]
             )
@@ -367,6 +388,15 @@ class PlayerPlayCardStep(Step):
             raise RuntimeError(f"Missing context: {missing}")
         
         player = args['player']
+
+        # e.g. ?AH shows who is likely to hold the ace of hearts
+        advisor = args.get('advisor')
+        if user_input.startswith("?") and advisor:
+            try:
+                holders = advisor.holders_line(player, user_input[1:].strip())
+            except ValueError:
+                raise ValueError(f"Unknown card: {user_input[1:]}")
+            raise StepInfo(holders.rstrip() or "No inference for this round yet")
         
         if not user_input.isdigit():
             raise ValueError("Must enter a number")
@@ -378,6 +408,13 @@ class PlayerPlayCardStep(Step):
         
         if user_input == '':
             raise ValueError("Must enter a value")
+
+        table = args.get('table')
+        trump_suit = args.get('trump_suit')
+        if table and trump_suit:
+            card = player.hand[index - 1]
+            if not table.legal_mask(player.hand, trump_suit) & bitboard.CARD_MASKS[card.card_id]:
+                raise ValueError(f"Must follow {table.stack[0].suit[0]} or play {trump_suit}")
         
         return index
         
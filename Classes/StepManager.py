@@ -46,6 +46,9 @@ class StepManager:
                       self.history.append(step)
                       return value
                     
+                    except StepInfo as e:
+                         print(e)
+
                     except ValueError as e:
                          print(f"Error: {e}")
 
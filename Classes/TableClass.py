@@ -1,7 +1,18 @@
 # Contents for the table class in the Nomination game
 
 from .CardClass import Card
-from .PlayerClass import Player
+from .PlayerClass import Player, Hand
+from Utils import bitboard
+
+
+def _hand_mask(hand: list[Card] | int) -> int:
+    """Returns the card mask of a hand given as a list of cards, a Hand or a mask"""
+    if isinstance(hand, Hand):
+        return hand.mask
+    if isinstance(hand, int):
+        return hand
+    return bitboard.hand_mask(hand)
+
 
 class Table:
     """
@@ -74,25 +85,29 @@ class Table:
             Displays a message if invalid.
         """
 
-        if self.stack: 
-
-            if card.suit[0] == trump_suit:
-                 return True
-            
+        legal = self.legal_mask(_hand_mask(player_hand) | card.mask, trump_suit)
+        if not legal & card.mask:
             first_card = self.stack[0] # gets the first card in stack
-
-            first_suit = first_card.suit[0].lower()
-            
-            # True if any of the cards' suits match the first card
-            must_follow_suit = self._has_suit(hand=player_hand,
-                                              suit=first_suit)
-            #must play first card suit
-            if must_follow_suit and card.suit[0].lower() != first_card.suit[0].lower():
-                print(
-                    f"Invalid card choice - Must be {first_card.suit[0]} or {trump_suit} suit")
-                return False
+            print(
+                f"Invalid card choice - Must be {first_card.suit[0]} or {trump_suit} suit")
+            return False
         return True
 
+    def legal_mask(self, hand: list[Card] | int, trump_suit: str) -> int:
+        """
+        Returns the mask of the cards in the hand that can be played to the table
+
+        Uses the same rule as the simulations: the suit of the first card
+        must be followed if possible, but a trump can always be played
+
+        Args:
+            hand (list[Card] | int): The player's hand or its card mask
+            trump_suit (str): The trump suit
+        """
+        hand = _hand_mask(hand)
+        led = bitboard.suit_index(self.stack[0].suit) if self.stack else bitboard.NO_SUIT
+        return bitboard.legal_moves(hand, led, bitboard.suit_index(trump_suit))
+
 
     def verify_winner(self, trump_suit: str) -> Card:
         """
@@ -109,20 +124,11 @@ class Table:
 
         if not self.stack:
             return None
-        
-        trump_suit = trump_suit.lower()
-        first_suit = self.stack[0].suit[0].lower()
 
-        #gets all the trump cards in the current stack
-        trump_cards = [c for c in self.stack if c.suit[0].lower() == trump_suit]
+        card_ids = [card.card_id for card in self.stack]
+        winner = bitboard.trick_winner(card_ids, bitboard.suit_index(trump_suit))
 
-        if trump_cards:
-            return max(trump_cards, key=lambda c: c.value[1])
-        
-        follow_suit_cards = [
-        c for c in self.stack if c.suit[0].lower() == first_suit]
-
-        return max(follow_suit_cards, key=lambda c: c.value[1])
+        return self.stack[winner]
 
     def reset(self):
         """
@@ -131,14 +137,16 @@ class Table:
 
         self.stack = list()
 
-    def _has_suit(self, hand: list[Card], suit: str):
+    def _has_suit(self, hand: list[Card] | int, suit: str):
         """
         Returns boolean value depending on whether
         the suit is present in the hand
+
+        The hand can be a list of cards or a card mask
         """
 
-        return any(
-            card.suit[0].lower() == suit for card in hand)
+        hand = _hand_mask(hand)
+        return bitboard.has_suit(hand, bitboard.suit_index(suit))
 
     def play_card_to_table(self, card: Card, 
                         player: Player,
@@ -0,0 +1,152 @@
+from advisor import BackgroundAdvisor
+from Classes.DeckClass import Deck
+from Classes.GameManager import Game, Phase
+from Classes.PlayerClass import Player
+from Classes.ScoreboardClass import Scoreboard
+from Classes.TableClass import Table
+from Classes.UIManager import UIManager
+from game_state import GameState
+import probability_engine as pe
+from Utils import bitboard
+import pytest
+import threading
+
+
+@pytest.fixture
+def game():
+    game = Game.__new__(Game)  # bypass __init__
+    game.round = 1
+    game.cards_per_round = [3]
+    game.trump_suit = "Hearts"
+    game.phase = Phase.PLAYING
+    game.deck = Deck()
+    game.table = Table(UIManager())
+
+    alice = Player(name="Alice", opponent=False)
+    bob = Player(name="Bob")
+    carl = Player(name="Carl")
+    for initials in ("AH", "KS", "2C"):
+        alice.hand.append(game.deck.draw_card_from_initials(initials))
+    alice.own_hand()
+    alice.bid = 1
+
+    game.player_queue = [alice, bob, carl]
+    game.temp_player_queue = [bob, alice, carl]
+    game.scoreboard = Scoreboard(game.player_queue)
+
+    # Bob has led the trick
+    led = game.deck.draw_card_from_initials("JH")
+    led.owner = bob
+    game.table.stack.append(led)
+    return game
+
+
+class Test_GameStateFromGame():
+
+    def test_state_matches_game(self, game):
+        state = GameState.from_game(game, game.player_queue[0])
+
+        assert state.players == ["Bob", "Alice", "Carl"]
+        assert state.current_trick == [bitboard.initials_to_id("JH")]
+        assert state.hand_sizes == {"Bob": 2, "Carl": 3}
+        assert state.bids == {"Alice": 1}
+        assert pe.unseen_mask(state) == bitboard.hand_mask(game.deck.deck)
+
+    def test_state_can_be_evaluated(self, game):
+        state = GameState.from_game(game, game.player_queue[0])
+        stats = pe.evaluate_move(game_state=state, num_worlds=5, seed=1, workers=1)
+        assert set(stats) == {"AH"}
+
+    def test_bidding_ignores_last_trick(self, game):
+        game.phase = Phase.BIDDING
+        state = GameState.from_game(game, game.player_queue[0])
+
+        assert state.players == ["Alice", "Bob", "Carl"]
+        assert state.current_trick == []
+        assert state.hand_sizes == {"Bob": 3, "Carl": 3}
+
+
+class Test_BackgroundAdvisor():
+
+    def test_advice_ready_before_prompt_is_shown_in_prompt(self):
+        printed = []
+        advisor = BackgroundAdvisor(game=None, output=printed.append)
+
+        advisor.start(lambda cancel: "Advisor: play AH")
+        advisor.thread.join()
+
+        assert advisor.prompt_line() == "Advisor: play AH\n"
+        assert printed == []
+
+    def test_late_advice_is_printed(self):
+        printed = []
+        release = threading.Event()
+        advisor = BackgroundAdvisor(game=None, output=printed.append)
+
+        advisor.start(lambda cancel: release.wait() and "Advisor: play AH")
+        assert advisor.prompt_line() == ""
+        release.set()
+        advisor.thread.join()
+
+        assert printed == ["\nAdvisor: play AH"]
+
+    def test_cancel_stops_search_without_output(self):
+        printed = []
+        advisor = BackgroundAdvisor(game=None, output=printed.append)
+
+        advisor.start(lambda cancel: cancel.wait() and "Advisor: play AH")
+        advisor.prompt_line()
+        advisor.cancel()
+
+        assert advisor.thread is None
+        assert printed == []
+
+    def test_cancel_does_not_wait_for_a_stuck_search(self, monkeypatch):
+        monkeypatch.setattr("advisor.JOIN_SECONDS", 0.05)
+        release = threading.Event()
+        printed = []
+        advisor = BackgroundAdvisor(game=None, output=printed.append)
+
+        advisor.start(lambda cancel: release.wait() and "Advisor: play AH")
+        advisor.prompt_line()
+        advisor.cancel()
+        release.set()
+
+        assert advisor.thread is None
+        assert printed == []
+
+    def test_failed_search_is_reported(self):
+        def job(cancel):
+            raise ValueError("no deal fits the voids")
+
+        advisor = BackgroundAdvisor(game=None, output=print)
+        advisor.start(job)
+        advisor.thread.join()
+
+        assert isinstance(advisor.error, ValueError)
+        assert advisor.prompt_line() == "Advisor: no advice (no deal fits the voids)\n"
+
+    def test_advise_play_with_game(self, game):
+        printed = []
+        advisor = BackgroundAdvisor(game, budget_ms=100, output=printed.append)
+
+        advisor.advise_play(game.player_queue[0])
+        advisor.thread.join()
+
+        assert advisor.prompt_line().startswith("Advisor: play AH")
+
+    def test_ismcts_tree_follows_played_cards(self, game):
+        advisor = BackgroundAdvisor(game, budget_ms=100, output=print, engine="ismcts")
+        alice = game.player_queue[0]
+
+        advisor.advise_play(alice)
+        advisor.thread.join()
+        assert advisor.prompt_line().startswith("Advisor: play AH")
+
+        tree = advisor.trees["Alice"]
+        played = alice.hand[0]
+        alice.hand.remove(played)
+        advisor.observe(alice, played)
+
+        assert advisor.trees["Alice"] is tree
+        assert tree.root != 0
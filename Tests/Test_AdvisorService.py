@@ -0,0 +1,155 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from advisor_service import AdvisorService, AdvisorClient, SolveBatcher, TableSession
+from game_state import GameState
+import probability_engine as pe
+import pytest
+
+
+def table_state() -> dict:
+    state = GameState()
+    state.players = ["Bob", "Alice", "Carl"]
+    state.local_player = "Alice"
+    state.known_cards = ["AH", "KS", "2C", "9D"]
+    state.played_cards = ["3S"]
+    state.current_trick = ["JH"]
+    state.hand_sizes = {"Bob": 3, "Carl": 4}
+    state.trump = "Spades"
+    state.bids = {"Alice": 2}
+    state.tricks_won = {"Alice": 0}
+    return state.to_dict()
+
+
+def run(scenario, **kwargs):
+    """Runs scenario(client, service) against a service on a free local port"""
+    async def main():
+        service = AdvisorService(**{"workers": 0, "pool_size": 40,
+                                    "advice_worlds": 20, "bid_worlds": 100, **kwargs})
+        port = await service.start(port=0)
+        client = AdvisorClient()
+        await client.connect(port=port)
+        try:
+            return await scenario(client, service)
+        finally:
+            await client.close()
+            await service.close()
+    return asyncio.run(main())
+
+
+class Test_AdvisorService():
+
+    def test_advice_is_a_legal_card(self):
+        async def scenario(client, service):
+            await client.request("snapshot", table="t1", state=table_state(), seed=1)
+            return await client.request("advise", table="t1", budget_ms=None)
+
+        advice = run(scenario)
+
+        # hearts were led, so the ace of hearts or the king of trumps
+        assert advice["card"] in ("AH", "KS")
+        assert set(advice["stats"]) == {"AH", "KS"}
+        assert advice["worlds"] == 20
+        low, high = advice["win_interval"]
+        assert 0 <= low <= high <= 1
+
+    def test_events_update_the_table(self):
+        async def scenario(client, service):
+            await client.request("snapshot", table="t1", state=table_state(), seed=2)
+            await client.request("play", table="t1", player="Alice", card="AH")
+            await client.request("play", table="t1", player="Carl", card="QH")
+            return service.tables["t1"]
+
+        session = run(scenario)
+
+        # Alice's ace won the trick and she leads the next one
+        assert session.state.players == ["Alice", "Carl", "Bob"]
+        assert session.state.tricks_won["Alice"] == 1
+        assert session.state.current_trick == []
+        assert session.pool.hand_sizes == {"Bob": 3, "Carl": 3}
+        assert all(world["Carl"].bit_count() == 3 for world in session.pool.worlds)
+
+    def test_errors_are_reported_and_the_connection_kept(self):
+        async def scenario(client, service):
+            with pytest.raises(ValueError, match="Unknown table"):
+                await client.request("advise", table="missing")
+            with pytest.raises(ValueError, match="Unknown op"):
+                await client.request("shuffle", table="t1")
+            await client.request("snapshot", table="t1", state=table_state())
+            with pytest.raises(ValueError, match="not the next player"):
+                await client.request("play", table="t1", player="Carl", card="QH")
+            return await client.request("advise_bid", table="t1", seed=3)
+
+        advice = run(scenario)
+        assert 0 <= advice["bid"] <= 4
+
+    def test_unexpected_errors_are_answered(self):
+        async def scenario(client, service):
+            async def broken(request):
+                raise RuntimeError("solver crashed")
+
+            service.handlers["broken"] = broken
+            with pytest.raises(ValueError, match="RuntimeError: solver crashed"):
+                await client.request("broken", table="t1")
+            await client.request("snapshot", table="t1", state=table_state(), seed=4)
+            return await client.request("advise", table="t1", budget_ms=None)
+
+        advice = run(scenario)
+        assert advice["card"] in ("AH", "KS")
+        assert advice["inexact_worlds"] == 0
+
+    def test_concurrent_tables_share_batches(self):
+        async def scenario(client, service):
+            tables = [f"t{index}" for index in range(4)]
+            for index, table in enumerate(tables):
+                await client.request("snapshot", table=table, state=table_state(), seed=index)
+            advice = await asyncio.gather(*(client.request("advise", table=table)
+                                            for table in tables))
+            return advice, service.batcher.batches
+
+        advice, batches = run(scenario, window_ms=50)
+
+        assert len(advice) == 4
+        assert batches == 1
+
+    def test_budget_returns_the_worlds_solved_so_far(self):
+        state = GameState.from_dict(table_state())
+        payload = pe.compact_state(state)
+        worlds = TableSession(state, pool_size=40, seed=5).pool.seat_worlds(state.players)
+
+        async def solve():
+            batcher = SolveBatcher(ThreadPoolExecutor(max_workers=1), chunk_worlds=2,
+                                   job_worlds=8)
+            stats = await batcher.solve(payload, worlds, budget_ms=0)
+            return stats, batcher.jobs
+
+        stats, jobs = asyncio.run(solve())
+
+        # a zero budget still waits for the first chunk of worlds
+        assert {move.worlds for move in stats.values()} == {2}
+        assert jobs == 5
+
+    def test_batched_stats_match_a_direct_solve(self):
+        state = GameState.from_dict(table_state())
+        session = TableSession(state, pool_size=30, seed=4)
+        payload = pe.compact_state(state)
+        worlds = session.pool.seat_worlds(state.players)
+
+        async def solve():
+            batcher = SolveBatcher(chunk_worlds=4)
+            return await batcher.solve(payload, worlds)
+
+        batched = asyncio.run(solve())
+        direct = pe.solve_batch([(payload, worlds)])[0]
+        assert {card: stats.as_tuple() for card, stats in batched.items()} == direct
+
+
+class Test_GameStateEvents():
+
+    def test_dict_round_trip(self):
+        data = table_state()
+        assert GameState.from_dict(data).to_dict() == data
+
+    def test_local_player_must_hold_the_card(self):
+        state = GameState.from_dict(table_state())
+        with pytest.raises(ValueError):
+            state.record_play("Alice", "QD")
@@ -0,0 +1,64 @@
+# Contents of the benchmark suite test python file
+
+from benchmarks import suite, trick_allocations
+import json
+import tracemalloc
+
+
+def result(ops_per_s):
+    return {"ops_per_s": ops_per_s, "p50_us": 1.0, "p99_us": 2.0, "repeats": 3}
+
+
+class Test_Benchmarks():
+    """
+    Tests the measurements, history and regression check of the benchmark suite
+    """
+    def test_every_case_runs(self):
+        for name, case in suite.CASES.items():
+            if name.startswith("advisor"):
+                continue
+            run, ops = case(suite.random.Random(0))
+            run()
+            assert ops > 0
+
+    def test_measure_reports_latency_percentiles(self):
+        results = suite.run_suite(["table.verify_winner"], quick=True)
+        measured = results["table.verify_winner"]
+        assert measured["repeats"] >= 3
+        assert measured["ops_per_s"] > 0
+        assert 0 < measured["p50_us"] <= measured["p99_us"]
+
+    def test_regression_beyond_threshold_is_reported(self):
+        baseline = {"a": result(1000), "b": result(1000)}
+        results = {"a": result(800), "b": result(700), "c": result(1)}
+        regressions = suite.compare(results, baseline, threshold=0.25)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("b:")
+
+    def test_faster_runs_pass(self):
+        assert suite.compare({"a": result(2000)}, {"a": result(1000)}) == []
+
+    def test_runs_are_appended_to_the_history(self, tmp_path):
+        path = str(tmp_path / "results" / "history.json")
+        suite.record({"a": result(1)}, path)
+        suite.record({"a": result(2)}, path)
+        with open(path) as file:
+            history = json.load(file)
+        assert [entry["results"]["a"]["ops_per_s"] for entry in history] == [1, 2]
+
+    def test_blocks_held_between_snapshots_are_counted(self):
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            held = [object() for _ in range(100)]
+            allocated, net = trick_allocations.allocated_blocks(before, tracemalloc.take_snapshot())
+        finally:
+            tracemalloc.stop()
+        assert allocated >= len(held)
+        assert net <= allocated
+
+    def test_trick_allocations_report(self):
+        report = trick_allocations.benchmark(num_tricks=16)
+        assert report["tricks"] == 16
+        assert report["blocks_per_trick"] >= 0
+        assert report["us_per_trick"] > 0
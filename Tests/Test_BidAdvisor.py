@@ -0,0 +1,153 @@
+import bid_advisor as ba
+from Classes.PlayerClass import Player
+from Classes.ScoreboardClass import Scoreboard
+from game_state import GameState
+import probability_engine as pe
+from Utils import bitboard
+import numpy as np
+import pytest
+import random
+import threading
+import time
+
+
+def greedy_round(hands, trump, leader):
+    """Scalar version of the simulate_rounds policy, used as the reference"""
+    hands = list(hands)
+    tricks = [0] * len(hands)
+    is_trump = lambda card: bitboard.suit_of(card) == trump
+
+    while hands[leader]:
+        ids = bitboard.mask_to_ids(hands[leader])
+        side = [card for card in ids if not is_trump(card)]
+        lead = max(side or ids, key=bitboard.rank_of)
+        trick = [lead]
+        hands[leader] ^= bitboard.CARD_MASKS[lead]
+
+        for position in range(1, len(hands)):
+            seat = (leader + position) % len(hands)
+            legal = bitboard.mask_to_ids(
+                bitboard.legal_moves(hands[seat], bitboard.suit_of(lead), trump))
+            winning = [card for card in legal
+                       if bitboard.trick_winner(trick + [card], trump) == len(trick)]
+            if winning:
+                card = min(winning, key=lambda card: (is_trump(card), bitboard.rank_of(card)))
+            else:
+                card = min(legal, key=lambda card: (is_trump(card), bitboard.rank_of(card)))
+            trick.append(card)
+            hands[seat] ^= bitboard.CARD_MASKS[card]
+
+        leader = (leader + bitboard.trick_winner(trick, trump)) % len(hands)
+        tricks[leader] += 1
+    return tricks
+
+
+def to_array(deals):
+    array = np.zeros((len(deals), len(deals[0]), 52), dtype=bool)
+    for row, hands in enumerate(deals):
+        for seat, hand in enumerate(hands):
+            array[row, seat, bitboard.mask_to_ids(hand)] = True
+    return array
+
+
+@pytest.fixture
+def gs():
+    state = GameState()
+    state.players = ["Alice", "Bob", "Carl", "Dina", "Ed", "Fay"]
+    state.local_player = "Carl"
+    state.known_cards = ["5D", "7D", "QD", "5S", "8S", "QS", "5H", "KH"]
+    state.played_cards = ["2C"]
+    state.hand_sizes = {name: 8 for name in state.players if name != "Carl"}
+    state.trump = "Hearts"
+    return state
+
+
+class Test_BidAdvisor():
+
+    @pytest.mark.parametrize("max_cards", [6, 8])
+    def test_bid_score_matches_scoreboard(self, max_cards):
+        for bid in range(max_cards + 1):
+            for tricks in range(max_cards + 1):
+                player = Player(name="Alice", bid=bid, round_score=tricks)
+                scoreboard = Scoreboard([player])
+                scoreboard.update_total_scoreboard([player], max_cards=max_cards)
+
+                assert ba.bid_score(bid, tricks, max_cards) == \
+                    scoreboard.total_scoreboard["Alice"]
+
+    def test_expected_scores(self):
+        distribution = [0.5, 0.5, 0.0]
+        scores = ba.expected_scores(distribution, max_cards=2)
+
+        assert scores[0] == pytest.approx(0.5 * 10 + 0.5 * 1)
+        assert scores[1] == pytest.approx(0.5 * 0 + 0.5 * 11)
+        assert scores[2] == pytest.approx(0.5)
+
+    def test_best_bid_skips_forbidden_bid(self):
+        distribution = [0.1, 0.8, 0.1]
+        assert ba.best_bid(distribution, max_cards=2) == 1
+        assert ba.best_bid(distribution, max_cards=2, forbidden_bid=1) == 2
+
+    @pytest.mark.parametrize("players, cards", [(3, 8), (4, 6), (6, 7)])
+    def test_simulate_rounds_matches_scalar_policy(self, players, cards):
+        rng = random.Random(players * 10 + cards)
+        deals = []
+        for _ in range(50):
+            ids = rng.sample(range(52), players * cards)
+            deals.append([bitboard.hand_mask(ids[seat * cards:(seat + 1) * cards])
+                          for seat in range(players)])
+        trump = rng.randrange(-1, 4)
+
+        tricks = pe.simulate_rounds(to_array(deals), trump, leader=1)
+
+        for hands, row in zip(deals, tricks):
+            assert list(row) == greedy_round(hands, trump, leader=1)
+
+    def test_top_trumps_win_every_trick(self):
+        hands = [bitboard.hand_mask(["AH", "KH", "QH"]),
+                 bitboard.hand_mask(["2S", "3S", "4S"]),
+                 bitboard.hand_mask(["5D", "6D", "2H"])]
+        tricks = pe.simulate_rounds(to_array([hands]), bitboard.suit_index("H"))
+        assert list(tricks[0]) == [3, 0, 0]
+
+    def test_trick_distribution(self, gs):
+        distribution = ba.trick_distribution(gs, num_worlds=500, seed=1)
+
+        assert len(distribution) == 9
+        assert distribution.sum() == pytest.approx(1)
+        assert np.array_equal(distribution, ba.trick_distribution(gs, num_worlds=500, seed=1))
+
+    def test_recommend_bid_is_legal(self, gs):
+        advice = ba.recommend_bid(gs, seed=2)
+        forbidden = ba.recommend_bid(gs, forbidden_bid=advice.bid, seed=2)
+
+        assert forbidden.bid != advice.bid
+        assert forbidden.bid == max(
+            (bid for bid in advice.expected_scores if bid != advice.bid),
+            key=advice.expected_scores.get)
+
+    def test_latency(self, gs):
+        start = time.perf_counter()
+        ba.recommend_bid(gs)
+        assert time.perf_counter() - start < 0.5
+
+    def test_cancel_keeps_the_first_batch(self, gs):
+        cancel = threading.Event()
+        cancel.set()
+
+        advice = ba.recommend_bid(gs, seed=4, tables=None, cancel=cancel, batch_size=100)
+
+        assert advice.cancelled
+        assert advice.worlds == 100
+        assert advice.distribution.sum() == pytest.approx(1)
+        assert not ba.recommend_bid(gs, seed=4, tables=None, batch_size=100).cancelled
+
+    def test_opponent_bids_weight_deals(self, gs):
+        unweighted = ba.recommend_bid(gs, seed=3, tables=None)
+        gs.bids = {"Alice": 4, "Bob": 3}
+        weighted = ba.recommend_bid(gs, seed=3, tables=None)
+
+        assert unweighted.effective_worlds == pytest.approx(unweighted.worlds)
+        assert weighted.effective_worlds < weighted.worlds
+        assert weighted.distribution.sum() == pytest.approx(1)
+        assert not np.allclose(weighted.distribution, unweighted.distribution)
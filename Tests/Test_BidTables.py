@@ -0,0 +1,75 @@
+import bid_advisor as ba
+import bid_tables as bt
+from game_state import GameState
+from Utils import bitboard
+import numpy as np
+import pytest
+import shutil
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("tables") / "bid_tables.npy")
+    bt.save_tables(bt.build_tables(deals=3000, players=(4,), round_sizes=(3,), seed=1), path)
+    return path
+
+
+def keys_of(initials, trump, seat=0):
+    hand = np.zeros(52, dtype=bool)
+    hand[[bitboard.initials_to_id(card) for card in initials]] = True
+    return bt._keys(hand, bitboard.suit_index(trump), 4, len(initials), seat)
+
+
+class Test_BidTables():
+
+    def test_keys_ignore_side_suit_order(self):
+        assert keys_of(["AH", "2S", "3S", "KC"], "H") == keys_of(["AH", "2D", "3D", "KS"], "H")
+
+    def test_keys_are_relative_to_trump(self):
+        assert keys_of(["AH", "2S", "KC"], "H") == keys_of(["AS", "2H", "KC"], "S")
+        assert keys_of(["AH", "2S", "KC"], "H") != keys_of(["AH", "2S", "KC"], "S")
+
+    def test_keys_depend_on_seat(self):
+        assert keys_of(["AH", "2S", "KC"], "H", seat=0) != keys_of(["AH", "2S", "KC"], "H", seat=1)
+
+    def test_table_is_sorted_and_normalised(self, tables):
+        table = bt.load_tables(tables)
+
+        assert isinstance(table, np.memmap)
+        assert np.all(np.diff(table["key"].astype(np.float64)) >= 0)
+        assert np.allclose(table["probs"].sum(axis=1) / 65535, 1, atol=1e-3)
+
+    def test_lookup(self, tables):
+        hand = bitboard.hand_mask(["AH", "KH", "QS"])
+        distribution = bt.lookup(hand, bitboard.suit_index("H"), 4, 0, tables)
+
+        assert len(distribution) == 4
+        assert distribution.sum() == pytest.approx(1)
+        # two top trumps win at least two tricks against any play
+        assert distribution[:2].sum() == pytest.approx(0, abs=1e-3)
+
+    def test_lookup_without_tables(self, tmp_path):
+        hand = bitboard.hand_mask(["AH", "KH", "QS"])
+        assert bt.lookup(hand, 3, 4, 0, str(tmp_path / "missing.npy")) is None
+
+    def test_tables_built_after_a_miss_are_loaded(self, tables, tmp_path):
+        path = str(tmp_path / "late.npy")
+        assert bt.load_tables(path) is None
+
+        shutil.copy(tables, path)
+        assert bt.load_tables(path) is not None
+
+    def test_recommend_bid_uses_tables(self, tables):
+        state = GameState()
+        state.players = ["Alice", "Bob", "Carl", "Dina"]
+        state.local_player = "Alice"
+        state.known_cards = ["AH", "KH", "QS"]
+        state.hand_sizes = {"Bob": 3, "Carl": 3, "Dina": 3}
+        state.trump = "Hearts"
+
+        advice = ba.recommend_bid(state, tables=tables)
+        simulated = ba.recommend_bid(state, tables=None, seed=1)
+
+        assert advice.worlds == 0
+        assert simulated.worlds > 0
+        assert advice.bid == simulated.bid
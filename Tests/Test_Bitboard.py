@@ -0,0 +1,82 @@
+from Classes.CardClass import Card
+from Classes.DeckClass import Deck
+from Classes.PlayerClass import Player
+from Utils import bitboard
+import pytest
+
+
+class Test_Bitboard():
+
+    def test_deck_cards_have_unique_ids(self):
+        ids = {card.card_id for card in Deck().generate_deck()}
+        assert ids == set(range(52))
+
+    def test_id_round_trip(self):
+        for card_id in range(52):
+            card = Card.from_id(card_id)
+            assert card.card_id == card_id
+            assert bitboard.initials_to_id(card.initials) == card_id
+            assert bitboard.id_to_initials(card_id) == card.initials
+
+    @pytest.mark.parametrize(
+        "initials, expected_id",
+        [("2D", 0), ("AD", 12), ("2S", 13), ("10H", 47), ("AH", 51)]
+    )
+    def test_initials_to_id(self, initials, expected_id):
+        assert bitboard.initials_to_id(initials) == expected_id
+
+    def test_invalid_initials(self):
+        with pytest.raises(ValueError):
+            bitboard.initials_to_id("1X")
+
+    def test_non_deck_card_has_no_id(self):
+        assert Card(suit="Hearts", value="A").card_id is None
+
+    def test_highest_and_lowest_of_suit(self):
+        hand = bitboard.hand_mask(["3H", "QH", "AS", "2C"])
+        hearts = bitboard.suit_index("Hearts")
+
+        assert bitboard.highest_of_suit(hand, hearts) == bitboard.initials_to_id("QH")
+        assert bitboard.lowest_of_suit(hand, hearts) == bitboard.initials_to_id("3H")
+        assert bitboard.highest_of_suit(hand, bitboard.suit_index("D")) == -1
+
+    @pytest.mark.parametrize(
+        "hand, led, trump, expected",
+        [
+            (["3H", "QH", "AS", "2C"], "H", "D", ["3H", "QH"]),
+            (["3H", "QH", "AS", "2C"], "H", "S", ["3H", "QH", "AS"]),  # may trump
+            (["3H", "QH", "AS", "2C"], "D", "S", ["3H", "QH", "AS", "2C"]),
+            (["3H", "QH", "AS", "2C"], "", "S", ["3H", "QH", "AS", "2C"]),
+        ]
+    )
+    def test_legal_moves(self, hand, led, trump, expected):
+        legal = bitboard.legal_moves(bitboard.hand_mask(hand),
+                                     bitboard.suit_index(led),
+                                     bitboard.suit_index(trump))
+        assert legal == bitboard.hand_mask(expected)
+
+    @pytest.mark.parametrize(
+        "trick, trump, expected_position",
+        [
+            (["10D", "3H", "10C", "10H"], "S", 0),
+            (["5C", "10S", "AC", "10H"], "D", 2),
+            (["10D", "10S", "10C", "10H"], "H", 3),
+            (["10D", "2S", "AD", "3S"], "S", 3),
+            (["10D", "2S", "AD", "3S"], "", 2),
+        ]
+    )
+    def test_trick_winner(self, trick, trump, expected_position):
+        card_ids = [bitboard.initials_to_id(card) for card in trick]
+        assert bitboard.trick_winner(card_ids, bitboard.suit_index(trump)) == expected_position
+
+    def test_player_find_card(self):
+        player = Player(name="Alice")
+        player.hand = [Card.from_id(bitboard.initials_to_id("10H"))]
+
+        assert player.find_card("Hearts", "10")
+        assert not player.find_card("Spades", "10")
+        assert not player.find_card("Hearts", "Z")
+
+    @pytest.mark.parametrize("suit, expected", [(2, 2), (-1, -1), (4, -1), ("Clubs", 2)])
+    def test_suit_index_accepts_indexes(self, suit, expected):
+        assert bitboard.suit_index(suit) == expected
@@ -28,3 +28,73 @@ class Test_Scoreboard():
         
 
         
+
+class Test_IndexedDeck():
+
+    def test_cards_are_reused_between_rounds(self):
+        deck = Deck()
+        first = deck.draw_card_from_initials("QH")
+        deck.generate_deck()
+        assert deck.draw_card_from_initials("qh") is first
+        assert deck.cards[first.card_id] is first
+
+    def test_drawn_card_leaves_the_deck(self):
+        deck = Deck()
+        card = deck.draw_card_from_initials("10S")
+
+        assert card.initials == "10S"
+        assert card not in deck.deck
+        assert len(deck) == len(deck.deck) == 51
+        assert not deck.find_card("Spades", "10")
+        assert deck.find_card("spades", "9")
+        assert deck.draw_card_from_initials("10S") is None
+        assert "10S" in deck.removed_suit_initials
+        assert "10S" not in deck.generate_valid_card_initials()
+        with pytest.raises(ValueError):
+            deck.remove_card(card)
+
+    def test_reset_puts_every_card_back(self):
+        deck = Deck()
+        for initials in ("2C", "AH", "KD"):
+            deck.draw_card_from_initials(initials)
+        order = deck.deck[:]
+
+        deck.reset()
+
+        assert len(deck) == 52
+        assert deck.removed_suit_initials == set()
+        assert [card.initials for card in deck.deck] == [
+            card.initials for card in deck.order]
+        assert all(card in deck.deck for card in order)
+
+    def test_pop_deals_from_the_end_of_the_deck(self):
+        deck = Deck()
+        deck.draw_card_from_initials(deck.order[-1].initials)
+        expected = deck.deck[-3:]
+
+        dealt = [deck.pop() for _ in range(3)]
+
+        assert tuple(dealt) == expected[::-1]
+        assert len(deck) == 48
+
+    def test_deck_cannot_be_changed_in_place(self):
+        deck = Deck()
+
+        with pytest.raises(AttributeError):
+            deck.deck.pop()
+        assert len(deck) == 52
+
+    def test_drawn_card_has_no_owner_from_an_earlier_round(self):
+        deck = Deck()
+        card = deck.draw_card_from_initials("7C")
+        card.owner = Player(name="Alice", opponent=False)
+        deck.generate_deck()
+        assert deck.draw_card_from_initials("7C").owner is None
+
+    def test_deck_can_be_assigned(self):
+        deck = Deck()
+        deck.deck = [Card(("Clubs", "♣"), ("A", 14)), Card(("Hearts", "♥"), ("2", 2))]
+
+        assert len(deck) == 2
+        assert deck.generate_valid_card_initials() == {"AC", "2H"}
+        assert deck.pop().initials == "2H"
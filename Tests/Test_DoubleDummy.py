@@ -0,0 +1,123 @@
+from double_dummy import DoubleDummySolver, fewest_tricks, solve
+from Utils import bitboard
+import pytest
+import random
+
+
+def brute_force(hands, trump, leader, target, trick=(), fewest=False):
+    """
+    Plain minimax without pruning, used as the reference, of the most
+    tricks the target can win or with fewest the fewest it can win
+    """
+    hands = list(hands)
+    num_seats = len(hands)
+    trick = list(trick)
+
+    if len(trick) == num_seats:
+        winner = (leader + bitboard.trick_winner(trick, trump)) % num_seats
+        won = 1 if winner == target else 0
+        if not hands[winner]:
+            return won
+        return won + brute_force(hands, trump, winner, target, fewest=fewest)
+
+    seat = (leader + len(trick)) % num_seats
+    led = bitboard.suit_of(trick[0]) if trick else bitboard.NO_SUIT
+    results = []
+    for card in bitboard.mask_to_ids(bitboard.legal_moves(hands[seat], led, trump)):
+        next_hands = list(hands)
+        next_hands[seat] ^= bitboard.CARD_MASKS[card]
+        results.append(brute_force(next_hands, trump, leader, target, trick + [card], fewest))
+    return max(results) if (seat == target) != fewest else min(results)
+
+
+def deal(rng, players, cards):
+    ids = rng.sample(range(52), players * cards)
+    return [bitboard.hand_mask(ids[i * cards:(i + 1) * cards]) for i in range(players)]
+
+
+class Test_DoubleDummy():
+
+    @pytest.mark.parametrize("players, cards", [(3, 3), (3, 4), (4, 3), (5, 2)])
+    def test_matches_brute_force(self, players, cards):
+        rng = random.Random(players * 10 + cards)
+
+        for _ in range(25):
+            hands = deal(rng, players, cards)
+            trump = rng.randrange(-1, 4)
+            leader = rng.randrange(players)
+            target = rng.randrange(players)
+
+            assert solve(hands, trump, leader, target) == \
+                brute_force(hands, trump, leader, target)
+
+    @pytest.mark.parametrize("players, cards", [(3, 3), (4, 3), (5, 2)])
+    def test_fewest_tricks_match_brute_force(self, players, cards):
+        rng = random.Random(players * 100 + cards)
+
+        for _ in range(25):
+            hands = deal(rng, players, cards)
+            trump = rng.randrange(-1, 4)
+            leader = rng.randrange(players)
+            target = rng.randrange(players)
+
+            assert fewest_tricks(hands, trump, leader, target) == \
+                brute_force(hands, trump, leader, target, fewest=True)
+
+    def test_card_outcomes_match_brute_force(self):
+        rng = random.Random(7)
+
+        for _ in range(25):
+            hands = deal(rng, 4, 3)
+            trump = rng.randrange(-1, 4)
+            leader = rng.randrange(4)
+            target = (leader + 1) % 4
+
+            # the leader has already played a card
+            led_card = bitboard.mask_to_ids(hands[leader])[0]
+            hands[leader] ^= bitboard.CARD_MASKS[led_card]
+
+            outcomes = DoubleDummySolver(trump, target).card_outcomes(
+                hands, leader, [led_card])
+
+            legal = bitboard.legal_moves(hands[target], bitboard.suit_of(led_card), trump)
+            assert set(outcomes) == set(bitboard.mask_to_ids(legal))
+
+            for card, tricks in outcomes.items():
+                next_hands = list(hands)
+                next_hands[target] ^= bitboard.CARD_MASKS[card]
+                assert tricks == brute_force(next_hands, trump, leader, target,
+                                             [led_card, card])
+
+    def test_top_trumps_are_sure_tricks(self):
+        hands = [bitboard.hand_mask(["AS", "KS", "2D"]),
+                 bitboard.hand_mask(["QS", "AD", "KD"]),
+                 bitboard.hand_mask(["3D", "4D", "5D"])]
+
+        assert solve(hands, bitboard.suit_index("S"), leader=1, target=0) == 2
+
+    def test_node_budget_gives_lower_bound(self):
+        rng = random.Random(3)
+        hands = deal(rng, 5, 5)
+        exact = solve(hands, 0, 0, 1)
+
+        solver = DoubleDummySolver(0, 1, max_nodes=5)
+        bounded = solver.solve(hands, 0)
+
+        assert bounded <= exact
+        if not solver.exact:
+            # the solver state is restored after hitting the budget
+            assert solver.hands == hands
+
+    def test_cut_short_cards_are_listed_as_inexact(self):
+        rng = random.Random(4)
+        hands = deal(rng, 5, 5)
+        exact = DoubleDummySolver(0, 1).card_outcomes(hands, 0)
+
+        solver = DoubleDummySolver(0, 1, max_nodes=5)
+        bounded = solver.card_outcomes(hands, 0)
+
+        assert solver.inexact and not solver.exact
+        for card, tricks in bounded.items():
+            assert tricks <= exact[card]
+            if card not in solver.inexact:
+                assert tricks == exact[card]
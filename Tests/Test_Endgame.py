@@ -0,0 +1,167 @@
+from double_dummy import DoubleDummySolver
+import endgame
+from game_state import GameState
+import probability_engine as pe
+from Utils import bitboard
+from math import comb
+import os
+import pytest
+import random
+import threading
+import time
+
+
+def masks(*hands):
+    return [bitboard.hand_mask(hand) for hand in hands]
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    # the engine's caches are loaded from, and saved to, tmp_path
+    path = str(tmp_path / "cache.npy")
+    monkeypatch.setattr(endgame, "DEFAULT_PATH", path)
+    monkeypatch.setattr(endgame, "_caches", {})
+    return path
+
+
+@pytest.fixture
+def endgame_gs():
+    state = GameState()
+    state.players = ["Bob", "Alice", "Carl"]
+    state.local_player = "Alice"
+    state.known_cards = ["AH", "KS", "2C"]
+    state.current_trick = ["JH"]
+    state.hand_sizes = {"Bob": 2, "Carl": 3}
+    state.trump = "Spades"
+    state.bids = {"Alice": 1}
+    unseen = bitboard.hand_mask(["QH", "3H", "AS", "4C", "5D", "6D"])
+    seen = unseen | bitboard.hand_mask(state.known_cards + state.current_trick)
+    state.played_cards = bitboard.mask_to_ids(bitboard.FULL_MASK & ~seen)
+    return state
+
+
+class Test_CanonicalKey():
+
+    def test_side_suits_are_interchangeable(self):
+        hands = masks(["AD", "2C"], ["KD", "3C"])
+        swapped = masks(["AC", "2D"], ["KC", "3D"])
+
+        assert endgame.canonical_key(hands, 3, 0, [], 0) == \
+            endgame.canonical_key(swapped, 3, 0, [], 0)
+
+    def test_dead_cards_do_not_matter(self):
+        hands = masks(["AD", "2C"], ["KD", "3C"])
+        lower = masks(["9D", "2C"], ["7D", "3C"])
+
+        assert endgame.canonical_key(hands, 3, 0, [], 0) == \
+            endgame.canonical_key(lower, 3, 0, [], 0)
+
+    def test_trump_and_target_matter(self):
+        hands = masks(["AD", "2C"], ["KD", "3C"])
+        key = endgame.canonical_key(hands, 3, 0, [], 0)
+
+        assert key != endgame.canonical_key(hands, 0, 0, [], 0)
+        assert key != endgame.canonical_key(hands, 3, 0, [], 1)
+
+
+class Test_CardOutcomes():
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_double_dummy(self, seed):
+        rng = random.Random(seed)
+        ids = rng.sample(range(52), 12)
+        # the leader has played a card, the others still hold three
+        hands = [bitboard.hand_mask(ids[:2])] + [
+            bitboard.hand_mask(ids[i:i + 3]) for i in range(3, 12, 3)]
+        trick = [ids[2]]
+        trump = rng.randrange(4)
+
+        cache = endgame.EndgameCache()
+        outcomes = endgame.card_outcomes(hands, trump, 0, trick, 1, cache)
+
+        expected = DoubleDummySolver(trump, 1).card_outcomes(hands, 0, trick)
+        assert outcomes == expected
+        # a second call is answered from the cache alone
+        assert endgame.card_outcomes(hands, trump, 0, trick, 1, cache) == expected
+        assert cache.added == len(expected)
+
+    def test_cache_round_trip(self, tmp_path):
+        path = str(tmp_path / "cache.npy")
+        cache = endgame.EndgameCache(path)
+        cache.put(2 ** 64 - 1, 3)
+        cache.put(12345, 0)
+        cache.save()
+
+        loaded = endgame.EndgameCache(path)
+        assert loaded.entries == {2 ** 64 - 1: 3, 12345: 0}
+        assert loaded.added == 0
+
+    def test_failed_save_keeps_the_entries(self, tmp_path):
+        (tmp_path / "file").write_text("")
+        cache = endgame.EndgameCache(str(tmp_path / "file" / "cache.npy"))
+        cache.put(12345, 0)
+
+        with pytest.warns(UserWarning):
+            assert not cache.save()
+        assert cache.added == 1
+
+
+class Test_ExactMoveStats():
+
+    def test_deals_cover_every_consistent_deal(self, endgame_gs):
+        pool = pe.unseen_mask(endgame_gs)
+        seats = [(1, 2, (0, 1, 2, 3)), (2, 3, (0, 1, 2))]
+
+        found = list(endgame.deals(pool, seats))
+
+        sampler = pe.WorldSampler(pool, {1: 2, 2: 3}, {2: [3]})
+        assert len(found) == sampler.count_deals()
+        assert len({(deal[1], deal[2]) for deal in found}) == len(found)
+        for deal in found:
+            assert not deal[2] & bitboard.SUIT_MASKS[3]
+
+    def test_count_without_voids(self, endgame_gs):
+        sampler = pe.WorldSampler(pe.unseen_mask(endgame_gs), {1: 2, 2: 3})
+        assert sampler.count_deals() == comb(6, 2) * comb(4, 3)
+
+    def test_evaluate_move_solves_every_deal(self, endgame_gs, cache_path):
+        stats = pe.evaluate_move(game_state=endgame_gs, num_worlds=7, workers=1)
+
+        assert set(stats) == {"AH", "KS"}
+        assert all(move.worlds == comb(6, 2) * comb(4, 3) for move in stats.values())
+        expected, made = {}, {}
+        seats = [(0, 2, range(4)), (2, 3, range(4))]
+        trick = [bitboard.initials_to_id("JH")]
+        for deal in endgame.deals(pe.unseen_mask(endgame_gs), seats):
+            hands = [deal[0], bitboard.hand_mask(endgame_gs.known_cards), deal[2]]
+            solver = DoubleDummySolver(bitboard.suit_index("S"), 1)
+            avoider = DoubleDummySolver(bitboard.suit_index("S"), 1, avoid=True)
+            avoided = avoider.card_outcomes(hands, 0, trick)
+            for card, tricks in solver.card_outcomes(hands, 0, trick).items():
+                initials = bitboard.id_to_initials(card)
+                expected.setdefault(initials, []).append(tricks)
+                # the bid of 1 is made exactly
+                made.setdefault(initials, []).append(3 - avoided[card] <= 1 <= tricks)
+        for card, move in stats.items():
+            assert move.tricks == sum(expected[card])
+            assert move.wins == sum(made[card])
+        # solved positions are only written when the cache is saved
+        assert not os.path.exists(cache_path)
+        endgame.save_caches()
+        assert len(endgame.EndgameCache(cache_path)) > 0
+
+    def test_cancel_stops_the_deals(self, endgame_gs):
+        payload = pe.compact_state(endgame_gs)
+        cancel = threading.Event()
+        cancel.set()
+
+        assert pe.exact_move_stats(payload, endgame.EndgameCache(), cancel=cancel) == {}
+
+        stats = pe.exact_move_stats(payload, endgame.EndgameCache(),
+                                    deadline=time.monotonic() + 60)
+        assert all(move.worlds == comb(6, 2) * comb(4, 3) for move in stats.values())
+
+    def test_large_positions_are_sampled(self, endgame_gs):
+        endgame_gs.played_cards = []
+        payload = pe.compact_state(endgame_gs)
+        assert pe.exact_move_stats(payload, endgame.EndgameCache()) is None
@@ -0,0 +1,160 @@
+import os
+import numpy as np
+import event_log
+from event_log import EventLog, GameRecord, read_games, EVENT_DTYPE
+from Classes.GameManager import Phase
+from Classes.HeadlessGame import HeadlessGame, BidAwareAgent
+from Classes.ReplayGame import replay, state_at
+import pytest
+
+ROUNDS = [3, 2, 3]
+
+
+def log_games(path, seeds, agent=BidAwareAgent, players=3):
+    """Plays and logs one game per seed, returning the final scores"""
+    with EventLog(str(path)) as log:
+        return [HeadlessGame([agent(seat) for seat in range(players)], seed=seed,
+                             cards_per_round=ROUNDS, event_log=log).play()
+                for seed in seeds]
+
+
+@pytest.fixture
+def logged(tmp_path):
+    path = tmp_path / "games.log"
+    scores = log_games(path, range(3))
+    return path, scores
+
+
+class Test_EventLog():
+
+    def test_games_are_read_back(self, logged):
+        path, _ = logged
+        games = read_games(str(path))
+
+        assert len(games) == 3
+        for game in games:
+            assert game.names == ["Player 1", "Player 2", "Player 3"]
+            assert game.opponents == [False] * 3
+            assert game.cards_per_round == ROUNDS
+            assert game.events["kind"][-1] == event_log.END
+            assert len(game.of_kind(event_log.PLAY)) == 3 * sum(ROUNDS)
+            assert len(game.of_kind(event_log.TRICK)) == sum(ROUNDS)
+            assert len(game.of_kind(event_log.BID)) == 3 * len(ROUNDS)
+
+    def test_every_card_played_was_drawn_for_its_player(self, logged):
+        path, _ = logged
+        for game in read_games(str(path)):
+            drawn = {(seat, card) for _, seat, card, _ in game.of_kind(event_log.DRAW).tolist()}
+            for _, seat, card, _ in game.of_kind(event_log.PLAY).tolist():
+                assert (seat, card) in drawn
+
+    def test_games_are_appended(self, logged):
+        path, _ = logged
+        log_games(path, [7])
+        assert len(read_games(str(path))) == 4
+
+    def test_unfinished_game_is_dropped(self, logged):
+        path, _ = logged
+        size = os.path.getsize(path)
+        with open(path, "ab") as file:
+            file.write(bytes([event_log.GAME, 0, 1, 1, 3, 0, 1]) + b"A" + bytes(4 * 5))
+
+        assert len(read_games(str(path))) == 3
+        # opening the log again cuts the unfinished game off before appending
+        EventLog(str(path)).close()
+        assert os.path.getsize(path) == size
+
+    @pytest.mark.parametrize("header", [
+        bytes([event_log.GAME, 0]),
+        bytes([event_log.GAME, 0, 2, 1, 3, 0, 5]) + b"Al",
+        bytes([event_log.GAME, 0, 1, 1, 3, 0, 1]) + b"A",
+    ])
+    def test_truncated_header_is_dropped(self, logged, header):
+        path, _ = logged
+        size = os.path.getsize(path)
+        with open(path, "ab") as file:
+            file.write(header)
+
+        assert len(read_games(str(path))) == 3
+        EventLog(str(path)).close()
+        assert os.path.getsize(path) == size
+
+    def test_minus_one_is_stored_as_a_byte(self, tmp_path):
+        with EventLog(str(tmp_path / "games.log")) as log:
+            log.start_game(["Alice"], [False], [1])
+            log.append(event_log.TRUMP, value=-1)
+            with pytest.raises(ValueError):
+                log.append(event_log.DRAW, value=256)
+            with pytest.raises(ValueError):
+                log.append(event_log.BID, seat=-2)
+            log.end_game()
+
+        game, = read_games(str(tmp_path / "games.log"))
+        assert game.of_kind(event_log.TRUMP)["value"].tolist() == [event_log.MINUS_ONE]
+        assert len(game.events) == 2
+
+    def test_long_names_are_refused(self, tmp_path):
+        with EventLog(str(tmp_path / "games.log")) as log:
+            with pytest.raises(ValueError):
+                log.start_game(["é" * 128], [False], [1])
+            assert not log.in_game
+
+    def test_other_files_are_refused(self, tmp_path):
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"not a log at all")
+        with pytest.raises(ValueError):
+            read_games(str(path))
+
+
+class Test_Replay():
+
+    def test_replay_reaches_the_logged_scores(self, logged):
+        path, scores = logged
+        for game, score in zip(read_games(str(path)), scores):
+            replayed = replay(game)
+            assert replayed.phase == Phase.GAME_OVER
+            assert replayed.scoreboard.total_scoreboard == score
+
+    def test_state_after_the_first_card(self, logged):
+        path, _ = logged
+        game = read_games(str(path))[0]
+        first_play = int(np.flatnonzero(game.events["kind"] == event_log.PLAY)[0])
+        _, seat, card, _ = game.events[first_play].tolist()
+        next_player = game.names[(seat + 1) % 3]
+
+        state = state_at(game, first_play + 1, next_player)
+
+        assert state.current_trick == [card]
+        assert len(state.known_cards) == ROUNDS[0]
+        assert state.hand_sizes[game.names[seat]] == ROUNDS[0] - 1
+        assert len(state.bids) == 3
+
+    def test_diverging_log_is_detected(self, logged):
+        path, _ = logged
+        game = read_games(str(path))[0]
+        events = game.events.copy()
+        # the log now claims the first trick went to another player
+        trick = np.flatnonzero(events["kind"] == event_log.TRICK)[0]
+        events["seat"][trick] = (events["seat"][trick] + 1) % 3
+
+        with pytest.raises(ValueError, match="diverged"):
+            replay(GameRecord(game.names, game.opponents, game.cards_per_round, events))
+
+    def test_remote_opponents_declare_their_cards(self, logged):
+        path, scores = logged
+        game = read_games(str(path))[0]
+        # as logged by the console game: an opponent's cards are drawn as played
+        rows = []
+        for kind, seat, value, extra in game.events.tolist():
+            if kind == event_log.DRAW and seat == 1:
+                continue
+            if kind == event_log.PLAY and seat == 1:
+                rows.append((event_log.DRAW, seat, value, 0))
+            rows.append((kind, seat, value, extra))
+        record = GameRecord(game.names, [False, True, False], game.cards_per_round,
+                            np.array(rows, dtype=EVENT_DTYPE))
+
+        replayed = replay(record)
+
+        assert replayed.scoreboard.total_scoreboard == scores[0]
+        assert all(not player.hand for player in replayed.player_queue)
@@ -36,31 +36,18 @@ def game():
     game.round = 1
     game.cards_per_round = [3]  # keep test small
 
-    # fake deck with identifiable cards
-    game.deck = type("FakeDeck", (), {})()
+    # deck stacked with identifiable cards
+    game.deck = Deck()
 
     game.deck.deck = [
-        Card(("Club", "♣"), ("Ace", 14)),
-        Card(("Club", "♣"), ("Queen", 12)),
-        Card(("Club", "♣"), ("King", 13)),
-        Card(("Club", "♣"), ("Jack", 11)), 
-        Card(("Club", "♣"), ("10", 10)),
-        Card(("Club", "♣"), ("9", 9))
+        Card(("Clubs", "♣"), ("A", 14)),
+        Card(("Clubs", "♣"), ("Q", 12)),
+        Card(("Clubs", "♣"), ("K", 13)),
+        Card(("Clubs", "♣"), ("J", 11)),
+        Card(("Clubs", "♣"), ("10", 10)),
+        Card(("Clubs", "♣"), ("9", 9))
     ]
 
-    def pop(index=0):
-        return game.deck.deck.pop(index)
-
-    def draw_card_from_initials(initials):
-        for card in game.deck.deck:
-            if card.to_initials() == initials:
-                game.deck.deck.remove(card)
-                return card
-        return None
-
-    game.deck.pop = pop
-    game.deck.draw_card_from_initials = draw_card_from_initials
-
     # players
     local = Player(name="Local", opponent=False)
     remote = Player(name="Remote", opponent=True)
@@ -172,3 +159,17 @@ def test_handle_hand_assignment(game):
 
     for card in remote.hand:
         assert card.owner == remote
+
+
+def test_trump_messages_go_through_the_output_hooks(capsys):
+    game = Game.__new__(Game)  # bypass __init__
+    messages = []
+    game.output = lambda *args: messages.append(args)
+    game.clear_screen = lambda delay=1.5: None
+    game.deck = Deck()
+
+    card = game.select_trump_automatically()
+
+    assert game.trump_suit == card.suit[0]
+    assert len(messages) == 2
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,105 @@
+from Classes.DeckClass import Deck
+from Classes.GameManager import Game, Phase
+from Classes.PlayerClass import Player
+from Classes.ScoreboardClass import Scoreboard
+from Classes.TableClass import Table
+from Classes.UIManager import UIManager
+from game_state import GameState
+import probability_engine as pe
+from Utils import bitboard
+import pytest
+from unittest.mock import MagicMock
+
+
+@pytest.fixture
+def state():
+    state = GameState()
+    state.known_cards = ["AH", "KH", "2C", "3C"]
+    state.hand_sizes = {"Bob": 4, "Carl": 4}
+    state.players = ["Bob", "Carl", "Alice"]
+    state.local_player = "Alice"
+    state.trump = "Spades"
+    state.update_suit_lengths()
+    return state
+
+
+class Test_Constraints():
+
+    def test_off_suit_play_sets_a_void(self, state):
+        state.record_play("Bob", "9D")
+        state.record_play("Carl", "5H")  # neither diamonds nor a trump
+        assert state.void_flags == {"Carl": 1 << bitboard.suit_index("D")}
+        assert state.allowed_suits("Carl") == (1, 2, 3)
+        assert not state.allowed_cards("Carl") & bitboard.SUIT_MASKS[0]
+        assert state.suit_length_range("Carl", 0) == (0, 0)
+
+    def test_trumping_is_not_a_void(self, state):
+        state.record_play("Bob", "9D")
+        state.record_play("Carl", "5S")
+        assert state.void_flags == {}
+
+    def test_suit_lengths_follow_the_voids(self, state):
+        for suit in ("D", "C", "H"):
+            state.record_void("Bob", bitboard.suit_index(suit))
+        # Bob's four cards must all be spades
+        assert state.suit_length_range("Bob", bitboard.suit_index("S")) == (4, 4)
+        assert state.suit_length_range("Carl", bitboard.suit_index("S")) == (0, 4)
+
+    def test_void_suit_cannot_be_played(self, state):
+        state.record_void("Bob", bitboard.suit_index("D"))
+        assert not state.legal_cards("Bob") & bitboard.CARD_MASKS[bitboard.initials_to_id("9D")]
+        with pytest.raises(ValueError):
+            state.record_play("Bob", "9D")
+
+    def test_local_legal_cards_follow_suit(self, state):
+        state.record_play("Bob", "9C")
+        state.record_play("Carl", "10C")
+        assert state.legal_cards("Alice") == bitboard.hand_mask(["2C", "3C"])
+
+    def test_voids_reach_the_sampler_and_survive_a_round_trip(self, state):
+        state.record_void("Bob", bitboard.suit_index("H"))
+        for world in pe.generate_worlds(state, num_worlds=50, seed=1):
+            assert not world["Bob"] & bitboard.SUIT_MASKS[bitboard.suit_index("H")]
+        assert GameState.from_dict(state.to_dict()).void_flags == state.void_flags
+
+    def test_game_voids_reach_the_state(self):
+        game = Game.__new__(Game)  # bypass __init__
+        game.round = 1
+        game.cards_per_round = [3]
+        game.trump_suit = "Hearts"
+        game.phase = Phase.PLAYING
+        game.deck = Deck()
+        game.table = Table(UIManager())
+        game.void_flags = {}
+        game.output = lambda *args: None
+        game.advisor = MagicMock()
+        game.event_log = None
+        alice = Player(name="Alice", opponent=False)
+        bob = Player(name="Bob")
+        carl = Player(name="Carl")
+        alice.hand.append(game.deck.draw_card_from_initials("AH"))
+        game.player_queue = [alice, bob, carl]
+        game.temp_player_queue = game.player_queue
+        game.scoreboard = Scoreboard(game.player_queue)
+        game.table.stack.append(game.deck.draw_card_from_initials("JC"))
+        card = game._materialise_played_card(bob, "4D")
+        game._remote_play_card(bob, card)
+
+        assert game.void_flags == {"Bob": 1 << bitboard.suit_index("C")}
+        assert GameState.from_game(game, alice).void_flags == game.void_flags
+
+    def test_local_plays_record_voids(self):
+        game = Game.__new__(Game)  # bypass __init__
+        game.trump_suit = "Hearts"
+        game.deck = Deck()
+        game.table = Table(UIManager())
+        game.void_flags = {}
+        game.advisor = MagicMock()
+        game.event_log = None
+        bob = Player(name="Bob", opponent=False)
+        card = game.deck.draw_card_from_initials("4D")
+        bob.hand.append(card)
+        game.table.stack.append(game.deck.draw_card_from_initials("JC"))
+
+        assert game._local_play_card(bob, card)
+        assert game.void_flags == {"Bob": 1 << bitboard.suit_index("C")}
@@ -0,0 +1,55 @@
+# Contents of the Card and Hand test python file
+
+from Classes.CardClass import Card
+from Classes.PlayerClass import Player, Hand
+from Utils import bitboard
+import pytest
+
+
+@pytest.fixture
+def player():
+    return Player(name="1", hand=[Card.from_id(card_id) for card_id in (0, 13, 26, 39)])
+
+
+class Test_Hand():
+    """
+    Tests the slotted Card and the mask kept by a player's Hand
+    """
+    def test_cards_compare_by_id(self):
+        assert Card.from_id(5) == Card.from_id(5)
+        assert Card.from_id(5) != Card.from_id(6)
+        assert hash(Card.from_id(5)) == hash(Card.from_id(5))
+        assert len({Card.from_id(5), Card.from_id(5), Card.from_id(6)}) == 2
+
+    def test_cards_have_no_dict(self):
+        with pytest.raises(AttributeError):
+            Card.from_id(0).colour = "red"
+
+    def test_assigned_hand_becomes_a_hand(self, player):
+        assert isinstance(player.hand, Hand)
+        assert player.hand_mask() == bitboard.hand_mask([0, 13, 26, 39])
+        player.hand = []
+        assert isinstance(player.hand, Hand)
+        assert player.hand_mask() == 0
+
+    def test_mask_follows_the_hand(self, player):
+        card = Card.from_id(7)
+        player.hand.append(card)
+        assert card in player.hand
+        assert player.find_card("D", "9")
+        player.remove_card(Card.from_id(7))
+        assert card not in player.hand
+        assert not player.find_card("D", "9")
+        player.hand.pop(0)
+        del player.hand[0]
+        assert player.hand_mask() == bitboard.hand_mask([26, 39])
+
+    def test_index_of(self, player):
+        assert player.hand.index_of(26) == 2
+        assert player.hand.index_of(27) == -1
+
+    def test_cards_without_an_id(self):
+        card = Card(("Club", "♣"), ("Joker", 0))
+        hand = Hand([card])
+        assert card in hand
+        assert hand.mask == 0
@@ -0,0 +1,115 @@
+from bid_advisor import bid_score
+from Classes.GameManager import Phase
+from Classes.HeadlessGame import (HeadlessGame, BitboardGame, RandomAgent, GreedyAgent,
+                                  BidAwareAgent, AdvisorAgent)
+from Utils import bitboard
+import pytest
+
+
+class RecordingGame(HeadlessGame):
+    """Keeps every player's bid and tricks before each round is scored"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rounds = []
+
+    def handle_scoring_phase(self):
+        self.rounds.append({player.name: (player.bid, player.round_score)
+                            for player in self.player_queue})
+        super().handle_scoring_phase()
+
+
+class IllegalAgent(RandomAgent):
+
+    def play(self, game, player, legal):
+        illegal = player.hand_mask() & ~legal
+        if illegal:
+            return bitboard.mask_to_ids(illegal)[0]
+        return super().play(game, player, legal)
+
+
+class Test_HeadlessGame():
+
+    def test_full_game_is_scored_every_round(self):
+        game = RecordingGame([RandomAgent(seed) for seed in range(6)], seed=1)
+
+        scores = game.play()
+
+        assert game.phase == Phase.GAME_OVER
+        assert len(game.rounds) == 6
+        for cards, round_results in zip(game.cards_per_round, game.rounds):
+            assert sum(tricks for _, tricks in round_results.values()) == cards
+        for name, score in scores.items():
+            assert score == sum(bid_score(*results[name], cards)
+                                for cards, results in zip(game.cards_per_round, game.rounds))
+
+    def test_last_bid_avoids_the_forbidden_bid(self):
+        game = RecordingGame([GreedyAgent() for _ in range(4)], seed=2)
+        game.play()
+
+        for cards, results in zip(game.cards_per_round, game.rounds):
+            bids = [bid for bid, _ in results.values()]
+            assert sum(bids) != cards
+
+    def test_same_seed_same_game(self):
+        first = HeadlessGame([GreedyAgent(seed) for seed in range(5)], seed=3).play()
+        second = HeadlessGame([GreedyAgent(seed) for seed in range(5)], seed=3).play()
+        assert first == second
+
+    def test_hits_count_rounds_with_the_bid_made(self):
+        game = RecordingGame([BidAwareAgent(seed) for seed in range(4)], seed=6)
+        game.play()
+
+        for name, hits in game.hits.items():
+            assert hits == sum(bid == tricks for bid, tricks in
+                               (results[name] for results in game.rounds))
+
+    def test_same_seed_deals_the_same_cards_to_any_agents(self):
+        class DealRecordingGame(HeadlessGame):
+            def handle_hand_assignment(self):
+                super().handle_hand_assignment()
+                self.deals = getattr(self, "deals", []) + [
+                    [player.hand_mask() for player in self.player_queue]]
+
+        first = DealRecordingGame([RandomAgent(seed) for seed in range(4)], seed=7)
+        second = DealRecordingGame([BidAwareAgent(seed) for seed in range(4)], seed=7)
+        first.play()
+        second.play()
+        assert first.deals == second.deals
+
+    def test_illegal_card_is_refused(self):
+        game = HeadlessGame([IllegalAgent(seed) for seed in range(4)], seed=4)
+        with pytest.raises(ValueError):
+            game.play()
+
+    def test_no_console_output(self, capsys):
+        HeadlessGame([RandomAgent(seed) for seed in range(3)], seed=5).play()
+        assert capsys.readouterr().out == ""
+
+    def test_deck_must_cover_the_hands(self):
+        with pytest.raises(ValueError):
+            HeadlessGame([RandomAgent() for _ in range(7)])
+
+
+class Test_BitboardGame():
+
+    @pytest.mark.parametrize("agent", [RandomAgent, GreedyAgent, BidAwareAgent])
+    @pytest.mark.parametrize("players", [3, 4, 6])
+    def test_scores_match_headless_game(self, agent, players):
+        for seed in range(3):
+            headless = HeadlessGame([agent(index) for index in range(players)], seed=seed)
+            game = BitboardGame([agent(index) for index in range(players)], seed=seed)
+
+            assert game.play() == headless.play()
+            assert game.hits == headless.hits
+
+    def test_mixed_agents_match_headless_game(self):
+        agents = lambda: [RandomAgent(0), GreedyAgent(1), BidAwareAgent(2), RandomAgent(3)]
+        headless = HeadlessGame(agents(), seed=8, cards_per_round=[1, 4, 8])
+        game = BitboardGame(agents(), seed=8, cards_per_round=[1, 4, 8])
+
+        assert game.play() == headless.play()
+
+    def test_agents_need_bitboard_methods(self):
+        with pytest.raises(ValueError):
+            BitboardGame([AdvisorAgent(), RandomAgent()])
@@ -0,0 +1,142 @@
+from game_state import GameState
+from inference import InferenceTracker, DECK
+import probability_engine as pe
+from Utils import bitboard
+import numpy as np
+import pytest
+import random
+
+
+@pytest.fixture
+def gs():
+    state = GameState()
+    state.known_cards = ["AH", "KH", "2C", "3C", "4D", "5D", "6S", "7S"]
+    state.hand_sizes = {"Bob": 8, "Carl": 8, "Dina": 8}
+    state.players = ["Ann", "Bob", "Carl", "Dina"]
+    state.local_player = "Ann"
+    state.trump = "Hearts"
+    return state
+
+
+@pytest.fixture
+def tracker(gs):
+    return InferenceTracker(gs, pool_size=300, seed=1)
+
+
+def play(tracker, state, name, card):
+    """Records a play in the game state and passes its void flags to the tracker"""
+    state.record_play(name, card)
+    tracker.observe_play(name, card, state.void_flags)
+
+
+class Test_InferenceTracker():
+
+    def test_every_card_in_play_is_somewhere(self, tracker):
+        matrix = tracker.probabilities()
+        assert matrix.shape == (52, 5)
+        assert np.allclose(matrix.sum(axis=1), 1.0)
+        assert matrix[bitboard.initials_to_id("AH"), 0] == 1.0
+        # every deal gives the three opponents 8 of the 44 unseen cards
+        assert matrix[:, 1:4].sum(axis=0) == pytest.approx([8, 8, 8])
+
+    def test_played_cards_leave_the_matrix(self, tracker, gs):
+        play(tracker, gs, "Ann", "AH")
+        play(tracker, gs, "Bob", "QH")
+        matrix = tracker.probabilities()
+        assert not matrix[bitboard.initials_to_id("AH")].any()
+        assert not matrix[bitboard.initials_to_id("QH")].any()
+        assert tracker.describe("QH") == "QH has been played"
+
+    def test_updates_match_a_rebuild(self, tracker, gs):
+        tracker.observe_bid("Bob", 2)
+        play(tracker, gs, "Ann", "2C")
+        play(tracker, gs, "Bob", "9H")
+        play(tracker, gs, "Carl", "QC")
+        counts, total = tracker.counts.copy(), tracker.total
+        tracker._rebuild()
+        assert np.allclose(counts, tracker.counts)
+        assert total == pytest.approx(tracker.total)
+
+    def test_voids_come_from_the_game_state(self, tracker, gs):
+        # Bob neither follows clubs nor trumps
+        play(tracker, gs, "Ann", "2C")
+        play(tracker, gs, "Bob", "9D")
+        assert gs.void_flags == {"Bob": 1 << bitboard.suit_index("C")}
+        assert tracker.voids == {"Bob": {bitboard.suit_index("C")}}
+        clubs = np.arange(52) // bitboard.RANKS == 2
+        assert not tracker.probabilities()[clubs, 1].any()
+
+    def test_bids_move_the_high_cards(self, tracker):
+        ace = bitboard.initials_to_id("AS")
+        before = tracker.probabilities()[ace, 1]
+        tracker.observe_bid("Bob", 0)
+        assert tracker.probabilities()[ace, 1] < before
+        assert np.allclose(tracker.probabilities().sum(axis=1), 1.0)
+
+    def test_holders_are_sorted(self, tracker):
+        holders = tracker.holders("QS")
+        assert [name for name, _ in holders][0] == DECK
+        assert sum(probability for _, probability in holders) == pytest.approx(1.0)
+        assert tracker.holders("AH") == [("Ann", 1.0)]
+
+
+class Test_ProposalSampler():
+
+    def test_uniform_proposal_needs_no_correction(self, gs):
+        pool = pe.unseen_mask(gs)
+        probabilities = {name: np.full(52, 8 / 44) for name in gs.hand_sizes}
+        sampler = pe.ProposalSampler(pool, gs.hand_sizes, probabilities=probabilities)
+        rng = random.Random(0)
+        for _ in range(50):
+            world, correction = sampler.sample(rng)
+            assert correction == pytest.approx(1.0)
+            assert {name: bitboard.count(hand) for name, hand in world.items()} == gs.hand_sizes
+
+    def test_corrected_deals_match_uniform_deals(self, gs):
+        tracker = InferenceTracker(gs, pool_size=300, seed=2)
+        tracker.observe_bid("Bob", 3)
+        voids = {"Carl": {"Spades"}}
+        sampler = pe.ProposalSampler(pe.unseen_mask(gs), gs.hand_sizes, voids,
+                                     tracker.proposal())
+        rng = random.Random(1)
+        held = np.zeros(52)
+        total = 0.0
+        for _ in range(4000):
+            world, correction = sampler.sample(rng)
+            assert not world["Carl"] & bitboard.SUIT_MASKS[1]
+            held += correction * held_cards(world["Bob"])
+            total += correction
+        assert total / 4000 == pytest.approx(1.0, abs=0.1)
+        # Bob holds each of the unseen spades a uniform deal would give him
+        spades = [card_id for card_id in bitboard.mask_to_ids(pe.unseen_mask(gs))
+                  if card_id // bitboard.RANKS == 1]
+        assert (held[spades] / total).mean() == pytest.approx(8 / 33, abs=0.05)
+
+    def test_corrections_scale_weights_before_rounding(self, gs):
+        gs.bids = {"Bob": 3}
+        payload = pe.compact_state(gs)
+        trump, _, _, _, pool, opponents, _, reference = payload
+        sampler = pe.ProposalSampler(pool, {index: size for index, size, *_ in opponents})
+        rng = random.Random(3)
+        worlds = [tuple(world[index] for index, *_ in opponents)
+                  for world in (sampler.sample(rng)[0] for _ in range(20))]
+
+        weights = pe.world_weights(worlds, opponents, trump, reference)
+        halved = pe.world_weights(worlds, opponents, trump, reference, [np.log(0.5)] * 20)
+        assert all(abs(2 * half - weight) <= 1 for half, weight in zip(halved, weights))
+
+    def test_log_corrections_match_corrections(self, gs):
+        sampler = pe.ProposalSampler(pe.unseen_mask(gs), gs.hand_sizes)
+        world, correction = sampler.sample(random.Random(4))
+        same, log_correction = sampler.sample_log(random.Random(4))
+        assert world == same
+        assert np.exp(log_correction) == pytest.approx(correction, rel=1e-3)
+
+    def test_recommend_samples_from_a_proposal(self, tracker, gs):
+        recommendation = pe.recommend(gs, budget_ms=100, seed=1,
+                                      proposal=tracker.proposal())
+        assert recommendation.card in gs.known_cards
+
+
+def held_cards(mask: int) -> np.ndarray:
+    return np.array([bool(mask >> card_id & 1) for card_id in range(52)], dtype=float)
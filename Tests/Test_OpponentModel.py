@@ -0,0 +1,124 @@
+import opponent_model as om
+import probability_engine as pe
+import random as random_module
+from Utils import bitboard
+import numpy as np
+import pytest
+
+
+def hand_array(initials):
+    return om.masks_to_array(bitboard.hand_mask(initials))
+
+
+class Test_TrickModel():
+
+    def test_masks_to_array(self):
+        masks = [bitboard.hand_mask(["2D", "AH"]), 0]
+        array = om.masks_to_array(masks)
+
+        assert array.shape == (2, 52)
+        assert list(np.flatnonzero(array[0])) == [0, 51]
+        assert not array[1].any()
+
+    def test_strong_hands_expect_more_tricks(self):
+        trump = bitboard.suit_index("H")
+        strong = hand_array(["AH", "KH", "QH", "JH", "AS", "AC"])
+        weak = hand_array(["2D", "3D", "4S", "5S", "6C", "7C"])
+
+        estimates = om.estimate_tricks(np.stack([strong, weak]), trump, 4)
+        assert estimates[0] > estimates[1] + 2
+
+    def test_bid_likelihood(self):
+        trump = bitboard.suit_index("H")
+        strong = hand_array(["AH", "KH", "QH", "JH", "AS", "AC"])
+        weak = hand_array(["2D", "3D", "4S", "5S", "6C", "7C"])
+        hands = np.stack([strong, weak])
+
+        high_bid = om.bid_likelihood(5, hands, trump, 4)
+        assert high_bid[0] > 10 * high_bid[1]
+        assert np.all(om.bid_likelihood(-1, hands, trump, 4) == 1)
+
+    def test_no_trump(self):
+        hands = hand_array(["AH", "AS", "AC", "AD"])
+        assert om.estimate_tricks(hands, bitboard.NO_SUIT, 4) > 0
+
+    def test_hand_estimate_matches_batch_estimate(self):
+        rng = random_module.Random(4)
+        for _ in range(200):
+            hand = bitboard.hand_mask(rng.sample(range(52), rng.randrange(9)))
+            trump = rng.randrange(-1, 4)
+            expected = om.estimate_tricks(om.masks_to_array(hand), trump, 5)
+            assert om.estimate_hand_tricks(hand, trump, 5) == pytest.approx(float(expected))
+
+
+def random_states(rng, count):
+    """Returns random (hand, led, best, trump, need) states of a seat to move"""
+    states = []
+    for _ in range(count):
+        ids = rng.sample(range(52), rng.randrange(1, 9))
+        hand = bitboard.hand_mask(ids[1:] or ids)
+        trump = rng.randrange(-1, 4)
+        if rng.random() < 0.3:
+            led, best = -1, -1
+        else:
+            led = bitboard.suit_of(ids[0])
+            best = om._score(ids[0], led, trump)
+        states.append((hand, led, best, trump, rng.randrange(-1, 3)))
+    return states
+
+
+class Test_Policies():
+
+    @pytest.mark.parametrize("name", ["greedy", "bid_aware"])
+    def test_batch_policy_matches_reference(self, name):
+        rng = random_module.Random(1)
+        policy = om.POLICIES[name]
+        reference = om.REFERENCE_POLICIES[name]
+
+        for trump in range(-1, 4):
+            states = [state for state in random_states(rng, 300) if state[3] == trump]
+            hands = om.masks_to_array([state[0] for state in states])
+            led = np.array([state[1] for state in states])
+            best = np.array([state[2] for state in states])
+            need = np.array([state[4] for state in states])
+
+            cards = policy(hands, led, best, trump, need)
+
+            for state, card in zip(states, cards):
+                hand, led_suit, best_score, _, seat_need = state
+                assert card == reference(hand, led_suit, best_score, trump, seat_need)
+
+    @pytest.mark.parametrize("name", ["greedy", "bid_aware"])
+    def test_mask_policy_matches_reference(self, name):
+        policy = om.MASK_POLICIES[name]
+        reference = om.REFERENCE_POLICIES[name]
+
+        for state in random_states(random_module.Random(2), 2000):
+            assert policy(*state) == reference(*state)
+
+    def test_random_plays_every_legal_card(self):
+        hand = bitboard.hand_mask(["2H", "9H", "AS", "3C"])
+        hands = om.masks_to_array([hand] * 2000)
+        led = np.full(2000, bitboard.suit_index("H"))
+        best = np.full(2000, -1)
+
+        cards = om.random(hands, led, best, bitboard.suit_index("S"),
+                          rng=np.random.default_rng(2))
+
+        legal = bitboard.legal_moves(hand, bitboard.suit_index("H"), bitboard.suit_index("S"))
+        assert set(cards.tolist()) == set(bitboard.mask_to_ids(legal))
+
+    @pytest.mark.parametrize("name", ["greedy", "bid_aware"])
+    def test_rollouts_match_reference(self, name):
+        rng = np.random.default_rng(3)
+        order = rng.random((100, 52)).argsort(axis=1)[:, :20].reshape(100, 4, 5)
+        hands = np.zeros((100, 4, 52), dtype=bool)
+        hands[np.arange(100)[:, None, None], np.arange(4)[None, :, None], order] = True
+        bids = rng.integers(-1, 3, (100, 4))
+
+        batch = pe.simulate_rounds(hands, 2, leader=1, policy=om.POLICIES[name], bids=bids)
+        scalar = pe.simulate_rounds_reference(hands, 2, leader=1,
+                                              policy=om.REFERENCE_POLICIES[name], bids=bids)
+
+        assert np.array_equal(batch, scalar)
+        assert np.all(batch.sum(axis=1) == 5)
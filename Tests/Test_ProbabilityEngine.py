@@ -0,0 +1,466 @@
+from collections import Counter
+from Classes.CardClass import Card
+from Classes.TableClass import Table
+from Classes.UIManager import UIManager
+import endgame
+from game_state import GameState
+import probability_engine as pe
+from Utils import bitboard
+import numpy as np
+import pytest
+import random
+import threading
+import time
+
+
+@pytest.fixture
+def gs():
+    state = GameState()
+    state.known_cards = ["AH", "KH", "2C", "3C", "4D", "5D", "6S", "7S"]
+    state.played_cards = ["QH"]
+    state.current_trick = ["JH"]
+    state.hand_sizes = {"Bob": 8, "Carl": 8, "Dina": 8}
+    return state
+
+
+class Test_GenerateWorlds():
+
+    def test_worlds_deal_unseen_cards(self, gs):
+        seen = bitboard.hand_mask(gs.known_cards + gs.played_cards + gs.current_trick)
+
+        for world in pe.generate_worlds(gs, num_worlds=50, seed=1):
+            dealt = 0
+            for hand in world.values():
+                assert not dealt & hand
+                dealt |= hand
+
+            assert {name: bitboard.count(hand) for name, hand in world.items()} == gs.hand_sizes
+            assert not seen & dealt
+
+    def test_worlds_honour_voids(self, gs):
+        voids = {"Bob": {"Hearts", "Spades"}, "Carl": {"Diamonds"}}
+
+        for world in pe.generate_worlds(gs, num_worlds=200, voids=voids, seed=2):
+            assert not world["Bob"] & (bitboard.SUIT_MASKS[3] | bitboard.SUIT_MASKS[1])
+            assert not world["Carl"] & bitboard.SUIT_MASKS[0]
+
+    def test_tight_constraints_never_fail(self):
+        # only one deal fits: Bob takes the hearts, Carl takes the spades
+        state = GameState()
+        state.known_cards = bitboard.mask_to_ids(
+            bitboard.SUIT_MASKS[0] | bitboard.SUIT_MASKS[2])
+        state.played_cards = ["2H", "3H", "4H", "5H", "6H", "7H", "8H", "9H",
+                              "2S", "3S", "4S", "5S", "6S", "7S", "8S", "9S"]
+        state.hand_sizes = {"Bob": 5, "Carl": 5}
+        voids = {"Bob": {"S"}, "Carl": {"H"}}
+
+        for world in pe.generate_worlds(state, num_worlds=20, voids=voids, seed=3):
+            assert world["Bob"] == bitboard.hand_mask(["10H", "JH", "QH", "KH", "AH"])
+            assert world["Carl"] == bitboard.hand_mask(["10S", "JS", "QS", "KS", "AS"])
+
+    def test_impossible_constraints_raise(self, gs):
+        voids = {"Bob": {"D", "S", "C", "H"}}
+
+        with pytest.raises(ValueError):
+            next(pe.generate_worlds(gs, voids=voids))
+
+    def test_worlds_are_uniform(self):
+        # 3 unseen cards, Bob holds one and is void in spades
+        state = GameState()
+        state.known_cards = bitboard.mask_to_ids(
+            bitboard.FULL_MASK & ~bitboard.hand_mask(["2H", "3H", "2S"]))
+        state.hand_sizes = {"Bob": 1, "Carl": 1}
+        voids = {"Bob": {"S"}}
+
+        counts = Counter(
+            (world["Bob"], world["Carl"])
+            for world in pe.generate_worlds(state, num_worlds=4000, voids=voids, seed=4)
+        )
+
+        # four consistent deals, each equally likely
+        assert len(counts) == 4
+        for count in counts.values():
+            assert 800 < count < 1200
+
+    def test_seed_is_reproducible(self, gs):
+        first = list(pe.generate_worlds(gs, num_worlds=5, seed=9))
+        second = list(pe.generate_worlds(gs, num_worlds=5, seed=9))
+        assert first == second
+
+
+class Test_DealHands():
+
+    def test_hands_are_disjoint_and_from_the_pool(self):
+        pool = bitboard.FULL_MASK & ~bitboard.SUIT_MASKS[0]
+        hands = pe.deal_hands(np.random.default_rng(1), 20, 4, 8, pool)
+
+        assert hands.shape == (20, 4, 52)
+        assert (hands.sum(axis=2) == 8).all()
+        assert (hands.sum(axis=1) <= 1).all()
+        assert not hands[:, :, :bitboard.RANKS].any()
+
+    def test_pool_too_small(self):
+        with pytest.raises(ValueError):
+            pe.deal_hands(np.random.default_rng(1), 1, 3, 5, bitboard.SUIT_MASKS[0])
+
+
+class Test_SimulateTrick():
+
+    def test_matches_verify_winner(self):
+        rng = random.Random(5)
+        table = Table(UIManager())
+        trumps = ["", "Diamonds", "Spades", "Clubs", "Hearts"]
+
+        for players in range(3, 7):
+            tricks = [rng.sample(range(52), players) for _ in range(500)]
+            trump_names = [rng.choice(trumps) for _ in tricks]
+
+            winners = pe.simulate_trick(
+                np.array(tricks),
+                trump=[bitboard.suit_index(trump) for trump in trump_names],
+                led=[bitboard.suit_of(trick[0]) for trick in tricks])
+
+            for trick, trump, winner in zip(tricks, trump_names, winners):
+                table.stack = [Card.from_id(card_id) for card_id in trick]
+                assert table.stack[winner] == table.verify_winner(trump)
+
+    def test_scalar_trump_and_led(self):
+        tricks = [[bitboard.initials_to_id(c) for c in ("5C", "10S", "AC", "10H")],
+                  [bitboard.initials_to_id(c) for c in ("5C", "2D", "AC", "10H")]]
+
+        winners = pe.simulate_trick(tricks, trump=bitboard.suit_index("D"), led=2)
+
+        assert list(winners) == [2, 1]
+
+
+@pytest.fixture
+def small_gs():
+    state = GameState()
+    state.players = ["Bob", "Alice", "Carl"]
+    state.local_player = "Alice"
+    state.known_cards = ["AH", "KS", "2C", "9D"]
+    state.played_cards = ["3S"]
+    state.current_trick = ["JH"]
+    state.hand_sizes = {"Bob": 3, "Carl": 4}
+    state.trump = "Spades"
+    state.bids = {"Alice": 2}
+    state.tricks_won = {"Alice": 1}
+    return state
+
+
+class Test_EvaluateMove():
+
+    def test_stats_cover_legal_moves(self, small_gs):
+        stats = pe.evaluate_move(game_state=small_gs, num_worlds=20, seed=1, workers=1)
+
+        # must follow hearts or trump
+        assert set(stats) == {"AH", "KS"}
+        for move in stats.values():
+            assert move.worlds == 20
+            assert 0 <= move.wins <= move.worlds
+            assert 0 <= move.mean_tricks <= 4
+
+    def test_single_card(self, small_gs):
+        move = pe.evaluate_move("AH", small_gs, num_worlds=10, seed=2, workers=1)
+        assert move == pe.evaluate_move(game_state=small_gs, num_worlds=10,
+                                        seed=2, workers=1)["AH"]
+
+        with pytest.raises(ValueError):
+            pe.evaluate_move("2C", small_gs, num_worlds=10, seed=2, workers=1)
+
+    def test_same_result_for_any_worker_count(self, small_gs):
+        single = pe.evaluate_move(game_state=small_gs, num_worlds=40, seed=3, workers=1)
+        pooled = pe.evaluate_move(game_state=small_gs, num_worlds=40, seed=3, workers=2)
+        assert single == pooled
+
+    def test_only_the_exact_bid_is_a_win(self):
+        assert pe.made_bid({0: 3, 1: 1}, 3, 1, lambda: {0: 3, 1: 2}) == {0: True, 1: True}
+        # the card can win every trick but cannot be held to one
+        assert pe.made_bid({0: 3}, 3, 1, lambda: {0: 1}) == {0: False}
+        assert pe.made_bid({0: 3}, 3, -1, lambda: {0: 3}) == {0: False}
+
+    def test_a_made_bid_avoids_overtricks(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(endgame, "DEFAULT_PATH", str(tmp_path / "cache.npy"))
+        monkeypatch.setattr(endgame, "_caches", {})
+        # Bob holds the 3D and 4C: the AS wins a trick Alice did not bid for
+        state = GameState()
+        state.players = ["Alice", "Bob"]
+        state.local_player = "Alice"
+        state.known_cards = ["AS", "2D"]
+        state.played_cards = bitboard.mask_to_ids(
+            bitboard.FULL_MASK & ~bitboard.hand_mask(["AS", "2D", "3D", "4C"]))
+        state.hand_sizes = {"Bob": 2}
+        state.trump = "Hearts"
+        state.bids = {"Alice": 0}
+
+        stats = pe.evaluate_move(game_state=state, num_worlds=1, workers=1)
+
+        assert stats["2D"].win_rate == 1.0
+        assert stats["AS"].win_rate == 0.0
+
+    def test_cut_short_solves_are_counted_apart(self):
+        state = GameState()
+        state.players = ["Bob", "Alice", "Carl"]
+        state.local_player = "Alice"
+        state.known_cards = ["AH", "KS", "2C", "9D", "10H", "5S", "7C", "QD"]
+        state.current_trick = ["JH"]
+        state.hand_sizes = {"Bob": 7, "Carl": 8}
+        state.trump = "Spades"
+        state.bids = {"Alice": 2}
+
+        pe._init_worker(pe.compact_state(state), max_nodes=50)
+        stats = pe._evaluate_chunk(1, 10)
+
+        for values in stats.values():
+            move = pe.MoveStats(*values)
+            assert move.worlds + move.inexact == 10
+        assert any(pe.MoveStats(*values).inexact for values in stats.values())
+
+    def test_local_player_must_be_next(self, small_gs):
+        small_gs.current_trick = []
+        with pytest.raises(ValueError):
+            pe.evaluate_move(game_state=small_gs, num_worlds=1, workers=1)
+
+
+class Test_Recommend():
+
+    def test_ties_go_to_the_card_closest_to_the_bid(self):
+        high, low = pe.MoveStats(), pe.MoveStats()
+        high.add(2, False)
+        low.add(0, False)
+        assert pe.best_card({"QS": high, "2D": low}, 0) == "2D"
+        assert pe.best_card({"QS": high, "2D": low}, 2) == "QS"
+        low.add(0, True)
+        assert pe.best_card({"QS": high, "2D": low}, 2) == "2D"
+
+    @pytest.mark.parametrize("engine", pe.ENGINES)
+    def test_state_is_compacted_once(self, small_gs, monkeypatch, engine):
+        calls = []
+        compact_state = pe.compact_state
+        monkeypatch.setattr(pe, "compact_state",
+                            lambda *args: calls.append(args) or compact_state(*args))
+
+        pe.recommend(small_gs, budget_ms=50, seed=1, engine=engine)
+
+        assert len(calls) == 1
+
+    def test_recommends_a_legal_card(self, small_gs):
+        advice = pe.recommend(small_gs, budget_ms=200, seed=1)
+
+        assert advice.card in {"AH", "KS"}
+        assert set(advice.stats) == {"AH", "KS"}
+        assert advice.worlds > 0
+        assert advice.inexact_worlds == 0
+
+        low, high = advice.win_interval()
+        assert 0 <= low <= advice.stats[advice.card].win_rate <= high <= 1
+        low, high = advice.tricks_interval()
+        assert low <= advice.stats[advice.card].mean_tricks <= high
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_respects_budget(self, small_gs, workers):
+        start = time.monotonic()
+        pe.recommend(small_gs, budget_ms=300, workers=workers)
+        assert time.monotonic() - start < 1.0
+
+    def test_searches_share_the_worker_pool(self, small_gs):
+        pe.evaluate_move(game_state=small_gs, num_worlds=40, seed=3, workers=2)
+        executor = pe._executor
+        # the workers pick up the new position
+        small_gs.bids = {"Alice": 3}
+        pooled = pe.evaluate_move(game_state=small_gs, num_worlds=40, seed=3, workers=2)
+
+        assert pe._executor is executor
+        assert pooled == pe.evaluate_move(game_state=small_gs, num_worlds=40,
+                                          seed=3, workers=1)
+        pe.shutdown_workers()
+        assert pe._executor is None
+
+    def test_cancel(self, small_gs):
+        cancel = threading.Event()
+        cancel.set()
+
+        start = time.monotonic()
+        advice = pe.recommend(small_gs, budget_ms=10_000, cancel=cancel)
+
+        assert time.monotonic() - start < 1.0
+        assert advice.cancelled
+        assert advice.card in {"AH", "KS"}
+
+
+class Test_ISMCTS():
+
+    def test_stats_cover_legal_moves(self, small_gs):
+        tree = pe.ISMCTS(seed=1)
+        stats = tree.search(small_gs, iterations=300)
+
+        assert set(stats) == {bitboard.initials_to_id("AH"), bitboard.initials_to_id("KS")}
+        assert sum(move.worlds for move in stats.values()) == 300
+        for move in stats.values():
+            assert 0 <= move.wins <= move.worlds
+            assert 0 <= move.mean_tricks <= 4
+
+    def test_finds_the_only_winning_card(self):
+        # Bob holds the 3C, the last unseen card: AH makes the bid of 2, 2H cannot
+        state = GameState()
+        state.players = ["Bob", "Alice"]
+        state.local_player = "Alice"
+        state.known_cards = ["AH", "2H"]
+        state.current_trick = ["KH"]
+        state.played_cards = bitboard.mask_to_ids(
+            bitboard.FULL_MASK & ~bitboard.hand_mask(["AH", "2H", "KH", "3C"]))
+        state.hand_sizes = {"Bob": 1}
+        state.trump = "Spades"
+        state.bids = {"Alice": 2}
+
+        advice = pe.recommend(state, budget_ms=100, engine="ismcts", seed=2)
+
+        assert advice.card == "AH"
+        assert advice.stats["AH"].win_rate == 1.0
+        assert advice.stats["2H"].win_rate == 0.0
+
+    def test_search_continues_the_tree(self, small_gs):
+        tree = pe.ISMCTS(seed=3)
+        tree.search(small_gs, iterations=100)
+        stats = tree.search(small_gs, iterations=100)
+
+        assert tree.iterations == 200
+        assert sum(move.worlds for move in stats.values()) == 200
+
+    def test_advance_reuses_the_subtree(self, small_gs):
+        tree = pe.ISMCTS(seed=4)
+        stats = tree.search(small_gs, iterations=200)
+        card = bitboard.initials_to_id("AH")
+        child = tree.children[card]
+
+        tree.advance(card)
+
+        assert tree.root == child
+        assert tree.visits[tree.root] == stats[card].worlds
+
+        tree.advance("2C")  # held by Alice, so never searched for Carl
+        assert tree.root == 0 and tree.root_key is None
+
+    def test_unknown_engine(self, small_gs):
+        with pytest.raises(ValueError):
+            pe.recommend(small_gs, budget_ms=10, engine="oracle")
+
+
+class Test_WorldPool():
+
+    def test_played_card_filters_worlds(self, gs):
+        pool = pe.WorldPool(gs, target=200, seed=1)
+        card = bitboard.initials_to_id("10H")
+        holders = [world for world in pool.worlds if world["Bob"] & bitboard.CARD_MASKS[card]]
+
+        pool.observe("Bob", "10H")
+
+        assert len(pool.worlds) == 200
+        assert pool.sampled == 200 + 200 - len(holders)
+        assert pool.hand_sizes["Bob"] == 7
+        for world in pool.worlds:
+            assert bitboard.count(world["Bob"]) == 7
+            assert not any(hand & bitboard.CARD_MASKS[card] for hand in world.values())
+
+    def test_kept_worlds_lose_the_played_card(self, gs):
+        pool = pe.WorldPool(gs, target=100, seed=2)
+        before = [(world, dict(world)) for world in pool.worlds]
+
+        pool.observe("Carl", "9D")
+
+        kept = [(world, old) for world, old in before
+                if any(world is current for current in pool.worlds)]
+        assert kept
+        for world, old in kept:
+            assert world["Carl"] == old["Carl"] ^ bitboard.CARD_MASKS[bitboard.initials_to_id("9D")]
+            assert world["Bob"] == old["Bob"]
+
+    def test_revealed_void_is_honoured(self, gs):
+        pool = pe.WorldPool(gs, target=100, seed=3)
+        pool.observe("Dina", "2D", {"Dina": 1 << bitboard.suit_index("Hearts")})
+
+        assert pool.voids["Dina"] == {bitboard.suit_index("Hearts")}
+        for world in pool.worlds:
+            assert not world["Dina"] & bitboard.SUIT_MASKS[bitboard.suit_index("Hearts")]
+
+    def test_voids_come_from_the_game_state(self, gs):
+        gs.void_flags = {"Dina": 1 << bitboard.suit_index("Hearts")}
+        pool = pe.WorldPool(gs, target=50, seed=4)
+        assert pool.voids == {"Dina": {bitboard.suit_index("Hearts")}}
+
+        pool.observe("Dina", "2S", {})
+        assert pool.voids == {"Dina": {bitboard.suit_index("Hearts")}}
+        for world in pool.worlds:
+            assert not world["Dina"] & bitboard.SUIT_MASKS[bitboard.suit_index("Hearts")]
+
+    def test_evaluate_move_uses_pool(self, small_gs):
+        pool = pe.WorldPool(small_gs, target=10, seed=5)
+        pooled = pe.evaluate_move(game_state=small_gs, num_worlds=10, workers=1, pool=pool)
+        again = pe.evaluate_move(game_state=small_gs, num_worlds=10, workers=2, pool=pool)
+        assert pooled == again
+
+
+class Test_WorldWeights():
+
+    def test_unweighted_without_bids(self, small_gs):
+        stats = pe.evaluate_move("AH", small_gs, num_worlds=10, seed=1, workers=1)
+        assert stats.weight == 10 * pe.WEIGHT_SCALE
+        assert stats.effective_worlds == pytest.approx(10)
+        assert stats.win_rate == stats.wins / stats.worlds
+
+    def test_opponent_bids_weight_worlds(self, small_gs):
+        small_gs.bids["Carl"] = 4
+        payload = pe.compact_state(small_gs)
+        opponents = payload[5]
+        sampler = pe.WorldSampler(payload[4], {index: size for index, size, *_ in opponents})
+        rng = random.Random(1)
+        worlds = [tuple(world[index] for index, *_ in opponents)
+                  for world in (sampler.sample(rng) for _ in range(200))]
+
+        weights = pe.world_weights(worlds, opponents, payload[0])
+
+        # worlds giving Carl more trumps explain a bid of 4 better
+        carl = [index for index, (seat, *_) in enumerate(opponents) if seat == 2][0]
+        spades = bitboard.SUIT_MASKS[bitboard.suit_index("S")]
+        trumps = [bitboard.count(world[carl] & spades) for world in worlds]
+        heavy = [w for w, t in zip(weights, trumps) if t >= 2]
+        light = [w for w, t in zip(weights, trumps) if t == 0]
+        assert sum(heavy) / len(heavy) > sum(light) / len(light)
+
+    def test_unlikely_bids_keep_their_weight(self):
+        rng = random.Random(3)
+        ids = rng.sample(range(bitboard.NUM_CARDS), 48)
+        state = GameState()
+        state.players = [f"Player {seat}" for seat in range(6)]
+        state.local_player = state.players[0]
+        state.known_cards = ids[:8]
+        state.hand_sizes = {name: 8 for name in state.players[1:]}
+        state.trump = "Hearts"
+        state.bids = dict(zip(state.players[1:], [7, 6, 7, 6, 7]))
+        payload = pe.compact_state(state)
+        opponents = payload[5]
+        sampler = pe.WorldSampler(payload[4], {index: size for index, size, *_ in opponents})
+        worlds = [tuple(world[index] for index, *_ in opponents)
+                  for world in (sampler.sample(rng) for _ in range(64))]
+
+        # the likelihood of five such bids is far below 1 / WEIGHT_SCALE
+        assert not any(pe.world_weights(worlds, opponents, payload[0]))
+        assert any(pe.world_weights(worlds, opponents, payload[0], payload[-1]))
+
+    def test_zero_weights_fall_back_to_counts(self):
+        stats = pe.MoveStats()
+        stats.add(2, True, 0)
+        stats.add(0, False, 0)
+        assert stats.win_rate == 0.5
+        assert stats.mean_tricks == 1.0
+        with pytest.warns(RuntimeWarning):
+            pe.check_weights({0: stats})
+
+    def test_weighted_stats_are_deterministic(self, small_gs):
+        small_gs.bids["Carl"] = 3
+        single = pe.evaluate_move(game_state=small_gs, num_worlds=30, seed=3, workers=1)
+        pooled = pe.evaluate_move(game_state=small_gs, num_worlds=30, seed=3, workers=2)
+
+        assert single == pooled
+        for stats in single.values():
+            assert 0 < stats.effective_worlds < stats.worlds
@@ -161,3 +161,50 @@ class TestOpponentPlaysCard():
 
         assert isinstance(result, str)
         assert result in vci or (result == 'BACK')
+
+
+class Test_PlayerPlayCardLegality():
+
+    @pytest.fixture
+    def hand_player(self):
+        deck = Deck()
+        p = Player(name="Alice", opponent=False)
+        p.hand = [deck.draw_card_from_initials(initials) for initials in ("2C", "AH", "KS")]
+        return p
+
+    def test_illegal_card_is_rejected(self, hand_player, tb):
+        tb.stack = [Deck().draw_card_from_initials("9C")]
+        step = PlayerPlayCardStep()
+        args = {"player": hand_player, "table": tb, "trump_suit": "Spades"}
+
+        assert step.validate("1", args) == 1
+        assert step.validate("3", args) == 3  # a trump can always be played
+        with pytest.raises(ValueError):
+            step.validate("2", args)
+
+    def test_playable_cards_are_marked(self, hand_player, tb, sb):
+        tb.stack = [Deck().draw_card_from_initials("9C")]
+        step = PlayerPlayCardStep()
+
+        prompt = step.prompt({"player": hand_player, "trump_suit_symbol": "♠",
+                              "trump_suit": "Spades", "table": tb, "scoreboard": sb})
+
+        assert "*1)" in prompt and "*3)" in prompt
+        assert " 2)" in prompt and "*2)" not in prompt
+
+
+class Test_HoldersQuery():
+
+    def test_query_shows_holders(self, player):
+        advisor = MagicMock()
+        advisor.holders_line.return_value = "AH: Bob 60%, deck 40%\n"
+        step = PlayerPlayCardStep()
+
+        with pytest.raises(StepInfo, match="AH: Bob 60%, deck 40%"):
+            step.validate("?AH", {"player": player, "advisor": advisor})
+        advisor.holders_line.assert_called_with(player, "AH")
+
+    def test_query_without_advisor_is_invalid(self, player):
+        step = PlayerPlayCardStep()
+        with pytest.raises(ValueError, match="Must enter a number"):
+            step.validate("?AH", {"player": player})
@@ -1,3 +1,6 @@
+import random
+from Classes.DeckClass import Deck
+from Utils import bitboard
 from Classes.CardClass import Card
 from Classes.TableClass import Table
 import pytest
@@ -212,4 +215,24 @@ class Test_Table():
         
         tb.stack = [c]
         tb.reset()
-        assert not tb.stack
\ No newline at end of file
+        assert not tb.stack
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_legal_mask_follows_suit_rules(self, tb, seed):
+        rng = random.Random(seed)
+        deck = Deck()
+        cards = [deck.draw_card_from_initials(initials)
+                 for initials in rng.sample(sorted(deck.generate_valid_card_initials()), 7)]
+        hand, led = cards[:6], cards[6]
+        tb.stack = [led] if seed % 4 else []
+        trump_suit = ("Hearts", "Spades", "Clubs", "Diamonds")[seed % 4]
+
+        legal = tb.legal_mask(hand, trump_suit)
+
+        can_follow = any(card.suit == led.suit for card in hand)
+        for card in hand:
+            expected = (not tb.stack or card.suit[0] == trump_suit
+                        or card.suit == led.suit or not can_follow)
+            assert bool(legal & bitboard.CARD_MASKS[card.card_id]) == expected
+            assert tb._valid_add_to_stack(card=card, player_hand=hand,
+                                          trump_suit=trump_suit) == expected
@@ -0,0 +1,95 @@
+import numpy as np
+import tournament
+from tournament import (parse_policy, play_deals, run_tournament, read_columns,
+                        summarise, mix_seed, ColumnWriter, RESULT_DTYPE)
+from Classes.HeadlessGame import AdvisorAgent, RandomAgent
+import pytest
+
+ROUNDS = [1, 2, 3]
+
+
+class Test_Tournament():
+
+    def test_parse_policy_casts_options(self):
+        agent, kwargs = parse_policy("advisor:engine=ismcts,budget_ms=2.5,num_worlds=50")
+
+        assert agent is AdvisorAgent
+        assert kwargs == {"engine": "ismcts", "budget_ms": 2.5, "num_worlds": 50}
+        assert parse_policy("random") == (RandomAgent, {})
+
+    def test_unknown_policy_is_rejected(self):
+        with pytest.raises(ValueError):
+            parse_policy("oracle")
+
+    def test_every_policy_plays_every_seat_of_a_deal(self):
+        policies = ["random", "greedy", "bid_aware"]
+        rows = play_deals(policies, range(2), seed=3, cards_per_round=ROUNDS)
+
+        assert len(rows) == 2 * 3 * 3
+        for deal in range(2):
+            deal_rows = rows[rows["deal"] == deal]
+            for policy in range(3):
+                assert sorted(deal_rows["seat"][deal_rows["policy"] == policy]) == [0, 1, 2]
+        assert (rows["rounds"] == len(ROUNDS)).all()
+        assert (rows["hits"] <= rows["rounds"]).all()
+
+    def test_deal_seeds_do_not_collide(self):
+        assert mix_seed(1, 0) != mix_seed(0, 1_000_003)
+        seeds = {mix_seed(seed, deal) for seed in range(20) for deal in range(500)}
+        assert len(seeds) == 20 * 500
+
+    def test_repeated_policies_share_a_column_index(self):
+        rows = play_deals(["random", "greedy", "random"], range(1), cards_per_round=ROUNDS)
+
+        assert sorted(np.unique(rows["policy"])) == [0, 1]
+        assert (rows["policy"] == 0).sum() == 6
+
+    def test_results_do_not_depend_on_workers(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tournament, "CHUNK_DEALS", 2)
+        policies = ["random", "bid_aware"]
+
+        single = run_tournament(policies, 5, seed=1, workers=1,
+                                output=str(tmp_path / "single"), cards_per_round=ROUNDS)
+        pooled = run_tournament(policies, 5, seed=1, workers=2,
+                                output=str(tmp_path / "pooled"), cards_per_round=ROUNDS)
+
+        single_columns, metadata = read_columns(str(tmp_path / "single"))
+        pooled_columns, _ = read_columns(str(tmp_path / "pooled"))
+        assert metadata["policies"] == policies
+        for name in RESULT_DTYPE.names:
+            assert np.array_equal(single_columns[name], pooled_columns[name])
+        assert [stats.mean_score for stats in single] == [stats.mean_score for stats in pooled]
+        assert sum(stats.games for stats in single) == 5 * 2 * 2
+
+    def test_columns_round_trip(self, tmp_path):
+        rows = np.zeros(3, dtype=RESULT_DTYPE)
+        rows["score"] = [-1, 20, 300]
+        with ColumnWriter(str(tmp_path), metadata={"seed": 7}) as writer:
+            writer.write(rows[:2])
+            writer.write(rows[2:])
+
+        columns, metadata = read_columns(str(tmp_path), ["score"])
+
+        assert list(columns) == ["score"]
+        assert columns["score"].tolist() == [-1, 20, 300]
+        assert metadata == {"seed": 7}
+
+    def test_summary_statistics(self):
+        columns = {
+            "deal": np.array([0, 0, 1, 1]),
+            "policy": np.array([0, 1, 0, 1]),
+            "score": np.array([10, 20, 30, 60]),
+            "hits": np.array([1, 2, 0, 3]),
+            "rounds": np.array([3, 3, 3, 3]),
+        }
+
+        first, second = summarise(columns, ["random", "greedy"])
+
+        assert first.games == second.games == 2
+        assert first.mean_score == 20 and second.mean_score == 40
+        # each game against the mean of its deal: 15 and 45
+        assert first.duplicate_score == pytest.approx((-5 - 15) / 2)
+        assert second.duplicate_score == pytest.approx((5 + 15) / 2)
+        assert first.hit_rate == pytest.approx(1 / 6)
+        assert first.hit_interval[0] <= first.hit_rate <= first.hit_interval[1]
+        assert first.score_interval[0] < 20 < first.score_interval[1]
@@ -1,10 +1,12 @@
 # functions for the ViewFormat Class
 from Classes.CardClass import Card
 
-def format_hand(hand: list[Card], cols=4):
+def format_hand(hand: list[Card], cols=4, playable: int = None):
         """
         Formats hand into a readable format
-        
+
+        Cards in the playable card mask are marked with a *, no card is
+        marked if the mask is not given
         """
 
         lines = []
@@ -20,7 +22,10 @@ def format_hand(hand: list[Card], cols=4):
                 if len(card.initials) < 3:
                      card_string = " " + str(card)
 
-                row.append(f"    {idx + 1}) {card_string}")
+                marker = " "
+                if playable is not None and playable & (1 << card.card_id):
+                    marker = "*"
+                row.append(f"   {marker}{idx + 1}) {card_string}")
 
             lines.append("    ".join(row))
         
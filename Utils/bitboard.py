@@ -0,0 +1,182 @@
+# compact integer encoding of cards used by the simulation code
+#
+# Each card is an integer 0-51 (suit * 13 + rank index) and every
+# collection of cards (hand, void set, table) is a 52 bit mask.
+
+SUITS = (("Diamonds", "♦"), ("Spades", "♠"), ("Clubs", "♣"), ("Hearts", "♥"))
+SUIT_LETTERS = ("D", "S", "C", "H")
+VALUES = (("2", 2), ("3", 3), ("4", 4), ("5", 5), ("6", 6), ("7", 7), ("8", 8),
+          ("9", 9), ("10", 10), ("J", 11), ("Q", 12), ("K", 13), ("A", 14))
+VALUE_STRINGS = tuple(value[0] for value in VALUES)
+
+RANKS = 13
+NUM_CARDS = 52
+NO_SUIT = -1
+
+FULL_MASK = (1 << NUM_CARDS) - 1
+SUIT_MASKS = tuple(((1 << RANKS) - 1) << (suit * RANKS) for suit in range(4))
+CARD_MASKS = tuple(1 << card_id for card_id in range(NUM_CARDS))
+
+
+def suit_index(suit) -> int:
+    """
+    Returns the index of a suit given its name, first letter, Card suit tuple
+    or index
+
+    Returns NO_SUIT (-1) when the suit is unknown e.g. no trump yet
+    """
+    try:
+        return _SUIT_LOOKUP[suit]
+    except (KeyError, TypeError):
+        pass
+    if isinstance(suit, int):
+        return suit if 0 <= suit < 4 else NO_SUIT
+    if isinstance(suit, tuple):
+        suit = suit[0]
+    if not suit:
+        return NO_SUIT
+    letter = str(suit)[0].upper()
+    return SUIT_LETTERS.index(letter) if letter in SUIT_LETTERS else NO_SUIT
+
+
+# the suit names, letters, symbols and Card suit tuples the game uses
+_SUIT_LOOKUP = {}
+for _index, (_name, _symbol) in enumerate(SUITS):
+    for _key in (_name, _name.lower(), _name[0], _name[0].lower(), (_name, _symbol)):
+        _SUIT_LOOKUP[_key] = _index
+
+
+def make_id(suit: int, rank: int) -> int:
+    """Returns the card id for a suit index and a rank from 2 (two) to 14 (ace)"""
+    return suit * RANKS + rank - 2
+
+
+def suit_of(card_id: int) -> int:
+    return card_id // RANKS
+
+
+def rank_of(card_id: int) -> int:
+    """Returns the rank of the card from 2 (two) to 14 (ace)"""
+    return card_id % RANKS + 2
+
+
+def card_to_id(suit, value) -> int | None:
+    """
+    Returns the id of a card given its Card suit and value tuples
+    e.g. (("Hearts", "♥"), ("10", 10)) -> 47
+
+    Returns None if the suit or value is not part of a standard deck
+    """
+    suit = suit_index(suit)
+    if suit == NO_SUIT or not isinstance(value, tuple) or len(value) < 2:
+        return None
+    rank = value[1]
+    if not isinstance(rank, int) or not 2 <= rank <= 14:
+        return None
+    return make_id(suit, rank)
+
+
+def initials_to_id(initials: str) -> int:
+    """
+    Returns the card id from initials e.g. '10H' or 'QS'
+    """
+    initials = initials.upper()
+    value, suit = initials[:-1], suit_index(initials[-1:])
+    if value not in VALUE_STRINGS or suit == NO_SUIT:
+        raise ValueError(f"Invalid card initials: {initials}")
+    return suit * RANKS + VALUE_STRINGS.index(value)
+
+
+def id_to_initials(card_id: int) -> str:
+    return VALUE_STRINGS[card_id % RANKS] + SUIT_LETTERS[card_id // RANKS]
+
+
+def to_id(card) -> int:
+    """
+    Returns the card id of a Card, initials string or card id
+    """
+    card_id = getattr(card, "card_id", None)
+    if card_id is not None:
+        return card_id
+    if isinstance(card, int):
+        return card
+    if isinstance(card, str):
+        return initials_to_id(card)
+    raise ValueError(f"Card has no id: {card}")
+
+
+def hand_mask(cards) -> int:
+    """Returns the mask of an iterable of Cards, initials or card ids"""
+    mask = 0
+    for card in cards:
+        mask |= CARD_MASKS[to_id(card)]
+    return mask
+
+
+def mask_to_ids(mask: int) -> list[int]:
+    """Returns the card ids in the mask, lowest first"""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+def mask_to_initials(mask: int) -> list[str]:
+    return [id_to_initials(card_id) for card_id in mask_to_ids(mask)]
+
+
+def count(mask: int) -> int:
+    return mask.bit_count()
+
+
+def has_suit(mask: int, suit: int) -> bool:
+    return suit != NO_SUIT and bool(mask & SUIT_MASKS[suit])
+
+
+def highest_of_suit(mask: int, suit: int) -> int:
+    """Returns the id of the highest card of the suit in the mask, or -1"""
+    return (mask & SUIT_MASKS[suit]).bit_length() - 1
+
+
+def lowest_of_suit(mask: int, suit: int) -> int:
+    """Returns the id of the lowest card of the suit in the mask, or -1"""
+    suit_cards = mask & SUIT_MASKS[suit]
+    return (suit_cards & -suit_cards).bit_length() - 1
+
+
+def legal_moves(hand: int, led_suit: int, trump: int) -> int:
+    """
+    Returns the mask of cards that can be played from the hand
+
+    Mirrors Table._valid_add_to_stack: the led suit must be followed
+    if possible, but a trump can always be played
+    """
+    if led_suit == NO_SUIT:
+        return hand
+    follow = hand & SUIT_MASKS[led_suit]
+    if not follow:
+        return hand
+    if trump != NO_SUIT:
+        follow |= hand & SUIT_MASKS[trump]
+    return follow
+
+
+def trick_winner(card_ids: list[int], trump: int) -> int:
+    """
+    Returns the position of the winning card in a trick played in order
+
+    Mirrors Table.verify_winner: the highest trump wins,
+    otherwise the highest card of the led suit
+    """
+    played = 0
+    for card_id in card_ids:
+        played |= CARD_MASKS[card_id]
+
+    best = -1
+    if trump != NO_SUIT:
+        best = highest_of_suit(played, trump)
+    if best < 0:
+        best = highest_of_suit(played, card_ids[0] // RANKS)
+    return card_ids.index(best)
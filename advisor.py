@@ -0,0 +1,244 @@
+# Contents of the background advisor which searches while the CLI waits for input
+
+import threading
+import probability_engine as pe
+from bid_advisor import recommend_bid
+from game_state import GameState
+from inference import InferenceTracker
+from Utils import bitboard
+
+# longest wait for a cancelled search to stop, in seconds; a search still
+# running after it can no longer print anything
+JOIN_SECONDS = 1.0
+
+
+class BackgroundAdvisor:
+    """
+    Runs the probability engine on a background thread while a prompt waits
+    for the user, and prints its advice as soon as it is ready
+
+    The prompts sleep and then block on input(), so the search runs in that
+    idle time. Advice that is ready before the prompt is drawn is shown in
+    the prompt through prompt_line(), later advice is printed below it.
+    cancel() is called once the user has answered, which stops the search
+    and makes sure no advice is printed after the answer. A search that
+    fails, e.g. on a state that cannot be dealt, reports its error in
+    place of the advice.
+
+    Worlds sampled for a local player are kept in a WorldPool for the
+    rest of the round, so later tricks only sample the worlds that the
+    played cards ruled out. With the ismcts engine the search tree of each
+    local player is kept for the round instead.
+
+    Each local player also has an InferenceTracker from the bidding of a
+    round onwards, which follows the bids and the cards played to show who
+    is likely to hold a card and whose probabilities new worlds are
+    sampled from.
+
+    Attributes:
+        game (Game): Running game the advice is for
+        budget_ms (float): Time the search may spend before reporting
+        workers (int): Worker processes used by the search
+        output (callable): Function used to print the advice
+        pool_size (int): Number of worlds kept in each world pool
+        engine (str): Search engine, one of probability_engine.ENGINES
+        pools (dict): World pool of each local player this round, by name
+        trees (dict): ISMCTS tree of each local player this round, by name
+        played_by (dict): Cards each player has played this round, by name
+        trackers (dict): Inference tracker of each local player this round, by name
+        tracking (bool): Whether local players get an inference tracker
+        error (ValueError): Error of the last search, None if it did not fail
+    """
+
+    def __init__(self, game, budget_ms: float = 1500, workers: int = 1,
+                 output=print, pool_size: int = 200, engine: str = "sampling",
+                 tracking: bool = True):
+        self.game = game
+        self.budget_ms = budget_ms
+        self.workers = workers
+        self.output = output
+        self.pool_size = pool_size
+        self.engine = engine
+        self.tracking = tracking
+        self.pools = {}
+        self.trees = {}
+        self.played_by = {}
+        self.trackers = {}
+        self.thread = None
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.advice = None
+        self.error = None
+        self.prompt_shown = False
+
+    def advise_play(self, player):
+        """Starts searching for the best card for a local player"""
+        if player.opponent or not player.hand:
+            return
+        game_state = GameState.from_game(self.game, player)
+        game_state.played_by = {
+            name: list(cards) for name, cards in self.played_by.items()}
+
+        def job(cancel):
+            if self.engine == "ismcts":
+                recommendation = pe.recommend(
+                    game_state, budget_ms=self.budget_ms, cancel=cancel,
+                    engine="ismcts",
+                    tree=self.trees.setdefault(player.name, pe.ISMCTS()))
+                low, high = recommendation.win_interval()
+                return (f"Advisor: play {recommendation.card} "
+                        f"(bid made in {low:.0%}-{high:.0%} of "
+                        f"{recommendation.worlds} searched deals)")
+
+            tracker = self.trackers.get(player.name)
+            # the voids shown this round are in the void flags of the state
+            if player.name not in self.pools:
+                self.pools[player.name] = pe.WorldPool(game_state, self.pool_size)
+            recommendation = pe.recommend(game_state,
+                                          budget_ms=self.budget_ms,
+                                          cancel=cancel,
+                                          workers=self.workers,
+                                          pool=self.pools[player.name],
+                                          proposal=tracker.proposal() if tracker else None)
+            low, high = recommendation.win_interval()
+            return (f"Advisor: play {recommendation.card} "
+                    f"(bid made in {low:.0%}-{high:.0%} of "
+                    f"{recommendation.worlds} sampled deals, "
+                    f"{recommendation.effective_worlds:.0f} effective)")
+
+        self.start(job)
+
+    def advise_bid(self, player, forbidden_bid: int = -1):
+        """Starts searching for the best legal bid for a local player"""
+        if player.opponent or not player.hand:
+            return
+        game_state = GameState.from_game(self.game, player)
+
+        def job(cancel):
+            advice = recommend_bid(game_state, forbidden_bid, cancel=cancel)
+            return (f"Advisor: bid {advice.bid} "
+                    f"(made in {advice.hit_rate:.0%} of deals, "
+                    f"expect {advice.expected_tricks:.1f} tricks)")
+
+        self.start(job)
+
+    def new_round(self):
+        """Drops the world pools, trees and played cards of the previous round"""
+        self.pools = {}
+        self.trees = {}
+        self.played_by = {}
+
+    def track_round(self):
+        """
+        Starts an inference tracker for every local player holding a hand,
+        once the hands and the trump of the round are known
+        """
+        self.trackers = {}
+        if not self.tracking:
+            return
+        for player in self.game.player_queue:
+            if player.opponent or not player.hand:
+                continue
+            try:
+                self.trackers[player.name] = InferenceTracker.from_game(
+                    self.game, player, self.pool_size)
+            except ValueError:
+                # the hands cannot be dealt, e.g. more players than cards
+                continue
+
+    def observe_bid(self, player):
+        """Updates the inference trackers after a player has bid"""
+        for tracker in self.trackers.values():
+            tracker.observe_bid(player.name, player.bid)
+
+    def holders_line(self, player, card=None) -> str:
+        """
+        Returns who is likely to hold a card, the ace of trumps if not
+        given, as seen by a local player; empty without a tracker
+        """
+        tracker = self.trackers.get(player.name)
+        if tracker is None:
+            return ""
+        if card is None:
+            trump = bitboard.suit_index(self.game.trump_suit)
+            if trump == bitboard.NO_SUIT:
+                return ""
+            card = bitboard.make_id(trump, 14)
+            if not tracker.holders(card):
+                return ""
+            return f"Ace of trumps {tracker.describe(card)}\n"
+        return f"{tracker.describe(card)}\n"
+
+    def observe(self, player, card):
+        """
+        Updates the world pools and search trees after a card has been
+        played to the table
+
+        Args:
+            player (Player): Player who played the card
+            card (Card): Card now on the table
+        """
+        self.played_by.setdefault(player.name, []).append(card.card_id)
+        # the game has already recorded any void the card shows
+        void_flags = getattr(self.game, "void_flags", None)
+        for name, pool in list(self.pools.items()):
+            try:
+                pool.observe(player.name, card, void_flags)
+            except ValueError:
+                # the play contradicts every deal, e.g. a mistyped card
+                del self.pools[name]
+        for name, tracker in list(self.trackers.items()):
+            try:
+                tracker.observe_play(player.name, card, void_flags)
+            except ValueError:
+                del self.trackers[name]
+        for tree in self.trees.values():
+            tree.advance(card.card_id)
+
+    def start(self, job):
+        """
+        Runs job(cancel_event) on a background thread and prints the string
+        it returns, unless the advisor is cancelled first
+        """
+        self.cancel()
+        cancel_event = threading.Event()
+        self.cancel_event = cancel_event
+        self.advice = None
+        self.error = None
+        self.prompt_shown = False
+
+        def run():
+            error = None
+            try:
+                advice = job(cancel_event)
+            except ValueError as exception:
+                # the state cannot be simulated, e.g. inconsistent input
+                error = exception
+                advice = f"Advisor: no advice ({exception})"
+            with self.lock:
+                if not cancel_event.is_set():
+                    self.error = error
+                    self.advice = advice
+                    if self.prompt_shown:
+                        self.output(f"\n{advice}")
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def prompt_line(self) -> str:
+        """
+        Returns the advice line to show in the prompt being drawn, empty if
+        the search is still running; its result is then printed when ready
+        """
+        with self.lock:
+            self.prompt_shown = True
+            return f"{self.advice}\n" if self.advice else ""
+
+    def cancel(self):
+        """Stops the running search, after which nothing more is printed"""
+        with self.lock:
+            self.cancel_event.set()
+        if self.thread:
+            self.thread.join(JOIN_SECONDS)
+            self.thread = None
+
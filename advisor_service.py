@@ -0,0 +1,434 @@
+# Contents of the advisor service which advises many tables over a local socket
+#
+# Start the service with:
+#     python advisor_service.py --port 8765
+#
+# Clients send one JSON object per line and get one JSON line back for each,
+# carrying the same "id". Requests name a table and an operation:
+#     {"id": 1, "op": "snapshot", "table": "t1", "state": {...GameState.to_dict()}}
+#     {"id": 2, "op": "bid", "table": "t1", "player": "Bob", "bid": 2}
+#     {"id": 3, "op": "play", "table": "t1", "player": "Bob", "card": "QH"}
+#     {"id": 4, "op": "advise", "table": "t1", "budget_ms": 500}
+#     {"id": 5, "op": "advise_bid", "table": "t1", "forbidden_bid": 1}
+#     {"id": 6, "op": "close", "table": "t1"}
+
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import probability_engine as pe
+from bid_advisor import recommend_bid
+from game_state import GameState
+from Utils import bitboard
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class _SolveRequest:
+    """Worlds one table wants solved and the stats merged so far"""
+
+    def __init__(self, payload: tuple, chunks: list, future: asyncio.Future):
+        self.payload = payload
+        self.chunks = chunks
+        self.future = future
+        self.totals = {}
+        self.solved = 0
+        self.expired = False
+
+    def merge(self, result: dict):
+        if self.future.done():
+            return
+        for card, values in result.items():
+            self.totals.setdefault(card, pe.MoveStats()).merge(pe.MoveStats(*values))
+        self.solved += 1
+        if self.solved == len(self.chunks) or self.expired:
+            self.finish()
+
+    def expire(self):
+        """Called at the deadline, returns what is solved unless nothing is yet"""
+        self.expired = True
+        if self.solved:
+            self.finish()
+
+    def finish(self):
+        if not self.future.done():
+            self.future.set_result(self.totals)
+
+
+class SolveBatcher:
+    """
+    Collects the worlds every table wants solved and sends them to a
+    shared executor in batches
+
+    Requests arriving within window_ms of each other are batched. Their
+    worlds are cut into chunks, taken in turn from each request so tables
+    are served side by side, and packed into jobs of up to job_worlds
+    worlds for the executor. A request returns the stats of the chunks
+    solved by its deadline, waiting for one chunk at least; jobs that only
+    hold chunks of finished requests are cancelled.
+
+    Attributes:
+        executor (Executor): Executor running probability_engine.solve_batch,
+            None for the event loop's default thread pool
+        max_nodes (int): Node budget of each double dummy solve
+        window_ms (float): Time requests wait for others to join their batch
+        chunk_worlds (int): Worlds of one position in each chunk
+        job_worlds (int): Worlds in each job sent to the executor
+        batches (int): Batches sent so far
+        jobs (int): Jobs sent to the executor so far
+    """
+
+    def __init__(self, executor=None, max_nodes: int = 5000,
+                 window_ms: float = 5, chunk_worlds: int = 2, job_worlds: int = 8):
+        self.executor = executor
+        self.max_nodes = max_nodes
+        self.window_ms = window_ms
+        self.chunk_worlds = chunk_worlds
+        self.job_worlds = job_worlds
+        self.batches = 0
+        self.jobs = 0
+        self.queue = []
+        self.flush_handle = None
+
+    async def solve(self, payload: tuple, worlds: list, budget_ms: float = None) -> dict:
+        """
+        Returns the merged MoveStats of every legal card, by card id, over
+        the worlds solved within the budget, every world if not given
+        """
+        loop = asyncio.get_running_loop()
+        chunks = [tuple(worlds[start:start + self.chunk_worlds])
+                  for start in range(0, len(worlds), self.chunk_worlds)]
+        if not chunks:
+            return {}
+        request = _SolveRequest(payload, chunks, loop.create_future())
+        self.queue.append(request)
+        if self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window_ms / 1000, self._flush)
+        if budget_ms is not None:
+            loop.call_later(budget_ms / 1000, request.expire)
+        return await request.future
+
+    def _flush(self):
+        queue, self.queue, self.flush_handle = self.queue, [], None
+        self.batches += 1
+        chunks = [(request, request.chunks[index])
+                  for index in range(max(len(request.chunks) for request in queue))
+                  for request in queue if index < len(request.chunks)]
+
+        jobs = [[]]
+        job_worlds = 0
+        for request, chunk in chunks:
+            if jobs[-1] and job_worlds + len(chunk) > self.job_worlds:
+                jobs.append([])
+                job_worlds = 0
+            jobs[-1].append((request, chunk))
+            job_worlds += len(chunk)
+
+        loop = asyncio.get_running_loop()
+        for job in jobs:
+            members = [request for request, _ in job]
+            future = loop.run_in_executor(
+                self.executor, pe.solve_batch,
+                [(request.payload, chunk) for request, chunk in job], self.max_nodes)
+            future.add_done_callback(lambda done, members=members: self._collect(done, members))
+            for request in set(members):
+                request.future.add_done_callback(
+                    lambda _, future=future, members=members: self._drop(future, members))
+            self.jobs += 1
+
+    @staticmethod
+    def _collect(future: asyncio.Future, members: list):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            for request in members:
+                if not request.future.done():
+                    request.future.set_exception(future.exception())
+            return
+        for request, result in zip(members, future.result()):
+            request.merge(result)
+
+    @staticmethod
+    def _drop(future: asyncio.Future, members: list):
+        """Cancels a job once every request it solves for has its answer"""
+        if all(request.future.done() for request in members):
+            future.cancel()
+
+
+class TableSession:
+    """
+    Game state and world pool of one table, updated by the events its
+    client sends
+
+    Attributes:
+        state (GameState): State seen by the advised player
+        pool (WorldPool): Worlds consistent with the play so far
+        pool_size (int): Number of worlds kept in the pool
+    """
+
+    def __init__(self, state: GameState, pool_size: int = 200, seed: int = None):
+        self.state = state
+        self.pool_size = pool_size
+        self.seed = seed
+        self.pool = pe.WorldPool(state, pool_size, seed=seed)
+
+    def bid(self, player: str, bid: int):
+        self.state.record_bid(player, bid)
+
+    def play(self, player: str, card):
+        self.state.record_play(player, card)
+        try:
+            self.pool.observe(player, card, self.state.void_flags)
+        except ValueError:
+            # no deal fits the play any more, start again from the state
+            self.pool = pe.WorldPool(self.state, self.pool_size, seed=self.seed)
+
+
+class AdvisorService:
+    """
+    Advises many tables at once over newline delimited JSON on a socket
+
+    Each table keeps its state and world pool in memory between requests.
+    Requests are handled concurrently, and the worlds that advice requests
+    solve are batched across tables by a SolveBatcher.
+
+    Attributes:
+        tables (dict): TableSession of every open table, by table id
+        batcher (SolveBatcher): Batcher shared by every table
+        pool_size (int): Worlds kept in each table's pool
+        advice_worlds (int): Worlds of the pool solved for each advice
+        budget_ms (float): Time an advice may take, unless its request sets one
+        bid_worlds (int): Deals simulated for each bid advice
+    """
+
+    def __init__(self, workers: int = None, pool_size: int = 200,
+                 advice_worlds: int = 64, bid_worlds: int = 2000,
+                 budget_ms: float = 500, max_nodes: int = 5000, window_ms: float = 5):
+        """
+        Args:
+            workers (int): Worker processes shared by every table, every
+                core if not given, 0 to run on the event loop's threads
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+        self.batcher = SolveBatcher(self.executor, max_nodes, window_ms)
+        self.pool_size = pool_size
+        self.advice_worlds = advice_worlds
+        self.budget_ms = budget_ms
+        self.bid_worlds = bid_worlds
+        self.tables = {}
+        self.server = None
+        self.clients = set()
+        self.handlers = {
+            "snapshot": self.snapshot,
+            "bid": self.bid,
+            "play": self.play,
+            "advise": self.advise,
+            "advise_bid": self.advise_bid,
+            "close": self.close_table,
+        }
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> int:
+        """Starts listening and returns the port, useful when port 0 picks a free one"""
+        self.server = await asyncio.start_server(self._serve_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+        for client in self.clients:
+            client.cancel()
+        await asyncio.gather(*self.clients, return_exceptions=True)
+        if self.server:
+            await self.server.wait_closed()
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = asyncio.current_task()
+        self.clients.add(client)
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.ensure_future(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except (asyncio.CancelledError, ConnectionError):
+            # the service is closing or the client went away
+            for task in tasks:
+                task.cancel()
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter):
+        response = await self.handle(line)
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def handle(self, line: bytes) -> dict:
+        """Returns the response to one request line"""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            return {"ok": False, "error": f"Invalid JSON: {error}"}
+        response = {"id": request.get("id")}
+        handler = self.handlers.get(request.get("op"))
+        if handler is None:
+            return {**response, "ok": False, "error": f"Unknown op: {request.get('op')}"}
+        try:
+            response.update(await handler(request))
+        except (ValueError, KeyError, TypeError) as error:
+            return {**response, "ok": False, "error": str(error)}
+        except Exception as error:
+            # any other failure is answered too, so the client is not left waiting
+            return {**response, "ok": False,
+                    "error": f"Internal error: {type(error).__name__}: {error}"}
+        response["ok"] = True
+        return response
+
+    def _table(self, request: dict) -> TableSession:
+        table = request["table"]
+        if table not in self.tables:
+            raise ValueError(f"Unknown table: {table}")
+        return self.tables[table]
+
+    async def snapshot(self, request: dict) -> dict:
+        state = GameState.from_dict(request["state"])
+        self.tables[request["table"]] = TableSession(state, self.pool_size,
+                                                     request.get("seed"))
+        return {}
+
+    async def bid(self, request: dict) -> dict:
+        self._table(request).bid(request["player"], int(request["bid"]))
+        return {}
+
+    async def play(self, request: dict) -> dict:
+        self._table(request).play(request["player"], request["card"])
+        return {}
+
+    async def advise(self, request: dict) -> dict:
+        """
+        Returns the card with the best win rate over the table's pooled
+        worlds solved within the time budget
+        """
+        session = self._table(request)
+        state = session.state
+        # sampling the reference worlds would hold up every other table
+        payload = await asyncio.get_running_loop().run_in_executor(
+            self.executor, pe.compact_state, state)
+        trump, _, trick, hand, _, _, need, _ = payload
+        led = bitboard.suit_of(trick[0]) if trick else bitboard.NO_SUIT
+        legal = bitboard.mask_to_ids(bitboard.legal_moves(hand, led, trump))
+        if not legal:
+            raise ValueError(f"{state.local_player} has no card to play")
+
+        worlds = session.pool.seat_worlds(state.players, self.advice_worlds)
+        totals = {card: pe.MoveStats() for card in legal}
+        totals.update(await self.batcher.solve(
+            payload, worlds, request.get("budget_ms", self.budget_ms)))
+        pe.check_weights(totals)
+        best = pe.best_card(totals, need)
+        low, high = pe.wilson_interval(totals[best])
+        return {
+            "card": bitboard.id_to_initials(best),
+            "win_interval": [low, high],
+            "worlds": totals[best].worlds,
+            "inexact_worlds": totals[best].inexact,
+            "stats": {
+                bitboard.id_to_initials(card): {"win_rate": stats.win_rate,
+                                                "mean_tricks": stats.mean_tricks,
+                                                "inexact": stats.inexact}
+                for card, stats in sorted(totals.items())
+            },
+        }
+
+    async def advise_bid(self, request: dict) -> dict:
+        state = self._table(request).state
+        advice = await asyncio.get_running_loop().run_in_executor(
+            self.executor, recommend_bid, state, int(request.get("forbidden_bid", -1)),
+            self.bid_worlds, request.get("seed"))
+        return {"bid": advice.bid, "hit_rate": advice.hit_rate,
+                "expected_tricks": advice.expected_tricks}
+
+    async def close_table(self, request: dict) -> dict:
+        self.tables.pop(request["table"], None)
+        return {}
+
+
+class AdvisorClient:
+    """
+    Client of an AdvisorService, matching responses to requests by id so
+    several requests can be waited on at once
+    """
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.next_id = 0
+        self.pending = {}
+        self.listener = None
+
+    async def connect(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self):
+        while line := await self.reader.readline():
+            response = json.loads(line)
+            future = self.pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("Advisor service closed the connection"))
+
+    async def request(self, op: str, **fields) -> dict:
+        """Sends a request and returns its response, raising ValueError if it failed"""
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        self.writer.write(json.dumps({"id": self.next_id, "op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+        response = await future
+        if not response["ok"]:
+            raise ValueError(response["error"])
+        return response
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        if self.listener:
+            await self.listener
+
+
+async def _serve(arguments):
+    service = AdvisorService(arguments.workers, arguments.pool_size,
+                             arguments.advice_worlds, budget_ms=arguments.budget_ms)
+    port = await service.start(arguments.host, arguments.port)
+    print(f"Advisor service listening on {arguments.host}:{port}")
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the advisor to many tables")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes, every core by default")
+    parser.add_argument("--pool-size", type=int, default=200,
+                        help="worlds kept for each table")
+    parser.add_argument("--advice-worlds", type=int, default=64,
+                        help="largest number of worlds solved for each advice")
+    parser.add_argument("--budget-ms", type=float, default=500,
+                        help="time each advice may take")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,333 @@
+# Times the hot paths of the game and the engine and checks them against a baseline
+#
+# Run from the repository root with:
+#     python -m benchmarks.suite                        run every case
+#     python -m benchmarks.suite --quick round.rollout  run some cases briefly
+#     python -m benchmarks.suite --save-baseline        make this run the baseline
+#
+# Every run is appended to the history file. The run fails, exiting with 1,
+# when a case's throughput drops by more than the threshold from the baseline.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import time
+import numpy as np
+import bid_advisor
+import double_dummy
+import probability_engine as pe
+from benchmarks.trick_allocations import play_trick
+from Classes.DeckClass import Deck
+from Classes.HeadlessGame import BitboardGame, GreedyAgent, HeadlessGame
+from Classes.PlayerClass import Player
+from Classes.ScoreboardClass import Scoreboard
+from Classes.TableClass import Table
+from game_state import GameState
+from Utils import bitboard
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+HISTORY_PATH = os.path.join(RESULTS_DIR, "history.json")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+
+# fraction of the baseline throughput a case may lose before the run fails
+DEFAULT_THRESHOLD = 0.25
+
+
+def _deal(rng: random.Random, num_seats: int, cards: int) -> list[int]:
+    """Returns the card mask of every seat of a random deal"""
+    ids = rng.sample(range(bitboard.NUM_CARDS), num_seats * cards)
+    return [bitboard.hand_mask(ids[seat * cards:(seat + 1) * cards])
+            for seat in range(num_seats)]
+
+
+def _decision_state(rng: random.Random, num_seats: int = 4, cards: int = 8) -> GameState:
+    """Returns the state of the first player to lead a round of a random deal"""
+    hands = _deal(rng, num_seats, cards)
+    state = GameState()
+    state.players = [f"Player {seat}" for seat in range(num_seats)]
+    state.local_player = state.players[0]
+    state.known_cards = bitboard.mask_to_ids(hands[0])
+    state.hand_sizes = {name: cards for name in state.players[1:]}
+    state.trump = "Hearts"
+    return state
+
+
+# Every case takes a random generator and returns (run, ops), run being
+# timed once per repetition and doing ops operations each time it is called
+
+def table_verify_winner(rng: random.Random):
+    deck = Deck()
+    table = Table(None)
+    deck.shuffle(rng)
+    table.stack = [deck.pop() for _ in range(6)]
+
+    def run():
+        for _ in range(1000):
+            table.verify_winner("Hearts")
+    return run, 1000
+
+
+def deck_draw_from_initials(rng: random.Random):
+    deck = Deck()
+    initials = [card.initials for card in deck.cards]
+    rng.shuffle(initials)
+
+    def run():
+        deck.reset()
+        for card in initials:
+            deck.draw_card_from_initials(card)
+    return run, len(initials)
+
+
+def deck_generate(rng: random.Random):
+    deck = Deck()
+
+    def run():
+        for _ in range(100):
+            deck.generate_deck()
+    return run, 100
+
+
+def scoreboard_update(rng: random.Random):
+    players = [Player(name=f"Player {index}") for index in range(6)]
+    scoreboard = Scoreboard(players)
+    deck = Deck()
+    winners = []
+    for _ in range(8):
+        card = deck.pop()
+        card.owner = rng.choice(players)
+        winners.append(card)
+
+    def run():
+        scoreboard.reset_round_scoreboard()
+        for player in players:
+            player.round_score = 0
+            player.bid = rng.randrange(3)
+        for card in winners:
+            scoreboard.update_round_scoreboard(players, card)
+        scoreboard.reorder_round_scoreboard(players)
+        scoreboard.update_total_scoreboard(players, len(winners))
+    return run, len(winners) + 1
+
+
+def world_generation(rng: random.Random):
+    state = _decision_state(rng)
+    seeds = iter(range(1 << 30))
+
+    def run():
+        for _ in pe.generate_worlds(state, 1000, seed=next(seeds)):
+            pass
+    return run, 1000
+
+
+def trick_play(rng: random.Random):
+    deck = Deck()
+    table = Table(None)
+    players = [Player(name=f"Player {index}") for index in range(4)]
+
+    def run():
+        deck.reset()
+        deck.shuffle(rng)
+        for player in players:
+            player.hand = [deck.pop() for _ in range(8)]
+        for _ in range(8):
+            play_trick(table, players, "Hearts", set())
+    return run, 8
+
+
+def trick_simulation(rng: random.Random):
+    generator = np.random.default_rng(rng.getrandbits(32))
+    cards = generator.random((10_000, bitboard.NUM_CARDS)).argsort(axis=1)[:, :6]
+    led = cards[:, 0] // bitboard.RANKS
+
+    def run():
+        pe.simulate_trick(cards, 3, led)
+    return run, len(cards)
+
+
+def round_rollouts(rng: random.Random):
+    num_rounds, num_seats, cards = 2000, 6, 8
+    generator = np.random.default_rng(rng.getrandbits(32))
+    hands = pe.deal_hands(generator, num_rounds, num_seats, cards)
+
+    def run():
+        pe.simulate_rounds(hands, 3, rng=generator)
+    return run, num_rounds
+
+
+def double_dummy_solve(rng: random.Random):
+    deals = [_deal(rng, 4, 6) for _ in range(8)]
+
+    def run():
+        for hands in deals:
+            double_dummy.DoubleDummySolver(3, 0).solve(hands, 0)
+    return run, len(deals)
+
+
+def headless_game(rng: random.Random):
+    seeds = iter(range(1 << 30))
+
+    def run():
+        seed = next(seeds)
+        HeadlessGame([GreedyAgent(seat) for seat in range(4)], seed=seed).play()
+    return run, 1
+
+
+def bitboard_games(rng: random.Random):
+    seeds = iter(range(1 << 30))
+
+    def run():
+        for _ in range(20):
+            seed = next(seeds)
+            BitboardGame([GreedyAgent(seat) for seat in range(4)], seed=seed).play()
+    return run, 20
+
+
+def advisor_play(rng: random.Random):
+    state = _decision_state(rng)
+
+    def run():
+        pe.evaluate_move(game_state=state, num_worlds=32, seed=0, workers=1)
+    return run, 1
+
+
+def advisor_bid(rng: random.Random):
+    state = _decision_state(rng)
+
+    def run():
+        bid_advisor.recommend_bid(state, num_worlds=500, seed=0, tables=None)
+    return run, 1
+
+
+CASES = {
+    "table.verify_winner": table_verify_winner,
+    "deck.draw_card_from_initials": deck_draw_from_initials,
+    "deck.generate_deck": deck_generate,
+    "scoreboard.update": scoreboard_update,
+    "worlds.generate": world_generation,
+    "trick.play": trick_play,
+    "trick.simulate": trick_simulation,
+    "round.rollout": round_rollouts,
+    "double_dummy.solve": double_dummy_solve,
+    "game.headless": headless_game,
+    "game.bitboard": bitboard_games,
+    "advisor.play": advisor_play,
+    "advisor.bid": advisor_bid,
+}
+
+
+def measure(run, ops: int, repeat: int = 20, min_time: float = 0.5) -> dict:
+    """
+    Returns the throughput in operations per second and the p50 and p99
+    latency of one operation in microseconds of a case's run
+
+    run is called once to warm up, then at least repeat times and until
+    min_time seconds have been spent timing it.
+    """
+    run()
+    times = []
+    while len(times) < repeat or sum(times) < min_time:
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    latencies = np.array(times) / ops * 1e6
+    return {
+        "ops_per_s": ops * len(times) / sum(times),
+        "p50_us": float(np.percentile(latencies, 50)),
+        "p99_us": float(np.percentile(latencies, 99)),
+        "repeats": len(times),
+    }
+
+
+def run_suite(names: list[str] = None, quick: bool = False, seed: int = 0) -> dict:
+    """Returns the measurements of the named cases, every case by default, by name"""
+    results = {}
+    for name in names or CASES:
+        run, ops = CASES[name](random.Random(seed))
+        results[name] = measure(run, ops, *((3, 0.05) if quick else ()))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """
+    Returns a line for every case whose throughput fell by more than the
+    threshold fraction of its baseline; cases missing from either are skipped
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]["ops_per_s"]
+        change = result["ops_per_s"] / expected - 1
+        if change < -threshold:
+            regressions.append(f"{name}: {result['ops_per_s']:,.0f} ops/s, "
+                               f"{change:.0%} from {expected:,.0f}")
+    return regressions
+
+
+def load_json(path: str, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_json(path: str, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(data, file, indent=1)
+
+
+def record(results: dict, history_path: str = HISTORY_PATH) -> dict:
+    """Appends a run to the history file and returns its entry"""
+    entry = {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    history = load_json(history_path, [])
+    history.append(entry)
+    save_json(history_path, history)
+    return entry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the game and engine hot paths")
+    parser.add_argument("cases", nargs="*", metavar="case", help="Cases to run, every case by default: " + ", ".join(CASES))
+    parser.add_argument("--quick", action="store_true", help="Time fewer repetitions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Fraction of the baseline throughput a case may lose")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store this run as the baseline")
+    arguments = parser.parse_args()
+    unknown = set(arguments.cases) - set(CASES)
+    if unknown:
+        parser.error("Unknown cases: " + ", ".join(sorted(unknown)))
+
+    results = run_suite(arguments.cases, arguments.quick, arguments.seed)
+    for name, result in results.items():
+        print(f"{name:>28}: {result['ops_per_s']:>12,.0f} ops/s"
+              f"  p50 {result['p50_us']:>10,.1f} us  p99 {result['p99_us']:>10,.1f} us")
+    record(results, arguments.history)
+
+    if arguments.save_baseline:
+        save_json(arguments.baseline, {**load_json(arguments.baseline, {}), **results})
+        print(f"Saved the baseline to {arguments.baseline}")
+        sys.exit(0)
+
+    baseline = load_json(arguments.baseline)
+    if baseline is None:
+        print(f"No baseline at {arguments.baseline}, run with --save-baseline to store one")
+        sys.exit(0)
+    regressions = compare(results, baseline, arguments.threshold)
+    for line in regressions:
+        print(f"Regression {line}")
+    sys.exit(1 if regressions else 0)
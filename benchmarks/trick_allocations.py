@@ -0,0 +1,129 @@
+# Counts the memory blocks allocated by the Card and Player hot path of a trick
+#
+# Run from the repository root with:
+#     python -m benchmarks.trick_allocations --tricks 2000
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from Classes.DeckClass import Deck
+from Classes.PlayerClass import Player
+from Classes.TableClass import Table
+from Utils import bitboard
+
+
+def _deal(rng: random.Random, players: list[Player], deck: Deck, cards: int):
+    deck.reset()
+    deck.shuffle(rng)
+    for player in players:
+        player.hand = [deck.pop() for _ in range(cards)]
+
+
+def play_trick(table: Table, players: list[Player], trump_suit: str, played: set):
+    """
+    Plays one trick the way the game does: every player finds a legal
+    card, checks it is in their hand, plays it to the table and discards
+    it, then the winner is found
+    """
+    for player in players:
+        legal = table.legal_mask(player.hand, trump_suit)
+        card = next(card for card in player.hand if legal & bitboard.CARD_MASKS[card.card_id])
+        if card not in player.hand:
+            raise ValueError(f"{card} is not in the hand of {player}")
+        table.play_card_to_table(card, player, trump_suit)
+        player.remove_card(card)
+        played.add(card)
+    winner = table.verify_winner(trump_suit)
+    table.reset()
+    return winner
+
+
+# the snapshots' own bookkeeping is not part of the trick
+_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+def allocated_blocks(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> tuple:
+    """
+    Returns the blocks allocated between two snapshots that are still
+    held, as the count_diff of the lines that gained blocks, and the net
+    change in blocks over every line
+    """
+    stats = after.filter_traces(_FILTERS).compare_to(before.filter_traces(_FILTERS), "lineno")
+    return (sum(stat.count_diff for stat in stats if stat.count_diff > 0),
+            sum(stat.count_diff for stat in stats))
+
+
+def benchmark(num_tricks: int = 2000, num_players: int = 4, cards: int = 8,
+              seed: int = 0) -> dict:
+    """
+    Returns the blocks allocated and the time taken per trick, and the
+    size of a Card and a Player with their attribute storage
+
+    Blocks are counted with tracemalloc snapshots taken before and after
+    every trick, over num_tricks tricks: the blocks each trick leaves
+    allocated, from the count_diff of the lines that gained blocks, and
+    the net change in blocks. Tricks are timed on their own, outside the
+    snapshots.
+    """
+    rng = random.Random(seed)
+    deck = Deck()
+    table = Table(None)
+    players = [Player(name=f"Player {index}") for index in range(num_players)]
+    trump_suit = "Hearts"
+
+    blocks = []
+    net_blocks = []
+    tracemalloc.start()
+    try:
+        while len(blocks) < num_tricks:
+            _deal(rng, players, deck, cards)
+            played = set()
+            for _ in range(cards):
+                before = tracemalloc.take_snapshot()
+                play_trick(table, players, trump_suit, played)
+                allocated, net = allocated_blocks(before, tracemalloc.take_snapshot())
+                blocks.append(allocated)
+                net_blocks.append(net)
+    finally:
+        tracemalloc.stop()
+
+    elapsed = 0.0
+    tricks = 0
+    while tricks < num_tricks:
+        _deal(rng, players, deck, cards)
+        played = set()
+        start = time.perf_counter()
+        for _ in range(cards):
+            play_trick(table, players, trump_suit, played)
+        elapsed += time.perf_counter() - start
+        tricks += cards
+
+    return {
+        "tricks": len(blocks),
+        "blocks_per_trick": sum(blocks) / len(blocks),
+        "net_blocks_per_trick": sum(net_blocks) / len(net_blocks),
+        "us_per_trick": elapsed / tricks * 1e6,
+        "card_bytes": _instance_size(deck.cards[0]),
+        "player_bytes": _instance_size(players[0]),
+    }
+
+
+def _instance_size(instance) -> int:
+    """Returns the size of an instance and of its __dict__, if it has one"""
+    size = sys.getsizeof(instance)
+    if hasattr(instance, "__dict__"):
+        size += sys.getsizeof(instance.__dict__)
+    return size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count the blocks allocated per trick")
+    parser.add_argument("--tricks", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    for name, value in benchmark(arguments.tricks, arguments.players, seed=arguments.seed).items():
+        print(f"{name:>20}: {value:>10,.1f}")
@@ -0,0 +1,244 @@
+# Contents of the bid advisor which suggests a bid for the local player
+
+import numpy as np
+import bid_tables
+import opponent_model
+import probability_engine as pe
+from game_state import GameState
+from Utils import bitboard
+
+
+class BidAdvice:
+    """
+    Suggested bid and the trick distribution behind it
+
+    Attributes:
+        bid (int): Legal bid with the highest expected score
+        distribution (np.ndarray): Probability of winning 0 to max_cards tricks
+        expected_scores (dict): Expected round score of every bid from 0 to max_cards
+        worlds (int): Number of deals simulated, 0 if read from the bid tables
+        effective_worlds (float): Effective sample size of the deals once
+            weighted by the opponents' bids
+        cancelled (bool): True if the simulation was cancelled by the caller
+    """
+
+    def __init__(self, bid: int, distribution: np.ndarray,
+                 expected_scores: dict, worlds: int,
+                 effective_worlds: float = None, cancelled: bool = False):
+        self.bid = bid
+        self.distribution = distribution
+        self.expected_scores = expected_scores
+        self.worlds = worlds
+        self.effective_worlds = worlds if effective_worlds is None else effective_worlds
+        self.cancelled = cancelled
+
+    @property
+    def expected_tricks(self) -> float:
+        return float(np.arange(len(self.distribution)) @ self.distribution)
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the probability of winning exactly the suggested bid"""
+        return float(self.distribution[self.bid])
+
+    def __repr__(self) -> str:
+        return (f"BidAdvice(bid={self.bid}, hit_rate={self.hit_rate:.2f}, "
+                f"expected_score={self.expected_scores[self.bid]:.2f})")
+
+
+def bid_score(bid: int, tricks: int, max_cards: int) -> int:
+    """
+    Returns the round score of a bid, as in Scoreboard.update_total_scoreboard
+
+    Making the bid scores the bid plus 10, doubled when bidding max_cards,
+    otherwise the player scores the tricks they won
+    """
+    if bid == tricks:
+        multiplier = 2 if bid == max_cards else 1
+        return (bid + 10) * multiplier
+    return tricks
+
+
+def expected_scores(distribution, max_cards: int) -> dict:
+    """Returns the expected score of every bid from 0 to max_cards"""
+    distribution = np.asarray(distribution, dtype=float)
+    tricks = np.arange(len(distribution))
+    mean_tricks = float(tricks @ distribution)
+    return {
+        bid: mean_tricks + distribution[bid] * (bid_score(bid, bid, max_cards) - bid)
+        for bid in range(max_cards + 1)
+    }
+
+
+def best_bid(distribution, max_cards: int, forbidden_bid: int = -1) -> int:
+    """
+    Returns the legal bid with the highest expected score
+
+    Args:
+        distribution (array): Probability of winning 0 to max_cards tricks
+        max_cards (int): Cards per hand this round
+        forbidden_bid (int): Bid banned by calculate_banned_number, -1 for none
+    """
+    scores = expected_scores(distribution, max_cards)
+    return max((bid for bid in scores if bid != forbidden_bid), key=scores.get)
+
+
+def deal_worlds(hand: int, pool: int, num_seats: int, seat: int,
+                cards: int, num_worlds: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Returns random deals of the pool to every seat but the local one
+
+    Args:
+        hand (int): Card mask of the local hand
+        pool (int): Card mask of the unseen cards
+        num_seats (int): Number of players
+        seat (int): Seat of the local player
+        cards (int): Cards in each opponent's hand
+        num_worlds (int): Number of deals
+        rng (np.random.Generator): Random generator
+
+    Returns:
+        np.ndarray: Boolean array of shape (num_worlds, num_seats, 52)
+    """
+    if (num_seats - 1) * cards > bitboard.count(pool):
+        raise ValueError("Not enough unseen cards for the opponents' hands")
+    local = np.zeros(bitboard.NUM_CARDS, dtype=bool)
+    local[bitboard.mask_to_ids(hand)] = True
+    opponents = pe.deal_hands(rng, num_worlds, num_seats - 1, cards, pool)
+    return np.insert(opponents, seat, local, axis=1)
+
+
+def simulate_deals(game_state: GameState, num_worlds: int = 2000,
+                   seed: int = None) -> tuple:
+    """
+    Returns the tricks the local player wins in simulated deals and the
+    weight of every deal
+
+    Opponent hands are dealt at random from the unseen cards and every
+    deal is played out with probability_engine.simulate_rounds. The first
+    player in game_state.players leads the first trick. Deals are weighted
+    by the likelihood of the bids opponents have already made.
+
+    Args:
+        game_state (GameState): State at the start of the round
+        num_worlds (int): Number of deals to simulate
+        seed (int): Optional seed for reproducible results, or a
+            np.random.Generator to draw the deals from
+
+    Returns:
+        tuple: (tricks, weights) arrays of length num_worlds
+    """
+    rng = np.random.default_rng(seed)
+    players = game_state.players
+    seat = players.index(game_state.local_player)
+    trump = bitboard.suit_index(game_state.trump)
+    hand = bitboard.hand_mask(game_state.known_cards)
+    cards = bitboard.count(hand)
+
+    hands = deal_worlds(hand, pe.unseen_mask(game_state), len(players), seat,
+                        cards, num_worlds, rng)
+    tricks = pe.simulate_rounds(hands, trump)[:, seat]
+
+    bids = np.array([game_state.bids.get(name, -1) if index != seat else -1
+                     for index, name in enumerate(players)])
+    weights = opponent_model.bid_likelihood(
+        bids, hands, trump, len(players)).prod(axis=1)
+    return tricks, weights
+
+
+def trick_distribution(game_state: GameState, num_worlds: int = 2000,
+                       seed: int = None) -> np.ndarray:
+    """
+    Returns the probability of the local player winning 0 to max_cards
+    tricks, over deals weighted by the opponents' bids
+
+    Args:
+        game_state (GameState): State at the start of the round
+        num_worlds (int): Number of deals to simulate
+        seed (int): Optional seed for reproducible results
+    """
+    tricks, weights = simulate_deals(game_state, num_worlds, seed)
+    return _distribution(tricks, weights, len(game_state.known_cards))
+
+
+def _distribution(tricks, weights, cards: int) -> np.ndarray:
+    return np.bincount(tricks, weights=weights, minlength=cards + 1) / weights.sum()
+
+
+def effective_sample_size(weights) -> float:
+    """Returns the effective number of deals behind weighted statistics"""
+    weights = np.asarray(weights, dtype=float)
+    return float(weights.sum() ** 2 / (weights ** 2).sum()) if weights.any() else 0.0
+
+
+def table_distribution(game_state: GameState,
+                       tables: str = bid_tables.DEFAULT_PATH) -> np.ndarray:
+    """
+    Returns the trick distribution from the precomputed bid tables, or None
+    if the tables are missing, do not cover the hand or the round has started
+
+    The tables do not know the opponents' hands, so they are only used
+    before any opponent has bid.
+    """
+    hand = bitboard.hand_mask(game_state.known_cards)
+    cards = bitboard.count(hand)
+    opponent_bids = [bid for name, bid in game_state.bids.items()
+                     if name != game_state.local_player]
+    if not tables or opponent_bids or game_state.current_trick or any(
+            size != cards for size in game_state.hand_sizes.values()):
+        return None
+
+    players = game_state.players
+    return bid_tables.lookup(hand, bitboard.suit_index(game_state.trump),
+                             len(players), players.index(game_state.local_player),
+                             tables)
+
+
+def recommend_bid(game_state: GameState, forbidden_bid: int = -1,
+                  num_worlds: int = 2000, seed: int = None,
+                  tables: str = bid_tables.DEFAULT_PATH,
+                  cancel=None, batch_size: int = 250) -> BidAdvice:
+    """
+    Returns the bid with the highest expected score for the local player
+
+    Uses the precomputed bid tables when they cover the hand, otherwise
+    simulates num_worlds deals weighted by the opponents' bids, in
+    batches of batch_size. Once cancel is set the deals simulated so far
+    are used, at least one batch of them.
+
+    Args:
+        game_state (GameState): State at the start of the round
+        forbidden_bid (int): Bid banned by calculate_banned_number, -1 for none
+        num_worlds (int): Number of deals to simulate
+        seed (int): Optional seed for reproducible results
+        tables (str): Location of the bid tables, None to always simulate
+        cancel (threading.Event): Optional event that stops the simulation
+        batch_size (int): Deals simulated between checks of cancel
+    """
+    distribution = table_distribution(game_state, tables)
+    worlds = effective_worlds = 0
+    cancelled = False
+    if distribution is None:
+        rng = np.random.default_rng(seed)
+        tricks, weights = [], []
+        for start in range(0, num_worlds, batch_size):
+            if start and cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+            batch_tricks, batch_weights = simulate_deals(
+                game_state, min(batch_size, num_worlds - start), rng)
+            tricks.append(batch_tricks)
+            weights.append(batch_weights)
+        tricks, weights = np.concatenate(tricks), np.concatenate(weights)
+        distribution = _distribution(tricks, weights, len(game_state.known_cards))
+        worlds = len(tricks)
+        effective_worlds = effective_sample_size(weights)
+
+    max_cards = len(distribution) - 1
+    return BidAdvice(
+        bid=best_bid(distribution, max_cards, forbidden_bid),
+        distribution=distribution,
+        expected_scores=expected_scores(distribution, max_cards),
+        worlds=worlds,
+        effective_worlds=effective_worlds,
+        cancelled=cancelled)
@@ -0,0 +1,218 @@
+# Contents of the precomputed bid tables used by the bid advisor
+#
+# Build the tables offline with:
+#     python bid_tables.py --deals 200000
+
+import argparse
+import os
+import numpy as np
+import probability_engine as pe
+from Utils import bitboard
+from Utils.bitboard import RANKS
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bid_tables.npy")
+MAX_TRICKS = 8
+
+# weight of the coarse entry when correcting a fine entry with few samples
+PRIOR_DEALS = 25
+
+COARSE_FLAG = np.uint64(1 << 63)
+
+TABLE_DTYPE = np.dtype([
+    ("key", "<u8"),
+    ("count", "<u4"),
+    ("probs", "<u2", (MAX_TRICKS + 1,)),
+])
+
+_tables = {}
+
+
+def _suit_features(lengths, ranks_held, trump: int):
+    """
+    Returns the trump length, trump honours and the sorted side suit codes
+    of hands given per-suit lengths and held ranks
+
+    Works on numpy arrays of any leading shape, the last axes being the
+    suit (4) and the suit and rank (4, 13)
+    """
+    trump_length = lengths[..., trump]
+    # ace, king, queen and jack of trumps
+    trump_honours = (ranks_held[..., trump, 12] * 8 + ranks_held[..., trump, 11] * 4
+                     + ranks_held[..., trump, 10] * 2 + ranks_held[..., trump, 9])
+
+    side = [suit for suit in range(4) if suit != trump]
+    # length and ace, king and queen of every side suit, longest first
+    side_codes = (lengths[..., side] * 8 + ranks_held[..., side, 12] * 4
+                  + ranks_held[..., side, 11] * 2 + ranks_held[..., side, 10])
+    side_codes = -np.sort(-side_codes, axis=-1)
+    return trump_length, trump_honours, side_codes, side
+
+
+def _keys(hands, trump: int, num_players: int, cards: int, seat):
+    """
+    Returns the fine and coarse table keys of hands relative to the trump
+
+    Args:
+        hands (array): Boolean array of shape (..., 52)
+        trump (int): Trump suit index
+        num_players (int): Number of players
+        cards (int): Cards per hand
+        seat (array | int): Seat counted from the player leading the first trick
+    """
+    held = np.asarray(hands, dtype=np.uint64).reshape(*np.shape(hands)[:-1], 4, RANKS)
+    lengths = held.sum(axis=-1)
+    trump_length, trump_honours, side_codes, side = _suit_features(lengths, held, trump)
+
+    base = (np.uint64(num_players) * np.uint64(16) + np.uint64(cards)) * np.uint64(8) \
+        + np.asarray(seat, dtype=np.uint64)
+    base = (base * np.uint64(16) + trump_length) * np.uint64(16) + trump_honours
+
+    fine = base
+    for index in range(3):
+        fine = fine * np.uint64(128) + side_codes[..., index]
+
+    side_aces = held[..., side, 12].sum(axis=-1)
+    side_kings = held[..., side, 11].sum(axis=-1)
+    short_suits = (lengths[..., side] <= 1).sum(axis=-1, dtype=np.uint64)
+    coarse = ((base * np.uint64(4) + side_aces) * np.uint64(4) + side_kings) \
+        * np.uint64(4) + short_suits
+    return fine, coarse | COARSE_FLAG
+
+
+def build_tables(deals: int = 200_000,
+                 players: tuple = (3, 4, 5, 6),
+                 round_sizes: tuple = (6, 7, 8),
+                 seed: int = 0,
+                 batch: int = 20_000) -> np.ndarray:
+    """
+    Returns the bid tables computed from simulated deals
+
+    Every deal is played out with probability_engine.simulate_rounds and
+    the tricks of every seat are added to the entry of its hand. Entries
+    are keyed by the trump length and honours, the side suit lengths and
+    honours sorted longest first, the seat, the round size and the number
+    of players. A coarse entry per seat with only honour and short suit
+    counts is used to correct fine entries seen in few deals.
+
+    Args:
+        deals (int): Deals simulated for every number of players and round size
+        players (tuple): Numbers of players to cover
+        round_sizes (tuple): Round sizes to cover
+        seed (int): Seed of the simulated deals
+        batch (int): Deals simulated at once
+    """
+    rng = np.random.default_rng(seed)
+    # the suit of trumps does not matter, every key is relative to it
+    trump = bitboard.suit_index("Hearts")
+    counts = {}
+
+    for num_players in players:
+        for cards in round_sizes:
+            seats = np.arange(num_players)
+            for start in range(0, deals, batch):
+                hands = pe.deal_hands(rng, min(batch, deals - start), num_players, cards)
+                tricks = pe.simulate_rounds(hands, trump)
+                fine, coarse = _keys(hands, trump, num_players, cards, seats)
+                for keys in (fine, coarse):
+                    _accumulate(counts, keys.ravel(), tricks.ravel())
+
+    keys = np.array(sorted(counts), dtype=np.uint64)
+    table = np.zeros(len(keys), dtype=TABLE_DTYPE)
+    table["key"] = keys
+    for row, key in enumerate(keys):
+        histogram = counts[int(key)]
+        total = histogram.sum()
+        table["count"][row] = min(total, np.iinfo(np.uint32).max)
+        table["probs"][row] = np.round(histogram / total * 65535)
+    return table
+
+
+def _accumulate(counts: dict, keys: np.ndarray, tricks: np.ndarray):
+    unique, inverse = np.unique(keys, return_inverse=True)
+    histograms = np.zeros((len(unique), MAX_TRICKS + 1), dtype=np.int64)
+    np.add.at(histograms, (inverse, tricks), 1)
+    for key, histogram in zip(unique.tolist(), histograms):
+        if key in counts:
+            counts[key] += histogram
+        else:
+            counts[key] = histogram
+
+
+def save_tables(table: np.ndarray, path: str = DEFAULT_PATH):
+    np.save(path, table)
+    _tables.pop(path, None)
+
+
+def load_tables(path: str = DEFAULT_PATH):
+    """
+    Returns the memory-mapped bid tables, loaded on first use, or None if
+    the tables have not been built
+
+    A missing file is not cached, so tables built later are picked up.
+    """
+    if path not in _tables:
+        if not os.path.exists(path):
+            return None
+        _tables[path] = np.load(path, mmap_mode="r")
+    return _tables[path]
+
+
+def _find(table: np.ndarray, key: np.uint64):
+    row = int(np.searchsorted(table["key"], key))
+    if row < len(table) and table["key"][row] == key:
+        return int(table["count"][row]), table["probs"][row].astype(float) / 65535
+    return 0, None
+
+
+def lookup(hand: int, trump: int, num_players: int, seat: int,
+           path: str = DEFAULT_PATH) -> np.ndarray:
+    """
+    Returns the precomputed trick distribution of a hand, or None when the
+    tables are missing or do not cover it
+
+    The entry of the hand's exact shape is corrected towards the coarse
+    entry of its honour counts in proportion to how few deals it was seen in.
+
+    Args:
+        hand (int): Card mask of the hand at the start of the round
+        trump (int): Trump suit index
+        num_players (int): Number of players
+        seat (int): Seat counted from the player leading the first trick
+        path (str): Location of the tables
+    """
+    table = load_tables(path)
+    cards = bitboard.count(hand)
+    if table is None or trump == bitboard.NO_SUIT or not 0 < cards <= MAX_TRICKS:
+        return None
+
+    hands = np.zeros(bitboard.NUM_CARDS, dtype=bool)
+    hands[bitboard.mask_to_ids(hand)] = True
+    fine, coarse = _keys(hands, trump, num_players, cards, seat)
+
+    fine_count, fine_probs = _find(table, fine)
+    coarse_count, coarse_probs = _find(table, coarse)
+    if fine_probs is None and coarse_probs is None:
+        return None
+    if coarse_probs is None:
+        distribution = fine_probs
+    elif fine_probs is None:
+        distribution = coarse_probs
+    else:
+        distribution = (fine_count * fine_probs + PRIOR_DEALS * coarse_probs) \
+            / (fine_count + PRIOR_DEALS)
+
+    distribution = distribution[:cards + 1]
+    return distribution / distribution.sum()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the precomputed bid tables")
+    parser.add_argument("--deals", type=int, default=200_000,
+                        help="deals per number of players and round size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    arguments = parser.parse_args()
+
+    tables = build_tables(arguments.deals, seed=arguments.seed)
+    save_tables(tables, arguments.output)
+    print(f"Saved {len(tables)} entries to {arguments.output}")
@@ -0,0 +1,217 @@
+# Contents of the exact endgame solver and its on-disk cache of solved positions
+
+import atexit
+import os
+import warnings
+from hashlib import blake2b
+from itertools import combinations
+import numpy as np
+from double_dummy import DoubleDummySolver
+from Utils import bitboard
+from Utils.bitboard import SUIT_MASKS, CARD_MASKS, RANKS, NO_SUIT
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                         "nomination")
+DEFAULT_PATH = os.path.join(CACHE_DIR, "endgame_cache.npy")
+
+# largest hand, and number of consistent deals, that are solved exhaustively
+ENDGAME_CARDS = 3
+MAX_DEALS = 5000
+
+CACHE_DTYPE = np.dtype([
+    ("key", "<u8"),
+    ("tricks", "u1"),
+])
+
+_caches = {}
+
+
+def canonical_key(hands: list[int], trump: int, leader: int,
+                  trick: list[int], target: int, avoid: bool = False) -> int:
+    """
+    Returns a 64 bit key shared by every position with the same solution
+
+    Seats are counted from the leader and each live card is replaced by
+    its owner, or its place in the current trick, in rank order within
+    its suit. Cards already played drop out, the trump suit comes first
+    and the side suits are sorted, so positions that only differ by dead
+    cards or by a swap of side suits share a key.
+
+    Args:
+        hands (list[int]): Card mask of every seat, in playing order
+        trump (int): Trump suit index, -1 for no trump
+        leader (int): Seat that led the current trick
+        trick (list[int]): Card ids played to the current trick
+        target (int): Seat whose tricks are counted
+        avoid (bool): True for the tricks the target can avoid winning
+    """
+    num_seats = len(hands)
+    owners = {}
+    for seat, hand in enumerate(hands):
+        for card in bitboard.mask_to_ids(hand):
+            owners[card] = (seat - leader) % num_seats
+    for position, card in enumerate(trick):
+        owners[card] = num_seats + position
+
+    layouts = [[] for _ in range(4)]
+    for card in sorted(owners, reverse=True):
+        layouts[card // RANKS].append(owners[card])
+    layouts = [tuple(layout) for layout in layouts]
+
+    if trump != NO_SUIT:
+        trump_layout = layouts.pop(trump)
+        layouts = [trump_layout] + sorted(layouts)
+    else:
+        layouts.sort()
+
+    position = (num_seats, (target - leader) % num_seats, trump != NO_SUIT, tuple(layouts))
+    if avoid:
+        # keys of positions solved for the most tricks are left as they were
+        position += ("avoid",)
+    digest = blake2b(repr(position).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class EndgameCache:
+    """
+    Solved endgame positions by canonical key, kept on disk between games
+
+    Entries are only kept in memory until save is called, which the
+    caches returned by load_cache do at exit.
+
+    Attributes:
+        path (str): Location of the cache, None to keep it in memory only
+        entries (dict): Canonical key to the tricks the target can win
+        added (int): Entries added since the cache was last saved
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.entries = {}
+        self.added = 0
+        if path and os.path.exists(path):
+            table = np.load(path)
+            self.entries = dict(zip(table["key"].tolist(), table["tricks"].tolist()))
+
+    def get(self, key: int):
+        return self.entries.get(key)
+
+    def put(self, key: int, tricks: int):
+        self.entries[key] = tricks
+        self.added += 1
+
+    def save(self) -> bool:
+        """
+        Writes the cache to its path if anything was added, returns
+        False if the file could not be written
+
+        A failed write only warns, the entries stay in memory and are
+        written by the next save.
+        """
+        if not self.path or not self.added:
+            return True
+        table = np.zeros(len(self.entries), dtype=CACHE_DTYPE)
+        table["key"] = np.fromiter(self.entries, dtype=np.uint64, count=len(self.entries))
+        table["tricks"] = list(self.entries.values())
+        # written aside and renamed, so a reader never sees half a file
+        temporary = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(temporary, "wb") as file:
+                np.save(file, table)
+            os.replace(temporary, self.path)
+        except OSError as error:
+            warnings.warn(f"Could not save the endgame cache to {self.path}: {error}")
+            return False
+        self.added = 0
+        return True
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def load_cache(path: str = None) -> EndgameCache:
+    """
+    Returns the cache stored at path, DEFAULT_PATH if not given, loaded
+    on first use and saved at exit
+    """
+    path = path or DEFAULT_PATH
+    if path not in _caches:
+        _caches[path] = EndgameCache(path)
+    return _caches[path]
+
+
+def save_caches():
+    """Saves every cache returned by load_cache that has new entries"""
+    for cache in _caches.values():
+        cache.save()
+
+
+atexit.register(save_caches)
+
+
+def deals(pool: int, seats: list):
+    """
+    Yields every deal of cards from the pool to the seats, as a dict of
+    key to card mask. Cards that are not dealt stay in the deck.
+
+    Args:
+        pool (int): Mask of the cards to deal
+        seats (list): (key, size, allowed suit indexes) of every seat
+    """
+    if not seats:
+        yield {}
+        return
+    (key, size, allowed), rest = seats[0], seats[1:]
+    allowed_mask = 0
+    for suit in allowed:
+        allowed_mask |= SUIT_MASKS[suit]
+
+    for cards in combinations(bitboard.mask_to_ids(pool & allowed_mask), size):
+        hand = bitboard.hand_mask(cards)
+        for deal in deals(pool & ~hand, rest):
+            deal[key] = hand
+            yield deal
+
+
+def card_outcomes(hands: list[int], trump: int, leader: int, trick: list[int],
+                  target: int, cache: EndgameCache, solver: DoubleDummySolver = None,
+                  avoid: bool = False) -> dict:
+    """
+    Returns the tricks the target can win after each legal card of the
+    seat to move, or with avoid the tricks it can avoid winning, solving
+    exactly every position missing from the cache
+
+    Args:
+        hands (list[int]): Card mask of every seat, in playing order
+        trump (int): Trump suit index, -1 for no trump
+        leader (int): Seat that led the current trick
+        trick (list[int]): Card ids played to the current trick
+        target (int): Seat whose tricks are counted
+        cache (EndgameCache): Cache of solved positions
+        solver (DoubleDummySolver): Optional solver for the target, with
+            the same avoid, whose transposition table is shared between calls
+        avoid (bool): True to count the tricks the target can avoid winning
+
+    Returns:
+        dict: Card id to the maximum tricks for the target
+    """
+    seat = (leader + len(trick)) % len(hands)
+    led = trick[0] // RANKS if trick else NO_SUIT
+
+    outcomes = {}
+    for card in bitboard.mask_to_ids(bitboard.legal_moves(hands[seat], led, trump)):
+        after = list(hands)
+        after[seat] ^= CARD_MASKS[card]
+        played = list(trick) + [card]
+        key = canonical_key(after, trump, leader, played, target, avoid)
+        tricks = cache.get(key)
+        if tricks is None:
+            if solver is None:
+                solver = DoubleDummySolver(trump, target, avoid=avoid)
+            tricks = solver.solve(after, leader, played)
+            # a result cut short by the solver's node budget is only a bound
+            if solver.exact:
+                cache.put(key, tricks)
+        outcomes[card] = tricks
+    return outcomes
@@ -0,0 +1,229 @@
+# Contents of the append-only binary event log of games and its fast reader
+#
+# A log file starts with MAGIC and holds games one after another. Each game
+# is a variable length header followed by fixed size EVENT_DTYPE records:
+#     GAME record (value = number of players, extra = number of rounds)
+#     cards in each round, one byte per round
+#     per player: opponent flag, name length, utf-8 name
+#     padding to a multiple of EVENT_DTYPE.itemsize
+#     event records, the last of which is an END record
+# A game cut short by a crash has no END record, or only part of its header,
+# and is skipped by the reader.
+
+import os
+import numpy as np
+
+MAGIC = b"NOMLOG1\0"
+
+EVENT_DTYPE = np.dtype([
+    ("kind", "u1"),
+    ("seat", "u1"),
+    ("value", "u1"),
+    ("extra", "u1"),
+])
+
+# event kinds
+GAME = 0
+PHASE = 1       # value: index of the phase in Phase
+ROUND = 2       # value: round number, extra: cards per hand
+TRUMP = 3       # value: trump suit index
+DRAW = 4        # seat: player the card was drawn for, value: card id
+BID = 5         # seat: bidder, value: bid
+PLAY = 6        # seat: player, value: card id
+TRICK = 7       # seat: winner, value: winning card id
+END = 8
+
+# seat of events that belong to no player, e.g. a trump card drawn from the deck
+NO_SEAT = 255
+
+# byte a field of -1 is stored as, e.g. the trump of a round without one;
+# records are read back as unsigned bytes, so it reads as 255
+MINUS_ONE = 255
+
+# records read at a time while looking for the end of a game
+_SCAN_RECORDS = 4096
+
+
+class EventLog:
+    """
+    Writes games to an append-only event log, one record per event
+
+    Records are buffered and flushed when a game ends. A game left without
+    its END record by a crash is cut off when the log is next opened, so
+    new games are appended after the last complete one.
+
+    Attributes:
+        path (str): Location of the log
+        games (int): Games written since the log was opened
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.games = 0
+        if os.path.exists(path) and os.path.getsize(path):
+            length = complete_length(path)
+            if length < os.path.getsize(path):
+                os.truncate(path, length)
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.in_game = False
+
+    def start_game(self, names: list[str], opponents: list[bool], cards_per_round: list[int]):
+        """Writes the header of a new game, seats being numbered in the order of names"""
+        if self.in_game:
+            raise ValueError("The previous game has not ended")
+        header = bytearray([GAME, 0, _byte(len(names), "players"),
+                            _byte(len(cards_per_round), "rounds")])
+        header += bytes(_byte(cards, "cards per round") for cards in cards_per_round)
+        for name, opponent in zip(names, opponents):
+            encoded = name.encode()
+            if len(encoded) > 255:
+                raise ValueError(f"Player name is longer than 255 bytes: {name[:20]}...")
+            header += bytes([bool(opponent), len(encoded)]) + encoded
+        header += bytes(-len(header) % EVENT_DTYPE.itemsize)
+        self.file.write(header)
+        self.in_game = True
+
+    def append(self, kind: int, seat: int = NO_SEAT, value: int = 0, extra: int = 0):
+        """Writes one event, its fields being bytes or -1, stored as MINUS_ONE"""
+        if not self.in_game:
+            raise ValueError("No game has been started")
+        self.file.write(bytes((_byte(kind, "kind"), _byte(seat, "seat"),
+                               _byte(value, "value"), _byte(extra, "extra"))))
+
+    def end_game(self):
+        self.append(END)
+        self.in_game = False
+        self.games += 1
+        self.file.flush()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self) -> "EventLog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameRecord:
+    """
+    One game read from an event log
+
+    Attributes:
+        names (list[str]): Player names, in seat order
+        opponents (list[bool]): Whether each seat was a remote opponent
+        cards_per_round (list[int]): Cards per hand in each round
+        events (np.ndarray): EVENT_DTYPE records of the game, ending with
+            END, a view of the log when read through iter_games
+        end (int): Offset in the log just past the game, None if not read from one
+    """
+
+    def __init__(self, names: list[str], opponents: list[bool],
+                 cards_per_round: list[int], events: np.ndarray, end: int = None):
+        self.names = names
+        self.opponents = opponents
+        self.cards_per_round = cards_per_round
+        self.events = events
+        self.end = end
+
+    def of_kind(self, kind: int) -> np.ndarray:
+        return self.events[self.events["kind"] == kind]
+
+    def __repr__(self) -> str:
+        return f"GameRecord(names={self.names}, events={len(self.events)})"
+
+
+def _byte(field: int, name: str) -> int:
+    """Returns field as stored in one byte, MINUS_ONE for -1"""
+    if field == -1:
+        return MINUS_ONE
+    if not 0 <= field <= 255:
+        raise ValueError(f"Event {name} does not fit in a byte: {field}")
+    return field
+
+
+def _read_header(data: np.ndarray, offset: int):
+    """
+    Returns (names, opponents, cards_per_round, offset of the first event),
+    or None if the log ends inside the header
+    """
+    if offset + 4 > len(data):
+        return None
+    kind, _, num_players, num_rounds = data[offset:offset + 4].tolist()
+    if kind != GAME:
+        raise ValueError(f"Expected a game header at byte {offset}")
+    position = offset + 4
+    cards_per_round = data[position:position + num_rounds].tolist()
+    position += num_rounds
+    names, opponents = [], []
+    for _ in range(num_players):
+        if position + 2 > len(data):
+            return None
+        opponent, length = data[position:position + 2].tolist()
+        names.append(data[position + 2:position + 2 + length].tobytes().decode())
+        opponents.append(bool(opponent))
+        position += 2 + length
+    position += -(position - offset) % EVENT_DTYPE.itemsize
+    if position > len(data):
+        return None
+    return names, opponents, cards_per_round, position
+
+
+def _find_end(data: np.ndarray, start: int):
+    """Returns the offset just past the END record of a game, None if it has none"""
+    step = EVENT_DTYPE.itemsize
+    position = start
+    while position < len(data):
+        window = data[position:position + _SCAN_RECORDS * step:step]
+        ends = np.flatnonzero(window == END)
+        if len(ends):
+            return position + (int(ends[0]) + 1) * step
+        position += len(window) * step
+    return None
+
+
+def iter_games(path: str):
+    """
+    Yields every complete game of a log as a GameRecord
+
+    The log is memory-mapped and each game's events are a numpy view of
+    it, so logs stream at the speed of the disk without copying.
+    """
+    if not os.path.getsize(path):
+        return
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    if data[:len(MAGIC)].tobytes() != MAGIC:
+        raise ValueError(f"{path} is not an event log")
+    offset = len(MAGIC)
+    while offset < len(data):
+        header = _read_header(data, offset)
+        if header is None:
+            # the last game was cut short while its header was written
+            return
+        names, opponents, cards_per_round, start = header
+        end = _find_end(data, start)
+        if end is None:
+            # the last game was cut short
+            return
+        events = data[start:end].view(EVENT_DTYPE)
+        yield GameRecord(names, opponents, cards_per_round, events, end)
+        offset = end
+
+
+def complete_length(path: str) -> int:
+    """Returns the length in bytes of the complete games at the start of a log"""
+    length = len(MAGIC)
+    for game in iter_games(path):
+        length = game.end
+    return length
+
+
+def read_games(path: str) -> list[GameRecord]:
+    """Returns every complete game of a log"""
+    return list(iter_games(path))
@@ -1,12 +1,74 @@
+# Contents of the GameState class shared by the game and the probability engine
+
+from Utils import bitboard
+from Utils.bitboard import CARD_MASKS, RANKS
+
+# Inferred constraints on the hands of other players are kept as small ints:
+# void flags have bit s set when a player is void in suit s, and suit length
+# bounds pack the length of each suit in 4 bits, suit s in bits 4s to 4s+3.
+NO_VOIDS = 0
+SUIT_LENGTH_BITS = 4
+
+# mask of the cards a player may hold and suits they may hold, for every set of void flags
+ALLOWED_CARDS = tuple(
+    bitboard.FULL_MASK & ~sum(bitboard.SUIT_MASKS[suit] for suit in range(4) if flags >> suit & 1)
+    for flags in range(16))
+ALLOWED_SUITS = tuple(
+    tuple(suit for suit in range(4) if not flags >> suit & 1) for flags in range(16))
+
+
+def pack_lengths(lengths) -> int:
+    """Packs four suit lengths into one int"""
+    packed = 0
+    for suit, length in enumerate(lengths):
+        packed |= length << (SUIT_LENGTH_BITS * suit)
+    return packed
+
+
+def unpack_length(packed: int, suit: int) -> int:
+    return packed >> (SUIT_LENGTH_BITS * suit) & 0xF
+
+
+def revealed_void(card_id: int, led: int, trump: int) -> int:
+    """
+    Returns the suit a play shows the player to be void in, NO_SUIT if none
+
+    The led suit must be followed if possible but a trump can always be
+    played, so only a card of neither suit reveals a void in the led suit
+    """
+    suit = card_id // RANKS
+    if led == bitboard.NO_SUIT or suit == led or suit == trump:
+        return bitboard.NO_SUIT
+    return led
+
+
 
 class GameState():
     """
     Class for storing the attributes of the current game
+
+    Attributes used by the probability engine:
+        known_cards (list): The local player's hand (Card objects or initials)
+        played_cards (list): Cards drawn from the deck that are no longer in play,
+            e.g. the trump card and cards from previous tricks
+        current_trick (list): Cards on the table for the current trick, in play order
+        hand_sizes (dict): Remaining number of cards held by each opponent, by name
+        players (list): Names in playing order for the current trick,
+            starting with the player who led it
+        local_player (str): Name of the local player
+        bids (dict): Bid of each player this round, by name
+        tricks_won (dict): Tricks won by each player this round, by name
+        played_by (dict): Cards each player has played this round, by name
+        void_flags (dict): Suits each other player has shown to be void in
+            this round, as 4 bit flags, by name
+        suit_lengths (dict): Lowest and highest possible length of each
+            suit in each other player's hand, as packed ints, by name
     """
 
     def __init__(self):
         self.known_cards = []
         self.unknown_cards = []
+        self.played_cards = []
         self.current_trick = []
         self.hand_sizes = {}
         self.trump = ''
@@ -14,7 +76,207 @@ class GameState():
         self.winning_card = ''
         self.trumped = False
         self.players = []
+        self.local_player = ''
+        self.bids = {}
+        self.tricks_won = {}
+        self.played_by = {}
+        self.void_flags = {}
+        self.suit_lengths = {}
         self.current_table = []
         self.round_scores = {}
         self.total_scores = {}
-        
\ No newline at end of file
+
+
+    @classmethod
+    def from_game(cls, game, player) -> "GameState":
+        """
+        Builds the game state seen by a local player
+
+        Cards still in the deck are the unseen cards; every other card that
+        is not in the player's hand, in another local hand or on the table
+        has been drawn and is out of play. Outside the playing phase the
+        table holds the last trick of the previous round, which is out of
+        play, and the first player in the queue leads.
+
+        Args:
+            game (Game): Running game
+            player (Player): Local player the state is built for
+        """
+        state = cls()
+        max_cards = game.cards_per_round[game.round - 1]
+        completed = sum(_player.round_score for _player in game.player_queue)
+        playing = getattr(game.phase, "value", game.phase) == "playing"
+        stack = list(game.table.stack) if playing else []
+        queue = game.temp_player_queue if playing else game.player_queue
+        played_this_trick = {card.owner.name for card in stack if card.owner}
+
+        state.known_cards = list(player.hand)
+        state.current_trick = [card.card_id for card in stack]
+        state.players = [_player.name for _player in queue]
+        state.local_player = player.name
+        state.trump = game.trump_suit
+
+        hidden = game.deck.mask
+        for _player in game.player_queue:
+            if _player.name == player.name:
+                continue
+            if not _player.opponent:
+                hidden |= _player.hand_mask()
+            state.hand_sizes[_player.name] = (
+                max_cards - completed - (_player.name in played_this_trick))
+
+        seen = hidden | player.hand_mask() | bitboard.hand_mask(state.current_trick)
+        state.played_cards = bitboard.mask_to_ids(bitboard.FULL_MASK & ~seen)
+
+        for _player in game.player_queue:
+            if _player.bid > -1:
+                state.bids[_player.name] = _player.bid
+            state.tricks_won[_player.name] = _player.round_score
+        for card in stack:
+            if card.owner:
+                state.played_by.setdefault(card.owner.name, []).append(card.card_id)
+        state.round_scores = {
+            _player.name: _player.round_score for _player in game.player_queue}
+        state.total_scores = dict(game.scoreboard.total_scoreboard)
+        state.void_flags = {name: flags for name, flags in getattr(game, "void_flags", {}).items()
+                            if name in state.hand_sizes}
+        state.update_suit_lengths()
+        return state
+
+    # attributes sent by to_dict, cards as initials
+    _CARD_FIELDS = ("known_cards", "played_cards", "current_trick")
+    _FIELDS = ("hand_sizes", "trump", "players", "local_player", "bids", "tricks_won",
+               "void_flags")
+
+    def to_dict(self) -> dict:
+        """Returns the attributes used by the probability engine as plain JSON types"""
+        data = {field: [bitboard.id_to_initials(bitboard.to_id(card))
+                        for card in getattr(self, field)]
+                for field in self._CARD_FIELDS}
+        for field in self._FIELDS:
+            value = getattr(self, field)
+            data[field] = value.copy() if isinstance(value, (list, dict)) else value
+        data["played_by"] = {name: [bitboard.id_to_initials(bitboard.to_id(card))
+                                    for card in cards]
+                             for name, cards in self.played_by.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GameState":
+        """
+        Builds a game state from the output of to_dict, cards being given as
+        initials or ids; missing attributes keep their defaults
+        """
+        state = cls()
+        for field in cls._CARD_FIELDS:
+            setattr(state, field, [bitboard.to_id(card) for card in data.get(field, ())])
+        for field in cls._FIELDS:
+            if field in data:
+                value = data[field]
+                setattr(state, field, value.copy() if isinstance(value, (list, dict)) else value)
+        state.played_by = {name: [bitboard.to_id(card) for card in cards]
+                           for name, cards in data.get("played_by", {}).items()}
+        state.update_suit_lengths()
+        return state
+
+    def unseen(self) -> int:
+        """Returns the mask of the cards the local player has not seen"""
+        seen = bitboard.hand_mask(self.known_cards) | bitboard.hand_mask(self.played_cards) \
+            | bitboard.hand_mask(self.current_trick)
+        return bitboard.FULL_MASK & ~seen
+
+    def record_void(self, name: str, suit: int):
+        """Records that a player has no card of a suit left this round"""
+        self.void_flags[name] = self.void_flags.get(name, NO_VOIDS) | 1 << suit
+        self.update_suit_lengths()
+
+    def update_suit_lengths(self):
+        """
+        Derives the bounds on every other player's suit lengths from their
+        hand size, their voids and the unseen cards of each suit
+        """
+        unseen = self.unseen()
+        counts = [bitboard.count(unseen & bitboard.SUIT_MASKS[suit]) for suit in range(4)]
+        self.suit_lengths = {}
+        for name, size in self.hand_sizes.items():
+            flags = self.void_flags.get(name, NO_VOIDS)
+            high = [0 if flags >> suit & 1 else min(size, counts[suit]) for suit in range(4)]
+            low = [max(size - sum(high) + high[suit], 0) for suit in range(4)]
+            self.suit_lengths[name] = (pack_lengths(low), pack_lengths(high))
+
+    def suit_length_range(self, name: str, suit: int) -> tuple:
+        """Returns the lowest and highest number of cards of a suit a player can hold"""
+        low, high = self.suit_lengths[name]
+        return unpack_length(low, suit), unpack_length(high, suit)
+
+    def allowed_cards(self, name: str) -> int:
+        """Returns the mask of the cards of the suits a player may still hold"""
+        return ALLOWED_CARDS[self.void_flags.get(name, NO_VOIDS)]
+
+    def allowed_suits(self, name: str) -> tuple:
+        """Returns the suit indexes a player may still hold"""
+        return ALLOWED_SUITS[self.void_flags.get(name, NO_VOIDS)]
+
+    def legal_cards(self, name: str) -> int:
+        """
+        Returns the mask of the cards a player may play to the current trick:
+        the legal moves of the local hand, or the unseen cards of the suits
+        another player may still hold
+        """
+        led = bitboard.to_id(self.current_trick[0]) // RANKS if self.current_trick \
+            else bitboard.NO_SUIT
+        if name == self.local_player:
+            return bitboard.legal_moves(bitboard.hand_mask(self.known_cards), led,
+                                        bitboard.suit_index(self.trump))
+        return self.unseen() & self.allowed_cards(name)
+
+    def record_bid(self, name: str, bid: int):
+        """Records a bid made by a player this round"""
+        if name not in self.players:
+            raise ValueError(f"Unknown player: {name}")
+        self.bids[name] = bid
+
+    def record_play(self, name: str, card):
+        """
+        Records a card played to the current trick, which must be by the
+        next player; a full trick goes to its winner, who leads the next
+
+        Args:
+            name (str): Name of the player
+            card (Card | str | int): Card played
+        """
+        if len(self.current_trick) >= len(self.players) or \
+                self.players[len(self.current_trick)] != name:
+            raise ValueError(f"{name} is not the next player to play")
+        card_id = bitboard.to_id(card)
+        if name == self.local_player:
+            held = [bitboard.to_id(known) for known in self.known_cards]
+            if card_id not in held:
+                raise ValueError(f"{name} does not hold {bitboard.id_to_initials(card_id)}")
+            del self.known_cards[held.index(card_id)]
+        elif self.hand_sizes.get(name, 0) > 0:
+            if not self.legal_cards(name) & CARD_MASKS[card_id]:
+                raise ValueError(f"{name} cannot hold {bitboard.id_to_initials(card_id)}")
+            self.hand_sizes[name] -= 1
+        else:
+            raise ValueError(f"{name} has no cards left")
+
+        self.current_trick = [bitboard.to_id(played) for played in self.current_trick]
+        if self.current_trick and name != self.local_player:
+            void = revealed_void(card_id, self.current_trick[0] // RANKS,
+                                 bitboard.suit_index(self.trump))
+            if void != bitboard.NO_SUIT:
+                self.void_flags[name] = self.void_flags.get(name, NO_VOIDS) | 1 << void
+        self.current_trick.append(card_id)
+        self.played_by.setdefault(name, []).append(card_id)
+        if len(self.current_trick) < len(self.players):
+            self.update_suit_lengths()
+            return
+
+        winner = bitboard.trick_winner(self.current_trick, bitboard.suit_index(self.trump))
+        self.tricks_won[self.players[winner]] = self.tricks_won.get(self.players[winner], 0) + 1
+        self.played_cards = list(self.played_cards) + self.current_trick
+        self.current_trick = []
+        self.players = self.players[winner:] + self.players[:winner]
+        self.update_suit_lengths()
+
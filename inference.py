@@ -0,0 +1,194 @@
+# Contents of the inference tracker which keeps where every unseen card is likely to be
+
+import numpy as np
+import opponent_model
+import probability_engine as pe
+from game_state import GameState
+from Utils import bitboard
+
+# column of the matrix for cards still in the deck
+DECK = "deck"
+
+
+class InferenceTracker:
+    """
+    Probability of every card being in every seat's hand, as seen by one
+    local player, kept up to date as the round is played
+
+    The tracker holds a WorldPool of sampled deals of the unseen cards and
+    the weighted count of the deals in which each opponent holds each
+    card, each deal being weighted by the likelihood of the opponents'
+    bids given the hand it deals them. When a card is played only the
+    deals the WorldPool drops and the ones it samples to replace them are
+    counted again, so the matrix is updated in time proportional to the
+    change rather than the size of the pool. A bid changes the weight of
+    every deal, so the counts are rebuilt once for each opponent's bid.
+
+    Attributes:
+        players (list): Names of the seats, the columns of the matrix
+        local_player (str): Name of the player the tracker sees for
+        trump (int): Trump suit index
+        pool (WorldPool): Sampled deals of the unseen cards to the opponents
+        opponents (list): Names of the players whose hands are sampled
+        known (int): Mask of the local player's hand
+        out (int): Mask of the cards out of play
+        bids (dict): Bid of each player this round, by name
+        played_by (dict): Mask of the cards each player has played, by name
+        counts (np.ndarray): Weighted count of the deals in which each
+            opponent holds each card, of shape (opponents, 52)
+        total (float): Total weight of the deals in the pool
+    """
+
+    def __init__(self, game_state: GameState, pool_size: int = 200,
+                 voids: dict = None, seed: int = None):
+        """
+        Args:
+            game_state (GameState): State seen by the local player, e.g.
+                once the hands have been assigned
+            pool_size (int): Number of deals kept in the pool
+            voids (dict): Suits each opponent is known to be void in, by name
+            seed (int): Optional seed for the sampled deals
+        """
+        self.players = list(game_state.players)
+        self.local_player = game_state.local_player
+        self.trump = bitboard.suit_index(game_state.trump)
+        self.pool = pe.WorldPool(game_state, pool_size, voids, seed)
+        self.opponents = list(game_state.hand_sizes)
+        self.known = bitboard.hand_mask(game_state.known_cards)
+        self.out = bitboard.FULL_MASK & ~(pe.unseen_mask(game_state) | self.known)
+        self.bids = dict(game_state.bids)
+        self.played_by = {name: bitboard.hand_mask(cards)
+                          for name, cards in game_state.played_by.items()}
+        self.weights = {}
+        self._rebuild()
+
+    @classmethod
+    def from_game(cls, game, player, pool_size: int = 200, seed: int = None) -> "InferenceTracker":
+        """Returns the tracker of a local player of a running game"""
+        return cls(GameState.from_game(game, player), pool_size, seed=seed)
+
+    def _masks(self, worlds: list) -> np.ndarray:
+        return np.array([[world[name] for name in self.opponents] for world in worlds],
+                        dtype=np.uint64).reshape(len(worlds), len(self.opponents))
+
+    def _likelihood(self, masks: np.ndarray) -> np.ndarray:
+        """Returns the likelihood of the opponents' bids for each deal"""
+        bids = np.array([self.bids.get(name, -1) for name in self.opponents])
+        if not (bids >= 0).any():
+            return np.ones(len(masks))
+        played = np.array([self.played_by.get(name, 0) for name in self.opponents],
+                          dtype=np.uint64)
+        # the bids were made with the cards already played this round
+        hands = opponent_model.masks_to_array(masks | played)
+        return opponent_model.bid_likelihood(
+            bids, hands, self.trump, len(self.players)).prod(axis=-1)
+
+    def _count(self, worlds: list, sign: int):
+        """Adds the deals to the counts, or takes them away for a sign of -1"""
+        if not worlds:
+            return
+        masks = self._masks(worlds)
+        if sign > 0:
+            weights = self._likelihood(masks)
+            for world, weight in zip(worlds, weights):
+                self.weights[id(world)] = weight
+        else:
+            weights = np.array([self.weights.pop(id(world)) for world in worlds])
+        held = opponent_model.masks_to_array(masks)
+        self.counts += sign * np.einsum("n,nos->os", weights, held)
+        self.total += sign * float(weights.sum())
+
+    def _rebuild(self):
+        """Counts every deal of the pool again, e.g. after their weights change"""
+        self.weights = {}
+        self.counts = np.zeros((len(self.opponents), bitboard.NUM_CARDS))
+        self.total = 0.0
+        self._count(self.pool.worlds, 1)
+
+    def observe_bid(self, name: str, bid: int):
+        """Records a bid, which reweights every deal if an opponent made it"""
+        self.bids[name] = bid
+        if name in self.opponents:
+            self._rebuild()
+
+    def observe_play(self, name: str, card, void_flags: dict = None):
+        """
+        Records a card played to the table
+
+        The WorldPool drops the deals that give a player a suit the void
+        flags show them to be void in. Raises ValueError if no deal is
+        consistent with the play.
+
+        Args:
+            name (str): Name of the player
+            card (Card | str | int): Card played
+            void_flags (dict): Void flags of the game state once the play
+                is recorded, e.g. GameState.void_flags or Game.void_flags
+        """
+        card_id = bitboard.to_id(card)
+        mask = bitboard.CARD_MASKS[card_id]
+        self.out |= mask
+        self.known &= ~mask
+        self.played_by[name] = self.played_by.get(name, 0) | mask
+
+        dropped, added = self.pool.observe(name, card_id, void_flags)
+        self._count(dropped, -1)
+        if name in self.opponents:
+            # the deals left all gave them the card, which is now on the table
+            self.counts[self.opponents.index(name), card_id] = 0.0
+        self._count(added, 1)
+
+    @property
+    def voids(self) -> dict:
+        """Suit indexes each opponent has shown to be void in, by name"""
+        return self.pool.voids
+
+    def probabilities(self) -> np.ndarray:
+        """
+        Returns the matrix of the probability of each card being in each
+        seat's hand, of shape (52, seats + 1), the last column being the
+        deck; cards out of play are 0 in every column
+        """
+        matrix = np.zeros((bitboard.NUM_CARDS, len(self.players) + 1))
+        if self.total > 0:
+            for index, name in enumerate(self.opponents):
+                matrix[:, self.players.index(name)] = np.clip(
+                    self.counts[index] / self.total, 0.0, 1.0)
+        if self.local_player in self.players:
+            matrix[:, self.players.index(self.local_player)] = \
+                opponent_model.masks_to_array(self.known)
+        in_play = ~opponent_model.masks_to_array(self.out)
+        matrix[:, -1] = np.where(in_play, np.clip(1.0 - matrix[:, :-1].sum(axis=1), 0.0, 1.0), 0.0)
+        return matrix
+
+    def holders(self, card) -> list:
+        """
+        Returns the (seat name, probability) pairs of the seats that may
+        hold a card, most likely first, the deck being named DECK
+        """
+        row = self.probabilities()[bitboard.to_id(card)]
+        names = self.players + [DECK]
+        return sorted(((names[index], float(row[index]))
+                       for index in np.flatnonzero(row > 0)),
+                      key=lambda holder: -holder[1])
+
+    def describe(self, card) -> str:
+        """Returns who may hold a card as a line for the console"""
+        card_id = bitboard.to_id(card)
+        initials = bitboard.id_to_initials(card_id)
+        holders = self.holders(card_id)
+        if not holders:
+            return f"{initials} has been played"
+        return f"{initials}: " + ", ".join(
+            f"{name} {probability:.0%}" for name, probability in holders)
+
+    def proposal(self) -> dict:
+        """
+        Returns the probability of each of the 52 cards being in each
+        opponent's hand, by name, to sample deals from with
+        probability_engine.ProposalSampler
+        """
+        if self.total <= 0:
+            return {}
+        return {name: np.clip(self.counts[index] / self.total, 0.0, 1.0)
+                for index, name in enumerate(self.opponents)}
@@ -1,8 +1,17 @@
 # contents of the game loop
 
+import argparse
 from Classes.GameManager import Game
 from Classes.PlayerClass import Player
+from event_log import EventLog
 
-                 
-game = Game()
+parser = argparse.ArgumentParser(description="Nomination whist advisor")
+parser.add_argument("--event-log", default=None,
+                    help="append the game's events to this log")
+arguments = parser.parse_args()
+
+event_log = EventLog(arguments.event_log) if arguments.event_log else None
+game = Game(event_log=event_log)
 game.start()
+if event_log:
+    event_log.close()
@@ -1,6 +1,369 @@
-def random():
- pass
-def greedy():
- pass
-def bid_aware():
- pass
+# Contents of the opponent model used to weight and play out sampled worlds
+
+import numpy as np
+from Utils import bitboard
+from Utils.bitboard import RANKS
+
+# least squares fit of the tricks won in deals played out with
+# probability_engine.simulate_rounds, 3 to 6 players and 6 to 8 cards
+# features: trump A K Q J, trump length, side aces, kings, queens,
+# short side suits (0 or 1 card) and cards per player
+TRICK_MODEL = np.array([0.318, 0.251, 0.186, 0.138, 0.598,
+                        0.187, 0.132, 0.068, -0.12, 0.296])
+
+# spread of the tricks around the estimate, also in simulated deals
+BID_SIGMA = 0.92
+
+_BITS = np.arange(bitboard.NUM_CARDS, dtype=np.uint64)
+
+# suit and rank (0 for a two) of every card id
+CARD_SUITS = np.arange(bitboard.NUM_CARDS) // RANKS
+CARD_RANKS = np.arange(bitboard.NUM_CARDS) % RANKS
+
+
+def masks_to_array(masks) -> np.ndarray:
+    """Returns card masks as a boolean array with a last axis of 52 cards"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    return ((masks[..., None] >> _BITS) & np.uint64(1)).astype(bool)
+
+
+def hand_features(hands, trump: int, num_players: int) -> np.ndarray:
+    """
+    Returns the features of TRICK_MODEL for hands at the start of a round
+
+    Args:
+        hands (array): Boolean array of shape (..., 52)
+        trump (int): Trump suit index, -1 for no trump
+        num_players (int): Number of players
+    """
+    held = np.asarray(hands, dtype=float).reshape(*np.shape(hands)[:-1], 4, RANKS)
+    lengths = held.sum(axis=-1)
+    side = [suit for suit in range(4) if suit != trump]
+
+    if trump == bitboard.NO_SUIT:
+        trumps = [np.zeros(held.shape[:-2])] * 5
+    else:
+        trumps = [held[..., trump, 12], held[..., trump, 11],
+                  held[..., trump, 10], held[..., trump, 9], lengths[..., trump]]
+
+    return np.stack(trumps + [
+        held[..., side, 12].sum(axis=-1),
+        held[..., side, 11].sum(axis=-1),
+        held[..., side, 10].sum(axis=-1),
+        (lengths[..., side] <= 1).sum(axis=-1),
+        lengths.sum(axis=-1) / num_players,
+    ], axis=-1)
+
+
+def estimate_tricks(hands, trump: int, num_players: int) -> np.ndarray:
+    """Returns a fast estimate of the tricks each hand wins in a round"""
+    return hand_features(hands, trump, num_players) @ TRICK_MODEL
+
+
+def bid_likelihood(bids, hands, trump: int, num_players: int) -> np.ndarray:
+    """
+    Returns the relative likelihood of each bid given the hand it was made with
+
+    The tricks a hand wins are modelled as normal around estimate_tricks,
+    and a player is assumed to bid close to what they expect to win. The
+    values are relative: only ratios between hands for the same bid matter.
+
+    Args:
+        bids (array): Bids, broadcast against the hands, -1 when not known
+        hands (array): Boolean array of shape (..., 52) of the full hands
+        trump (int): Trump suit index, -1 for no trump
+        num_players (int): Number of players
+    """
+    bids = np.asarray(bids)
+    error = bids - estimate_tricks(hands, trump, num_players)
+    likelihood = np.exp(-0.5 * (error / BID_SIGMA) ** 2)
+    return np.where(bids < 0, 1.0, likelihood)
+
+
+# Batch policies
+#
+# Every policy chooses a card for the seat to move in each row at once.
+# hands is a boolean array of shape (N, 52) with the hand of the seat to
+# move, led is the led suit of each row (-1 when the seat leads), best is
+# the score (see card_scores) of the card winning the trick so far and
+# need is the number of tricks the seat still needs to make its bid.
+# Every policy follows the rules of Table._valid_add_to_stack.
+
+
+def is_trump(trump: int) -> np.ndarray:
+    return CARD_SUITS == trump
+
+
+def card_scores(led, trump: int) -> np.ndarray:
+    """
+    Returns the score of every card in every row, as in
+    probability_engine.simulate_trick: trumps outrank the led suit,
+    which outranks every other suit (-1)
+    """
+    led = np.asarray(led)[:, None]
+    return np.where(is_trump(trump), CARD_RANKS + 2 * RANKS,
+                    np.where(CARD_SUITS == led, CARD_RANKS + RANKS, -1))
+
+
+def legal_cards(hands, led, trump: int) -> np.ndarray:
+    """Returns the cards of each hand that may be played to the trick"""
+    follow = hands & (CARD_SUITS == np.asarray(led)[:, None])
+    return np.where(follow.any(axis=1)[:, None], follow | (hands & is_trump(trump)), hands)
+
+
+def _choose(mask, key) -> np.ndarray:
+    """Returns the card with the highest key in each row of mask"""
+    return np.where(mask, key, -1).argmax(axis=1)
+
+
+def random(hands, led, best, trump: int, need=None, rng=None) -> np.ndarray:
+    """Plays a uniformly random legal card"""
+    rng = rng if rng is not None else np.random.default_rng()
+    legal = legal_cards(hands, led, trump)
+    return _choose(legal, rng.random(legal.shape))
+
+
+def greedy(hands, led, best, trump: int, need=None, rng=None) -> np.ndarray:
+    """
+    Tries to win every trick
+
+    Leads its highest side suit card, or its highest trump if it only has
+    trumps. When following it wins as cheaply as it can, otherwise it
+    throws its lowest card, keeping trumps.
+    """
+    trumps = is_trump(trump)
+    legal = legal_cards(hands, led, trump)
+    score = card_scores(led, trump)
+    beats = legal & (score > np.asarray(best)[:, None])
+
+    lead = _choose(hands, CARD_RANKS + RANKS * ~trumps)
+    cheapest_win = _choose(beats, 3 * RANKS - score)
+    discard = _choose(legal, 2 * RANKS - (CARD_RANKS + RANKS * trumps))
+    follow = np.where(beats.any(axis=1), cheapest_win, discard)
+    return np.where(np.asarray(led) < 0, lead, follow)
+
+
+def bid_aware(hands, led, best, trump: int, need=None, rng=None) -> np.ndarray:
+    """
+    Plays greedy while the seat still needs tricks, and ducks once its
+    bid is made
+
+    Ducking leads the lowest card, keeping trumps, and otherwise plays
+    the highest card that does not win the trick. If every legal card
+    wins it wins as cheaply as it can.
+    """
+    trumps = is_trump(trump)
+    need = np.ones(len(hands), dtype=int) if need is None else np.asarray(need)
+    legal = legal_cards(hands, led, trump)
+    score = card_scores(led, trump)
+    beats = legal & (score > np.asarray(best)[:, None])
+    loses = legal & ~beats
+
+    lead_low = _choose(hands, 2 * RANKS - (CARD_RANKS + RANKS * trumps))
+    highest_loser = _choose(loses, CARD_RANKS)
+    cheapest_win = _choose(beats, 3 * RANKS - score)
+    duck = np.where(np.asarray(led) < 0, lead_low,
+                    np.where(loses.any(axis=1), highest_loser, cheapest_win))
+    return np.where(need > 0, greedy(hands, led, best, trump), duck)
+
+
+POLICIES = {"random": random, "greedy": greedy, "bid_aware": bid_aware}
+
+
+# Scalar reference policies, one hand as a card mask at a time, used to
+# test the batch policies. Ties go to the lowest card id, as in argmax.
+
+def _score(card: int, led: int, trump: int) -> int:
+    suit = bitboard.suit_of(card)
+    if suit == trump:
+        return bitboard.rank_of(card) - 2 + 2 * RANKS
+    if suit == led:
+        return bitboard.rank_of(card) - 2 + RANKS
+    return -1
+
+
+def _pick(cards: list, key) -> int:
+    return max(cards, key=lambda card: (key(card), -card))
+
+
+def greedy_reference(hand: int, led: int, best: int, trump: int, need: int = 1,
+                     rng=None) -> int:
+    """Scalar version of greedy"""
+    ids = bitboard.mask_to_ids(hand)
+    rank = lambda card: bitboard.rank_of(card) - 2
+    side = lambda card: bitboard.suit_of(card) != trump
+    if led < 0:
+        return _pick(ids, lambda card: rank(card) + RANKS * side(card))
+
+    legal = bitboard.mask_to_ids(bitboard.legal_moves(hand, led, trump))
+    beats = [card for card in legal if _score(card, led, trump) > best]
+    if beats:
+        return _pick(beats, lambda card: -_score(card, led, trump))
+    return _pick(legal, lambda card: -(rank(card) + RANKS * (not side(card))))
+
+
+def bid_aware_reference(hand: int, led: int, best: int, trump: int, need: int = 1,
+                        rng=None) -> int:
+    """Scalar version of bid_aware"""
+    if need > 0:
+        return greedy_reference(hand, led, best, trump)
+
+    ids = bitboard.mask_to_ids(hand)
+    rank = lambda card: bitboard.rank_of(card) - 2
+    if led < 0:
+        return _pick(ids, lambda card: -(rank(card) + RANKS * (bitboard.suit_of(card) == trump)))
+
+    legal = bitboard.mask_to_ids(bitboard.legal_moves(hand, led, trump))
+    loses = [card for card in legal if _score(card, led, trump) <= best]
+    if loses:
+        return _pick(loses, rank)
+    return _pick(legal, lambda card: -_score(card, led, trump))
+
+
+def random_reference(hand: int, led: int, best: int, trump: int, need: int = 1,
+                     rng=None) -> int:
+    """Scalar version of random"""
+    rng = rng if rng is not None else np.random.default_rng()
+    legal = bitboard.mask_to_ids(bitboard.legal_moves(hand, led, trump))
+    return legal[rng.integers(len(legal))]
+
+
+REFERENCE_POLICIES = {"random": random_reference, "greedy": greedy_reference,
+                      "bid_aware": bid_aware_reference}
+
+
+# Scalar policies working on the card masks themselves, making the same
+# choices as the reference policies without listing any cards, for
+# HeadlessGame.BitboardGame. Ties go to the lowest card id here too.
+
+# every card of each rank, a two being rank 0
+RANK_MASKS = tuple(sum(1 << suit * RANKS + rank for suit in range(4)) for rank in range(RANKS))
+
+
+# the mask of each trump suit, with no trump (-1) indexing the empty mask at the end
+TRUMP_MASKS = bitboard.SUIT_MASKS + (0,)
+
+
+def _lowest(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+def _lowest_rank(mask: int) -> int:
+    """Returns the lowest ranked card of the mask, or -1"""
+    for rank_mask in RANK_MASKS:
+        if mask & rank_mask:
+            return _lowest(mask & rank_mask)
+    return -1
+
+
+def _highest_rank(mask: int) -> int:
+    """Returns the highest ranked card of the mask, or -1"""
+    for rank_mask in reversed(RANK_MASKS):
+        if mask & rank_mask:
+            return _lowest(mask & rank_mask)
+    return -1
+
+
+def _winners(legal: int, led: int, best: int, trump: int) -> tuple:
+    """Returns the masks of the led suit and trump cards of legal scoring above best"""
+    # -(1 << bit) masks every bit from bit up, the cards above best
+    trumps = 0
+    if trump != bitboard.NO_SUIT:
+        floor = max(best - 2 * RANKS + 1, 0)
+        trumps = legal & bitboard.SUIT_MASKS[trump] & -(1 << trump * RANKS + floor)
+    if led == trump:
+        return 0, trumps
+    floor = max(best - RANKS + 1, 0)
+    return legal & bitboard.SUIT_MASKS[led] & -(1 << led * RANKS + floor), trumps
+
+
+def _discard(legal: int, trump: int) -> int:
+    """Returns the lowest card of legal, keeping trumps"""
+    side = legal & ~TRUMP_MASKS[trump]
+    return _lowest_rank(side) if side else _lowest(legal)
+
+
+def greedy_mask(hand: int, led: int, best: int, trump: int, need: int = 1,
+                rng=None) -> int:
+    """Mask version of greedy"""
+    if led < 0:
+        side = hand & ~TRUMP_MASKS[trump]
+        return _highest_rank(side) if side else hand.bit_length() - 1
+
+    legal = bitboard.legal_moves(hand, led, trump)
+    led_winners, trump_winners = _winners(legal, led, best, trump)
+    if led_winners or trump_winners:
+        # the led suit scores below trumps, so its winners are cheaper
+        return _lowest(led_winners or trump_winners)
+    return _discard(legal, trump)
+
+
+def bid_aware_mask(hand: int, led: int, best: int, trump: int, need: int = 1,
+                   rng=None) -> int:
+    """Mask version of bid_aware"""
+    if need > 0:
+        return greedy_mask(hand, led, best, trump)
+    if led < 0:
+        return _discard(hand, trump)
+
+    legal = bitboard.legal_moves(hand, led, trump)
+    led_winners, trump_winners = _winners(legal, led, best, trump)
+    loses = legal & ~(led_winners | trump_winners)
+    if loses:
+        return _highest_rank(loses)
+    return _lowest(led_winners or trump_winners)
+
+
+MASK_POLICIES = {"greedy": greedy_mask, "bid_aware": bid_aware_mask}
+
+
+_WEIGHTS = TRICK_MODEL.tolist()
+_SUIT = (1 << RANKS) - 1
+
+
+def estimate_hand_tricks(hand: int, trump: int, num_players: int) -> float:
+    """estimate_tricks of a single hand given as a card mask"""
+    estimate = _WEIGHTS[9] * hand.bit_count() / num_players
+    side = hand
+    if trump != bitboard.NO_SUIT:
+        trumps = hand >> trump * RANKS & _SUIT
+        estimate += (_WEIGHTS[0] * (trumps >> 12 & 1) + _WEIGHTS[1] * (trumps >> 11 & 1)
+                     + _WEIGHTS[2] * (trumps >> 10 & 1) + _WEIGHTS[3] * (trumps >> 9 & 1)
+                     + _WEIGHTS[4] * trumps.bit_count())
+        side &= ~bitboard.SUIT_MASKS[trump]
+    short = sum((hand >> suit * RANKS & _SUIT).bit_count() <= 1
+                for suit in range(4) if suit != trump)
+    return (estimate + _WEIGHTS[5] * (side & RANK_MASKS[12]).bit_count()
+            + _WEIGHTS[6] * (side & RANK_MASKS[11]).bit_count()
+            + _WEIGHTS[7] * (side & RANK_MASKS[10]).bit_count() + _WEIGHTS[8] * short)
+
+
+def benchmark(num_rounds: int = 20_000, players: int = 6, cards: int = 8,
+              seed: int = 0) -> dict:
+    """
+    Returns the rollouts per second of every batch policy and of the
+    scalar greedy reference, on random deals played out in full
+    """
+    import time
+    import probability_engine as pe
+
+    rng = np.random.default_rng(seed)
+    hands = pe.deal_hands(rng, num_rounds, players, cards)
+    bids = rng.integers(0, 3, (num_rounds, players))
+
+    results = {}
+    for name, policy in POLICIES.items():
+        start = time.perf_counter()
+        pe.simulate_rounds(hands, 0, policy=policy, bids=bids, rng=rng)
+        results[name] = num_rounds / (time.perf_counter() - start)
+
+    scalar_rounds = max(num_rounds // 20, 1)
+    start = time.perf_counter()
+    pe.simulate_rounds_reference(hands[:scalar_rounds], 0)
+    results["greedy_reference"] = scalar_rounds / (time.perf_counter() - start)
+    return results
+
+
+if __name__ == "__main__":
+    for name, rate in benchmark().items():
+        print(f"{name:>18}: {rate:>12,.0f} rollouts/s")
@@ -1,6 +1,1683 @@
-def generate_worlds():
-    pass
-def simulate_trick():
-    pass
-def evaluate_move(card):
-    pass
\ No newline at end of file
+# Contents of the probability engine used by the advisor
+
+import os
+import random
+import threading
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import count, islice
+from math import comb, log, sqrt
+import numpy as np
+from double_dummy import DoubleDummySolver
+import endgame
+from game_state import ALLOWED_CARDS, ALLOWED_SUITS, NO_VOIDS, GameState
+import opponent_model
+from Utils import bitboard
+from Utils.bitboard import SUIT_MASKS, RANKS
+from opponent_model import CARD_SUITS, CARD_RANKS
+
+
+def unseen_mask(game_state: GameState) -> int:
+    """
+    Returns the mask of every card the local player has not seen
+
+    The full deck minus the local hand, the cards on the table and
+    the cards already drawn from the deck
+    """
+    return game_state.unseen()
+
+
+def known_voids(game_state: GameState, voids: dict = None) -> dict:
+    """
+    Returns the suit indexes each opponent is void in, by name, from the
+    void flags of the game state and any voids given
+    """
+    known = {name: {suit for suit in range(4) if flags >> suit & 1}
+             for name, flags in game_state.void_flags.items()}
+    for name, suits in (voids or {}).items():
+        known.setdefault(name, set()).update(bitboard.suit_index(suit) for suit in suits)
+    return known
+
+
+def _allowed_suits(name: str, voids: dict) -> tuple:
+    """Returns the suit indexes a player can still hold"""
+    void_suits = {bitboard.suit_index(suit) for suit in voids.get(name, ())}
+    return tuple(suit for suit in range(4) if suit not in void_suits)
+
+
+def _splits(size: int, allowed: tuple, counts: tuple):
+    """
+    Yields every way of taking size cards from the allowed suits
+    as a tuple of per-suit counts
+    """
+    split = [0] * len(counts)
+
+    def fill(position: int, remaining: int):
+        if position == len(allowed) - 1:
+            suit = allowed[position]
+            if remaining <= counts[suit]:
+                split[suit] = remaining
+                yield tuple(split)
+                split[suit] = 0
+            return
+        suit = allowed[position]
+        for taken in range(min(remaining, counts[suit]) + 1):
+            split[suit] = taken
+            yield from fill(position + 1, remaining - taken)
+        split[suit] = 0
+
+    if not allowed:
+        if size == 0:
+            yield tuple(split)
+        return
+    yield from fill(0, size)
+
+
+class _DealPlan:
+    """
+    Counts the consistent deals for every partial deal so that worlds
+    can be sampled uniformly without rejection.
+
+    Seats are dealt in order; ways(i, counts) is the number of deals of the
+    remaining suit counts to seats i onwards, so every sampled step
+    always leaves at least one consistent completion.
+    """
+
+    def __init__(self, seats: list, suit_counts: tuple):
+        self.seats = seats
+        self.options = {}
+        self.total = self.ways(0, suit_counts)
+
+    def ways(self, index: int, counts: tuple) -> int:
+        if index == len(self.seats):
+            return 1 if not any(counts) else 0
+
+        key = (index, counts)
+        if key in self.options:
+            return self.options[key][2]
+
+        _, size, allowed = self.seats[index]
+        if index == len(self.seats) - 1:
+            # the last seat takes whatever is left
+            fits = sum(counts) == size and all(
+                not count or suit in allowed for suit, count in enumerate(counts))
+            candidates = [counts] if fits else []
+        else:
+            candidates = _splits(size, allowed, counts)
+
+        splits = []
+        cum_weights = []
+        total = 0
+        for split in candidates:
+            weight = self.ways(
+                index + 1,
+                tuple(count - taken for count, taken in zip(counts, split)))
+            if not weight:
+                continue
+            for count, taken in zip(counts, split):
+                if taken:
+                    weight *= comb(count, taken)
+            total += weight
+            splits.append(split)
+            cum_weights.append(total)
+
+        self.options[key] = (splits, cum_weights, total)
+        return total
+
+    def sample_splits(self, counts: tuple, rng: random.Random) -> list:
+        """Returns a per-suit count for every seat"""
+        result = []
+        for index in range(len(self.seats)):
+            splits, cum_weights, _ = self.options[(index, counts)]
+            split = rng.choices(splits, cum_weights=cum_weights)[0]
+            result.append(split)
+            counts = tuple(count - taken for count, taken in zip(counts, split))
+        return result
+
+
+class WorldSampler:
+    """
+    Samples deals of a pool of unseen cards to a set of hands
+
+    Every deal is consistent with the hand sizes and the voids, and deals
+    are sampled uniformly from all consistent deals. Cards that are not
+    dealt to a hand stay in the deck.
+
+    Args:
+        pool (int): Mask of the cards to deal
+        hand_sizes (dict): Number of cards in each hand, by key
+        voids (dict): Suits each hand is known to be void in, by key
+    """
+
+    def __init__(self, pool: int, hand_sizes: dict, voids: dict = None):
+        voids = voids or {}
+        self.cards_by_suit = [
+            [bitboard.CARD_MASKS[card_id]
+             for card_id in bitboard.mask_to_ids(pool & SUIT_MASKS[suit])]
+            for suit in range(4)
+        ]
+        self.suit_counts = tuple(len(cards) for cards in self.cards_by_suit)
+        self.cards = [card for cards in self.cards_by_suit for card in cards]
+        pool_size = sum(self.suit_counts)
+
+        dealt = sum(hand_sizes.values())
+        if dealt > pool_size:
+            raise ValueError("Not enough unseen cards for the opponents' hands")
+
+        seats = []
+        self.free_seats = []
+        for key, size in hand_sizes.items():
+            allowed = _allowed_suits(key, voids)
+            if len(allowed) == 4:
+                self.free_seats.append((key, size))
+            else:
+                seats.append((key, size, allowed))
+
+        # void-constrained players are dealt first, the players without
+        # constraints share the rest with the deck and split it afterwards
+        seats.sort(key=lambda seat: len(seat[2]))
+        seats.append((None, pool_size - sum(size for _, size, _ in seats),
+                      tuple(range(4))))
+        self.seats = seats
+        self.free_cards = sum(size for _, size in self.free_seats)
+
+        self.plan = _DealPlan(seats, self.suit_counts)
+        if not self.plan.total:
+            raise ValueError("No deal is consistent with the known voids")
+
+    def sample(self, rng: random.Random) -> dict:
+        """Returns one deal as a dict of key to card mask"""
+        if len(self.seats) == 1:
+            # without voids a single draw of the dealt cards is enough
+            return self._split(rng.sample(self.cards, self.free_cards))
+
+        # shuffled copies, so each deal only depends on the rng state
+        cards_by_suit = [list(cards) for cards in self.cards_by_suit]
+        for cards in cards_by_suit:
+            rng.shuffle(cards)
+        positions = [0, 0, 0, 0]
+
+        world = {}
+        splits = self.plan.sample_splits(self.suit_counts, rng)
+        for (key, _, _), split in zip(self.seats, splits):
+            if key is None:
+                break
+            hand = 0
+            for suit, taken in enumerate(split):
+                if taken:
+                    start = positions[suit]
+                    for card in cards_by_suit[suit][start:start + taken]:
+                        hand |= card
+                    positions[suit] = start + taken
+            world[key] = hand
+
+        if self.free_seats:
+            rest = [card
+                    for suit, cards in enumerate(cards_by_suit)
+                    for card in cards[positions[suit]:]]
+            rng.shuffle(rest)
+            world.update(self._split(rest))
+        return world
+
+    def count_deals(self) -> int:
+        """Returns the number of consistent deals"""
+        # constrained deals times the ways to split the rest among free seats
+        remaining = sum(self.suit_counts) - sum(size for _, size, _ in self.seats[:-1])
+        ways = self.plan.total
+        for _, size in self.free_seats:
+            ways *= comb(remaining, size)
+            remaining -= size
+        return ways
+
+    def _split(self, cards: list) -> dict:
+        """Deals shuffled cards to the seats without voids in turn"""
+        world = {}
+        start = 0
+        for key, size in self.free_seats:
+            hand = 0
+            for card in cards[start:start + size]:
+                hand |= card
+            world[key] = hand
+            start += size
+        return world
+
+
+class ProposalSampler:
+    """
+    Samples deals of a pool of unseen cards from per-card probabilities of
+    where each card is, e.g. the marginals of an inference.InferenceTracker,
+    with the importance correction that makes them stand in for uniform deals
+
+    Cards are dealt one at a time to a hand with room for them and not
+    void in their suit, with probability proportional to the proposal
+    and to the room left in the hand; the rest of the pool stays in the
+    deck. The correction of a deal is
+    its probability under the uniform distribution of WorldSampler over
+    its probability under the proposal, so corrections average to 1 and
+    corrected deals mix freely with uniform ones.
+
+    Args:
+        pool (int): Mask of the cards to deal
+        hand_sizes (dict): Number of cards in each hand, by key
+        voids (dict): Suits each hand is known to be void in, by key
+        probabilities (dict): Probability of each of the 52 cards being
+            in each hand, by key; hands without one get cards in
+            proportion to their size
+        uniform_share (float): Share of a uniform deal mixed into the
+            proposal, which keeps the corrections bounded
+    """
+
+    def __init__(self, pool: int, hand_sizes: dict, voids: dict = None,
+                 probabilities: dict = None, uniform_share: float = 0.1):
+        voids = voids or {}
+        probabilities = probabilities or {}
+        uniform = WorldSampler(pool, hand_sizes, voids)
+        self.log_deals = log(uniform.count_deals())
+        self.keys = list(hand_sizes)
+        self.capacity = [hand_sizes[key] for key in self.keys]
+        self.capacity.append(bitboard.count(pool) - sum(self.capacity))
+
+        seats = len(self.capacity)
+        allowed = [_allowed_suits(key, voids) for key in self.keys] + [tuple(range(4))]
+        # most constrained cards first, so fewer deals run into a dead end
+        card_ids = bitboard.mask_to_ids(pool)
+        card_ids.sort(key=lambda card_id: sum(
+            bitboard.suit_of(card_id) in suits for suits in allowed))
+
+        self.cards = []
+        for card_id in card_ids:
+            suit = bitboard.suit_of(card_id)
+            weights = []
+            for seat in range(seats):
+                if suit not in allowed[seat]:
+                    weights.append(None)
+                    continue
+                if seat < len(self.keys) and self.keys[seat] in probabilities:
+                    weight = float(probabilities[self.keys[seat]][card_id])
+                elif seat < len(self.keys):
+                    weight = hand_sizes[self.keys[seat]] / max(bitboard.count(pool), 1)
+                else:
+                    weight = max(1.0 - sum(float(probabilities[key][card_id])
+                                           for key in probabilities if key in hand_sizes), 0.0)
+                weights.append(weight)
+            self.cards.append((card_id, weights))
+        self.uniform_share = uniform_share
+        self.attempts = 0
+        self.accepted = 0
+
+    def sample(self, rng: random.Random) -> tuple:
+        """
+        Returns one deal as a dict of key to card mask and its importance
+        correction
+        """
+        world, log_correction = self.sample_log(rng)
+        return world, np.exp(log_correction)
+
+    def sample_log(self, rng: random.Random) -> tuple:
+        """
+        Returns one deal as a dict of key to card mask and the log of its
+        importance correction
+        """
+        while True:
+            self.attempts += 1
+            dealt = self._deal(rng)
+            if dealt is not None:
+                self.accepted += 1
+                world, log_proposal = dealt
+                # deals that ran into a dead end scale every accepted deal alike
+                acceptance = self.accepted / self.attempts
+                return world, log(acceptance) - log_proposal - self.log_deals
+
+    def _deal(self, rng: random.Random):
+        room = list(self.capacity)
+        hands = [0] * len(self.keys)
+        log_proposal = 0.0
+        for card_id, weights in self.cards:
+            open_seats = [seat for seat, weight in enumerate(weights)
+                          if room[seat] and weight is not None]
+            if not open_seats:
+                return None
+            # the room left scales the proposal, so with uniform
+            # probabilities every deal is drawn as WorldSampler would
+            scaled = [weights[seat] * room[seat] / self.capacity[seat] for seat in open_seats]
+            total = sum(scaled)
+            share = self.uniform_share if total else 1.0
+            open_room = sum(room[seat] for seat in open_seats)
+            mixed = [(1 - share) * weight / (total or 1) + share * room[seat] / open_room
+                     for seat, weight in zip(open_seats, scaled)]
+            choice = rng.choices(range(len(open_seats)), weights=mixed)[0]
+            seat = open_seats[choice]
+            log_proposal += log(mixed[choice])
+            room[seat] -= 1
+            if seat < len(hands):
+                hands[seat] |= bitboard.CARD_MASKS[card_id]
+        return dict(zip(self.keys, hands)), log_proposal
+
+
+def generate_worlds(game_state: GameState,
+                    num_worlds: int = 1000,
+                    voids: dict = None,
+                    seed: int = None):
+    """
+    Yields possible deals of the unseen cards to the opponents
+
+    Every deal is consistent with the opponents' hand sizes and their
+    revealed voids, and deals are sampled uniformly from all consistent
+    deals. Cards that are not dealt to an opponent stay in the deck.
+
+    Args:
+        game_state (GameState): Current game state
+        num_worlds (int): Number of worlds to generate
+        voids (dict): Suits each opponent is known to be void in, by name
+            e.g. {"Bob": {"Hearts"}}, on top of the void flags of the state
+        seed (int): Optional seed for reproducible worlds
+
+    Yields:
+        dict: Opponent name to the card mask of their hand
+    """
+
+    rng = random.Random(seed)
+    sampler = WorldSampler(unseen_mask(game_state), game_state.hand_sizes,
+                           known_voids(game_state, voids))
+
+    for _ in range(num_worlds):
+        yield sampler.sample(rng)
+
+
+class WorldPool:
+    """
+    Sampled worlds kept for a whole round and updated as cards are played
+
+    When an opponent plays a card, worlds where they did not hold it, or
+    where they hold a suit the void flags of the game state show them to
+    be void in, are dropped. The pool does not work out voids itself: the
+    caller records the play in its GameState, or Game, and passes the void
+    flags on. The remaining worlds lose the played card and new worlds are
+    sampled to refill the pool. Worlds that survive are uniform samples of
+    the deals still consistent with the play, so mixing them with new
+    worlds keeps the pool uniform.
+
+    Attributes:
+        target (int): Number of worlds kept in the pool
+        pool (int): Mask of the unseen cards
+        hand_sizes (dict): Remaining number of cards held by each opponent
+        void_flags (dict): Void flags of each opponent, as in GameState
+        worlds (list): Opponent name to card mask, one dict per world
+        sampled (int): Number of worlds sampled since the pool was created
+    """
+
+    def __init__(self, game_state: GameState, target: int = 1000,
+                 voids: dict = None, seed: int = None):
+        self.target = target
+        self.pool = unseen_mask(game_state)
+        self.hand_sizes = dict(game_state.hand_sizes)
+        self.void_flags = {name: sum(1 << suit for suit in suits)
+                           for name, suits in known_voids(game_state, voids).items()}
+        self.rng = random.Random(seed)
+        self.worlds = []
+        self.sampled = 0
+        self.refill()
+
+    @property
+    def voids(self) -> dict:
+        """Suit indexes each opponent is known to be void in, by name"""
+        return {name: set(ALLOWED_SUITS[0]) - set(ALLOWED_SUITS[flags])
+                for name, flags in self.void_flags.items() if flags}
+
+    def refill(self) -> list:
+        """Samples new worlds until the pool holds target worlds and returns them"""
+        missing = self.target - len(self.worlds)
+        if missing <= 0:
+            return []
+        sampler = WorldSampler(self.pool, self.hand_sizes, self.voids)
+        added = [sampler.sample(self.rng) for _ in range(missing)]
+        self.worlds.extend(added)
+        self.sampled += missing
+        return added
+
+    def observe(self, player: str, card, void_flags: dict = None) -> tuple:
+        """
+        Updates the pool after a player has played a card
+
+        Args:
+            player (str): Name of the player
+            card (Card | str | int): Card played
+            void_flags (dict): Void flags of the game state once the play
+                is recorded, e.g. GameState.void_flags; the flags already
+                known are kept if not given
+
+        Returns:
+            tuple: (worlds dropped, worlds sampled to replace them)
+        """
+        card_id = bitboard.to_id(card)
+        mask = bitboard.CARD_MASKS[card_id]
+        self.pool &= ~mask
+        if void_flags:
+            self.void_flags.update((name, flags) for name, flags in void_flags.items()
+                                   if name in self.hand_sizes)
+        if player not in self.hand_sizes:
+            # the local player's cards are never in the worlds
+            return [], []
+
+        void_mask = ~ALLOWED_CARDS[self.void_flags.get(player, NO_VOIDS)]
+        kept, dropped = [], []
+        for world in self.worlds:
+            hand = world[player]
+            if hand & mask and not hand & void_mask:
+                world[player] = hand ^ mask
+                kept.append(world)
+            else:
+                dropped.append(world)
+        self.worlds = kept
+        self.hand_sizes[player] -= 1
+        return dropped, self.refill()
+
+    def seat_worlds(self, players: list, limit: int = None) -> list:
+        """
+        Returns the worlds as tuples of the opponents' card masks in the
+        seat order of players
+        """
+        opponents = [name for name in players if name in self.hand_sizes]
+        worlds = self.worlds if limit is None else self.worlds[:limit]
+        return [tuple(world[name] for name in opponents) for world in worlds]
+
+
+def simulate_trick(cards, trump, led) -> np.ndarray:
+    """
+    Resolves a batch of tricks at once
+
+    Follows the same rules as Table.verify_winner: the highest trump wins,
+    otherwise the highest card of the led suit
+
+    Args:
+        cards (array): Card ids of shape (N, players), one trick per row
+        trump (array | int): Trump suit index per row, -1 for no trump
+        led (array | int): Led suit index per row
+
+    Returns:
+        np.ndarray: Winning column (seat) of every row
+    """
+
+    cards = np.asarray(cards, dtype=np.int8)
+    suits = cards // RANKS
+    ranks = cards % RANKS
+    trump = np.asarray(trump, dtype=np.int8).reshape(-1, 1)
+    led = np.asarray(led, dtype=np.int8).reshape(-1, 1)
+
+    # trumps outrank the led suit, which outranks every other suit
+    score = np.where(suits == trump, ranks + 2 * RANKS,
+                     np.where(suits == led, ranks + RANKS, -1))
+    return score.argmax(axis=1)
+
+
+# fixed point scale of the world weights in MoveStats
+WEIGHT_SCALE = 1 << 30
+
+# worlds sampled with a fixed seed to find the reference likelihood of a state
+REFERENCE_WORLDS = 64
+
+# largest log of a world weight relative to the reference, so no weight overflows
+MAX_LOG_WEIGHT = 30 * log(2)
+
+
+def deal_hands(rng: np.random.Generator, num_deals: int, seats: int, cards: int,
+               pool: int = bitboard.FULL_MASK) -> np.ndarray:
+    """
+    Returns random deals of cards from the pool to every seat, in the
+    layout simulate_rounds takes
+
+    Args:
+        rng (np.random.Generator): Random generator
+        num_deals (int): Number of deals
+        seats (int): Number of hands in each deal
+        cards (int): Cards in each hand
+        pool (int): Card mask of the cards to deal, the whole deck by default
+
+    Returns:
+        np.ndarray: Boolean array of shape (num_deals, seats, 52)
+    """
+    pool_ids = np.array(bitboard.mask_to_ids(pool))
+    needed = seats * cards
+    if needed > len(pool_ids):
+        raise ValueError("Not enough cards in the pool for every hand")
+
+    # a random permutation of the pool per deal, cut into hands
+    order = rng.random((num_deals, len(pool_ids))).argsort(axis=1)[:, :needed]
+    dealt = pool_ids[order].reshape(num_deals, seats, cards)
+    hands = np.zeros((num_deals, seats, bitboard.NUM_CARDS), dtype=bool)
+    hands[np.arange(num_deals)[:, None, None], np.arange(seats)[None, :, None], dealt] = True
+    return hands
+
+
+def simulate_rounds(hands, trump: int, leader: int = 0, policy=None,
+                    bids=None, rng=None) -> np.ndarray:
+    """
+    Plays out a batch of rounds at once
+
+    Every seat plays with one of the batch policies of opponent_model,
+    greedy by default, so each seat of each trick is a single NumPy step
+    over every round. All hands must hold the same number of cards.
+
+    Args:
+        hands (array): Boolean array of shape (N, seats, 52), one deal per row
+        trump (int): Trump suit index, -1 for no trump
+        leader (int): Seat leading the first trick
+        policy (callable): Batch policy, e.g. opponent_model.bid_aware
+        bids (array): Bid of every seat, shape (seats,) or (N, seats),
+            -1 when unknown; used to work out each seat's need
+        rng (np.random.Generator): Random generator for random policies
+
+    Returns:
+        np.ndarray: Tricks won by each seat, of shape (N, seats)
+    """
+
+    policy = policy or opponent_model.greedy
+    hands = np.array(hands, dtype=bool)
+    num_worlds, num_seats, _ = hands.shape
+    rows = np.arange(num_worlds)
+    num_tricks = int(hands.sum(axis=2).max()) if num_worlds else 0
+
+    # seats with an unknown bid try to win every trick
+    bids = np.broadcast_to(-1 if bids is None else np.asarray(bids),
+                           (num_worlds, num_seats))
+    bids = np.where(bids < 0, num_tricks, bids)
+
+    leaders = np.full(num_worlds, leader)
+    tricks = np.zeros((num_worlds, num_seats), dtype=np.int64)
+    no_suit = np.full(num_worlds, -1)
+
+    for _ in range(num_tricks):
+        seats = leaders
+        cards = policy(hands[rows, seats], no_suit, no_suit, trump,
+                       bids[rows, seats] - tricks[rows, seats], rng)
+        led = CARD_SUITS[cards]
+        hands[rows, seats, cards] = False
+
+        score = opponent_model.card_scores(led, trump)
+        best = score[rows, cards]
+        winners = seats
+
+        for position in range(1, num_seats):
+            seats = (leaders + position) % num_seats
+            cards = policy(hands[rows, seats], led, best, trump,
+                           bids[rows, seats] - tricks[rows, seats], rng)
+            hands[rows, seats, cards] = False
+
+            played = score[rows, cards]
+            won = played > best
+            best = np.where(won, played, best)
+            winners = np.where(won, seats, winners)
+
+        tricks[rows, winners] += 1
+        leaders = winners
+
+    return tricks
+
+
+def simulate_rounds_reference(hands, trump: int, leader: int = 0, policy=None,
+                              bids=None, rng=None) -> np.ndarray:
+    """
+    Plays out the same rounds as simulate_rounds one card at a time with
+    the scalar reference policies, for tests and benchmarks
+    """
+    policy = policy or opponent_model.greedy_reference
+    hands = np.asarray(hands, dtype=bool)
+    num_worlds, num_seats, _ = hands.shape
+    tricks = np.zeros((num_worlds, num_seats), dtype=np.int64)
+
+    for row in range(num_worlds):
+        masks = [bitboard.hand_mask(np.flatnonzero(hand).tolist()) for hand in hands[row]]
+        num_tricks = max(bitboard.count(mask) for mask in masks)
+        row_bids = [-1] * num_seats if bids is None else list(np.broadcast_to(
+            bids, (num_worlds, num_seats))[row])
+        row_bids = [bid if bid >= 0 else num_tricks for bid in row_bids]
+        first = leader
+
+        while masks[first]:
+            trick = []
+            best = -1
+            led = bitboard.NO_SUIT
+            for position in range(num_seats):
+                seat = (first + position) % num_seats
+                need = row_bids[seat] - tricks[row, seat]
+                card = policy(masks[seat], led, best, trump, need, rng=rng)
+                if not trick:
+                    led = bitboard.suit_of(card)
+                    best = -1
+                masks[seat] ^= bitboard.CARD_MASKS[card]
+                trick.append(card)
+                best = max(best, opponent_model._score(card, led, trump))
+            first = (first + bitboard.trick_winner(trick, trump)) % num_seats
+            tricks[row, first] += 1
+
+    return tricks
+
+class MoveStats:
+    """
+    Running statistics for one candidate card over sampled worlds
+
+    Worlds can be weighted by how well they explain the opponents' bids.
+    Weights are fixed point integers scaled by WEIGHT_SCALE, so merged
+    stats do not depend on the order chunks finish in. Should every
+    weight round to 0 the rates fall back to the unweighted counts.
+
+    Attributes:
+        worlds (int): Number of worlds the card was evaluated in
+        wins (int): Worlds where the bid can still be made exactly after
+            the card, see made_bid
+        tricks (int): Sum of the tricks the local player can still win
+        tricks_sq (int): Sum of the squared tricks, for the variance
+        weight (int): Sum of the world weights
+        weight_sq (int): Sum of the squared world weights
+        win_weight (int): Weight of the worlds where the bid can be made exactly
+        trick_weight (int): Weighted sum of the tricks
+        trick_sq_weight (int): Weighted sum of the squared tricks
+        inexact (int): Worlds left out because the card's double dummy
+            solve was cut short by its node budget, which only gives a
+            lower bound on the tricks
+    """
+
+    __slots__ = ("worlds", "wins", "tricks", "tricks_sq", "weight",
+                 "weight_sq", "win_weight", "trick_weight", "trick_sq_weight",
+                 "inexact")
+
+    def __init__(self, worlds: int = 0, wins: int = 0,
+                 tricks: int = 0, tricks_sq: int = 0,
+                 weight: int = 0, weight_sq: int = 0, win_weight: int = 0,
+                 trick_weight: int = 0, trick_sq_weight: int = 0,
+                 inexact: int = 0):
+        self.worlds = worlds
+        self.wins = wins
+        self.tricks = tricks
+        self.tricks_sq = tricks_sq
+        self.weight = weight
+        self.weight_sq = weight_sq
+        self.win_weight = win_weight
+        self.trick_weight = trick_weight
+        self.trick_sq_weight = trick_sq_weight
+        self.inexact = inexact
+
+    def add(self, tricks: int, win: bool, weight: int = None):
+        if weight is None:
+            weight = WEIGHT_SCALE
+        self.worlds += 1
+        self.wins += win
+        self.tricks += tricks
+        self.tricks_sq += tricks * tricks
+        self.weight += weight
+        self.weight_sq += weight * weight
+        self.win_weight += weight * win
+        self.trick_weight += weight * tricks
+        self.trick_sq_weight += weight * tricks * tricks
+
+    def merge(self, other: "MoveStats"):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    @property
+    def win_rate(self) -> float:
+        if not self.weight:
+            return self.wins / self.worlds if self.worlds else 0.0
+        return self.win_weight / self.weight
+
+    @property
+    def mean_tricks(self) -> float:
+        if not self.weight:
+            return self.tricks / self.worlds if self.worlds else 0.0
+        return self.trick_weight / self.weight
+
+    @property
+    def effective_worlds(self) -> float:
+        """Returns the effective sample size of the weighted worlds"""
+        return self.weight * self.weight / self.weight_sq if self.weight_sq else 0.0
+
+    @property
+    def std_tricks(self) -> float:
+        size = self.effective_worlds
+        if size < 2:
+            return 0.0
+        mean = self.mean_tricks
+        variance = self.trick_sq_weight / self.weight - mean * mean
+        return sqrt(max(variance, 0.0) * size / (size - 1))
+
+    def as_tuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, MoveStats) and self.as_tuple() == other.as_tuple()
+
+    def __repr__(self) -> str:
+        return (f"MoveStats(worlds={self.worlds}, win_rate={self.win_rate:.3f}, "
+                f"mean_tricks={self.mean_tricks:.3f}, "
+                f"effective_worlds={self.effective_worlds:.1f})")
+
+
+def compact_state(game_state: GameState, voids: dict = None) -> tuple:
+    """
+    Returns the parts of the game state the simulation needs as a small
+    tuple of ints, cheap to send to worker processes
+
+    Seats are numbered in playing order from the player who led the
+    current trick, and the local player must be the next to play. The
+    opponents' voids are their void flags in the game state and the
+    voids given.
+
+    Returns:
+        tuple: (trump, local seat, trick card ids, local hand mask,
+            unseen mask, hand size, void suits, bid (-1 if unknown) and
+            cards played this round of every other seat, tricks needed
+            to make the bid, reference log likelihood of the bids, see
+            reference_log_likelihood)
+    """
+    players = list(game_state.players)
+    trick = tuple(bitboard.to_id(card) for card in game_state.current_trick)
+    local = game_state.local_player or players[len(trick)]
+    seat = players.index(local)
+    if seat != len(trick):
+        raise ValueError(f"{local} is not the next player to play")
+
+    voids = known_voids(game_state, voids)
+    opponents = tuple(
+        (index, game_state.hand_sizes[name], _allowed_suits(name, voids),
+         game_state.bids.get(name, -1),
+         bitboard.hand_mask(game_state.played_by.get(name, ())))
+        for index, name in enumerate(players) if index != seat
+    )
+
+    bid = game_state.bids.get(local)
+    need = bid - game_state.tricks_won.get(local, 0) if bid is not None else 1
+
+    trump = bitboard.suit_index(game_state.trump)
+    pool = unseen_mask(game_state)
+    return (trump, seat, trick, bitboard.hand_mask(game_state.known_cards),
+            pool, opponents, need, reference_log_likelihood(pool, opponents, trump))
+
+
+def log_likelihoods(worlds: list, opponents: tuple, trump: int) -> np.ndarray:
+    """
+    Returns the log likelihood of the opponents' bids given the hands
+    each world deals them, 0 for every world if no opponent has bid
+
+    Args:
+        worlds (list): Opponent card masks in seat order, one tuple per world
+        opponents (tuple): Opponent entries of compact_state
+        trump (int): Trump suit index
+    """
+    bids = np.array([bid for _, _, _, bid, _ in opponents])
+    if not len(worlds) or not (bids >= 0).any():
+        return np.zeros(len(worlds))
+
+    played = np.array([played for *_, played in opponents], dtype=np.uint64)
+    # the bids were made with the cards already played this round
+    hands = opponent_model.masks_to_array(np.array(worlds, dtype=np.uint64) | played)
+    likelihood = opponent_model.bid_likelihood(bids, hands, trump, len(opponents) + 1)
+    with np.errstate(divide="ignore"):
+        return np.log(likelihood).sum(axis=-1)
+
+
+def reference_log_likelihood(pool: int, opponents: tuple, trump: int) -> float:
+    """
+    Returns the log likelihood world weights are taken relative to
+
+    The likelihood of five or more opponents' bids is often far below
+    1 / WEIGHT_SCALE, so weights are scaled by the best likelihood of
+    REFERENCE_WORLDS worlds sampled with a fixed seed before being
+    rounded to fixed point. The reference only depends on the state, so
+    every worker scales its weights alike.
+    """
+    if not any(bid >= 0 for _, _, _, bid, _ in opponents):
+        return 0.0
+    sampler = _opponents_sampler(pool, opponents)
+    rng = random.Random(0)
+    worlds = []
+    for _ in range(REFERENCE_WORLDS):
+        world = sampler.sample(rng)
+        worlds.append(tuple(world[index] for index, *_ in opponents))
+    best = float(log_likelihoods(worlds, opponents, trump).max())
+    return best if np.isfinite(best) else 0.0
+
+
+def check_weights(totals: dict):
+    """
+    Warns if worlds were solved but every one of their weights rounded
+    to 0, in which case MoveStats falls back to the unweighted counts
+    """
+    if any(stats.worlds for stats in totals.values()) and \
+            not any(stats.weight for stats in totals.values()):
+        warnings.warn("Every world weight rounded to 0, the stats are unweighted",
+                      RuntimeWarning, stacklevel=2)
+
+
+def world_weights(worlds: list, opponents: tuple, trump: int,
+                  reference: float = 0.0, log_corrections: list = None) -> list:
+    """
+    Returns the fixed point weight of each world, the likelihood of the
+    opponents' bids given the hands the world deals them relative to the
+    reference likelihood, times its importance correction if it has one
+
+    Args:
+        worlds (list): Opponent card masks in seat order, one tuple per world
+        opponents (tuple): Opponent entries of compact_state
+        trump (int): Trump suit index
+        reference (float): Log likelihood that weighs WEIGHT_SCALE
+        log_corrections (list): Optional log of the importance correction
+            of each world, see ProposalSampler
+    """
+    log_weights = log_likelihoods(worlds, opponents, trump) - reference
+    if log_corrections is not None:
+        log_weights = log_weights + np.asarray(log_corrections, dtype=float)
+    log_weights = np.minimum(log_weights, MAX_LOG_WEIGHT)
+    return [int(weight) for weight in np.rint(np.exp(log_weights) * WEIGHT_SCALE)]
+
+
+# engines recommend can search with
+ENGINES = ("sampling", "ismcts")
+
+# how often a waiting search checks for cancellation, in seconds
+_POLL_SECONDS = 0.05
+
+# state of each worker process, set once by _init_worker
+_worker = {}
+
+# process pool shared by every search, see _shared_executor
+_executor = None
+_executor_lock = threading.Lock()
+_searches = count()
+
+
+def _opponents_sampler(pool: int, opponents: tuple) -> WorldSampler:
+    """Returns a sampler of the hands of the opponent entries of a compact_state, keyed by seat"""
+    voids = {
+        index: [suit for suit in range(4) if suit not in allowed]
+        for index, _, allowed, _, _ in opponents
+    }
+    return WorldSampler(pool, {index: size for index, size, *_ in opponents}, voids)
+
+
+def _payload_sampler(payload: tuple) -> WorldSampler:
+    """Returns a sampler of the opponents' hands of a compact_state, keyed by seat"""
+    return _opponents_sampler(payload[4], payload[5])
+
+
+def _payload_proposal(payload: tuple, proposal: dict) -> ProposalSampler:
+    """Returns a ProposalSampler of the opponents' hands of a compact_state, keyed by seat"""
+    opponents = payload[5]
+    voids = {
+        index: [suit for suit in range(4) if suit not in allowed]
+        for index, _, allowed, _, _ in opponents
+    }
+    return ProposalSampler(payload[4], {index: size for index, size, *_ in opponents},
+                           voids, proposal)
+
+
+def _init_worker(payload: tuple, max_nodes: int, proposal: dict = None):
+    _worker.update(payload=payload, sampler=_payload_sampler(payload), max_nodes=max_nodes,
+                   proposal=_payload_proposal(payload, proposal) if proposal else None)
+
+
+def _shared_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Returns the process pool shared by every search, started again only
+    if it has fewer than workers processes
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None or _executor._max_workers < workers:
+            if _executor is not None:
+                # searches still running on the old pool finish their chunks
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        return _executor
+
+
+def shutdown_workers():
+    """Stops the worker processes shared by every search"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _pooled_chunk(search: tuple, chunk_seed: int, num_worlds: int,
+                  worlds: tuple = None) -> dict:
+    """
+    Runs _evaluate_chunk in a shared worker, setting the worker up first
+    if its last chunk came from another search
+
+    search is (search_id, payload, max_nodes, proposal).
+    """
+    if _worker.get("search") != search[0]:
+        _init_worker(*search[1:])
+        _worker["search"] = search[0]
+    return _evaluate_chunk(chunk_seed, num_worlds, worlds)
+
+
+def _stopped(deadline: float = None, cancel=None) -> bool:
+    """Returns whether a search should stop, its deadline passed or its cancel event set"""
+    return ((cancel is not None and cancel.is_set())
+            or (deadline is not None and time.monotonic() >= deadline))
+
+
+def _evaluate_chunk(chunk_seed: int, num_worlds: int, worlds: tuple = None) -> dict:
+    """
+    Solves num_worlds sampled worlds, or the given worlds, and returns the
+    stats of every legal card as {card_id: (worlds, wins, tricks, tricks_sq)}
+
+    Given worlds are tuples of the opponents' card masks in seat order.
+    Sampled worlds are drawn from the worker's proposal, if it has one,
+    and weighted by their importance corrections.
+    """
+    payload = _worker["payload"]
+    opponents = payload[5]
+    rng = random.Random(chunk_seed)
+    log_corrections = None
+
+    if worlds is None:
+        proposal = _worker.get("proposal")
+        worlds = []
+        if proposal is not None:
+            log_corrections = []
+            for _ in range(num_worlds):
+                world, log_correction = proposal.sample_log(rng)
+                worlds.append(tuple(world[index] for index, *_ in opponents))
+                log_corrections.append(log_correction)
+        else:
+            sampler = _worker["sampler"]
+            for _ in range(num_worlds):
+                world = sampler.sample(rng)
+                worlds.append(tuple(world[index] for index, *_ in opponents))
+
+    return _solve_worlds(payload, worlds, _worker["max_nodes"], log_corrections)
+
+
+def made_bid(most: dict, remaining: int, need: int, avoided) -> dict:
+    """
+    Returns whether the bid is still reachable from both sides after
+    each card, an optimistic bound on making it exactly
+
+    Nomination only scores a bid made exactly. A card counts as making the
+    bid when the local player can still win need tricks against opponents
+    who try to stop them and can still keep to need tricks against
+    opponents who try to hand them more. The two bounds come from separate
+    solves, so one line of play reaching exactly need is not guaranteed.
+
+    Args:
+        most (dict): Card id to the most tricks the local player can win
+        remaining (int): Tricks left in the round, the current one included
+        need (int): Tricks still needed to make the bid
+        avoided (callable): Returns the card id to the tricks the local
+            player can avoid winning, only called if a card can reach need
+    """
+    if need < 0 or not any(tricks >= need for tricks in most.values()):
+        return dict.fromkeys(most, False)
+    avoided = avoided()
+    return {card: remaining - avoided[card] <= need <= tricks
+            for card, tricks in most.items()}
+
+
+def _solve_worlds(payload: tuple, worlds, max_nodes: int, log_corrections: list = None) -> dict:
+    trump, seat, trick, hand, _, opponents, need, reference = payload
+    weights = world_weights(worlds, opponents, trump, reference, log_corrections)
+    stats = {}
+    for world, weight in zip(worlds, weights):
+        hands = list(world)
+        hands.insert(seat, hand)
+
+        # a fresh solver per world keeps results independent of the chunking
+        solver = DoubleDummySolver(trump, seat, max_nodes=max_nodes)
+        avoider = DoubleDummySolver(trump, seat, max_nodes=max_nodes, avoid=True)
+        outcomes = solver.card_outcomes(hands, 0, trick)
+        made = made_bid(outcomes, hand.bit_count(), need,
+                        lambda: avoider.card_outcomes(hands, 0, trick))
+        # a solve cut short only bounds the tricks, which would bias the
+        # stats low, so such cards are counted apart for this world
+        inexact = solver.inexact | avoider.inexact
+        for card, tricks in outcomes.items():
+            move = stats.setdefault(card, MoveStats())
+            if card in inexact:
+                move.inexact += 1
+            else:
+                move.add(tricks, made[card], weight)
+
+    return {card: move.as_tuple() for card, move in stats.items()}
+
+
+def solve_batch(jobs: list, max_nodes: int = 5000) -> list:
+    """
+    Solves worlds of several positions in one task, so a process pool
+    shared between games is sent one job for many of them
+
+    Args:
+        jobs (list): (payload, worlds) pairs, a compact_state payload and
+            the opponents' card masks in seat order, one tuple per world
+        max_nodes (int): Node budget of each double dummy solve
+
+    Returns:
+        list: Stats of each job as {card_id: MoveStats.as_tuple()}
+    """
+    return [_solve_worlds(payload, worlds, max_nodes) for payload, worlds in jobs]
+
+
+def exact_move_stats(payload: tuple, cache: "endgame.EndgameCache" = None,
+                     deadline: float = None, cancel=None, seed: int = None) -> dict:
+    """
+    Returns the stats of every legal card over every consistent deal, or
+    None when the position is too large to enumerate
+
+    Used once the local hand is down to endgame.ENDGAME_CARDS cards and at
+    most endgame.MAX_DEALS deals fit what is known. Every deal is solved
+    exactly, through a cache of canonical positions, see endgame.load_cache.
+    Deals are solved in a random order, so stopping early at the deadline
+    or on cancel leaves the stats of an unbiased sample of them.
+
+    Args:
+        payload (tuple): Position as returned by compact_state
+        cache (EndgameCache): Cache of solved positions, the one stored at
+            endgame.DEFAULT_PATH if not given
+        deadline (float): Optional time.monotonic() time to stop at
+        cancel (threading.Event): Optional event that stops the search
+        seed (int): Optional seed of the order the deals are solved in
+    """
+    trump, seat, trick, hand, pool, opponents, need, reference = payload
+    if hand.bit_count() > endgame.ENDGAME_CARDS:
+        return None
+    if _payload_sampler(payload).count_deals() > endgame.MAX_DEALS:
+        return None
+
+    cache = cache if cache is not None else endgame.load_cache()
+    seats = [(index, size, allowed) for index, size, allowed, _, _ in opponents]
+    worlds = [tuple(deal[index] for index, *_ in opponents)
+              for deal in endgame.deals(pool, seats)]
+
+    weighted = list(zip(worlds, world_weights(worlds, opponents, trump, reference)))
+    random.Random(seed).shuffle(weighted)
+
+    solver = DoubleDummySolver(trump, seat)
+    avoider = DoubleDummySolver(trump, seat, avoid=True)
+    stats = {}
+    for world, weight in weighted:
+        if _stopped(deadline, cancel):
+            break
+        hands = list(world)
+        hands.insert(seat, hand)
+        outcomes = endgame.card_outcomes(hands, trump, 0, trick, seat, cache, solver)
+        made = made_bid(outcomes, hand.bit_count(), need, lambda: endgame.card_outcomes(
+            hands, trump, 0, trick, seat, cache, avoider, avoid=True))
+        for card, tricks in outcomes.items():
+            stats.setdefault(card, MoveStats()).add(tricks, made[card], weight)
+    return stats
+
+
+def iter_move_stats(game_state: GameState,
+                    num_worlds: int = 1000,
+                    voids: dict = None,
+                    seed: int = None,
+                    workers: int = None,
+                    chunk_size: int = 16,
+                    max_nodes: int = 20000,
+                    deadline: float = None,
+                    cancel=None,
+                    pool: "WorldPool" = None,
+                    proposal: dict = None,
+                    payload: tuple = None):
+    """
+    Yields the merged stats of every legal card each time a chunk of
+    worlds has been solved
+
+    Worlds are split into fixed chunks with their own seeds, so the final
+    stats only depend on the seed and not on the number of workers. Small
+    endgames are solved over every consistent deal instead, see
+    exact_move_stats, and yield their stats once.
+    Stops early, dropping unfinished chunks, once the deadline passes or
+    cancel is set.
+
+    Args:
+        game_state (GameState): Current game state, local player to move
+        num_worlds (int): Number of worlds to sample, None to keep going
+            until stopped
+        voids (dict): Suits each opponent is known to be void in, by name
+        seed (int): Optional seed for reproducible results
+        workers (int): Number of worker processes, defaults to the CPU count.
+            1 runs in the calling process
+        chunk_size (int): Worlds solved by a worker per task
+        max_nodes (int): Node budget of each double dummy solve
+        deadline (float): Optional time.monotonic() time to stop at
+        cancel (threading.Event): Optional event that stops the search
+        pool (WorldPool): Optional pool whose worlds are solved before
+            any new world is sampled
+        proposal (dict): Optional probability of each of the 52 cards
+            being in each opponent's hand, by name, which new worlds are
+            drawn from instead of uniformly, see ProposalSampler
+        payload (tuple): compact_state of game_state and voids, if the
+            caller already has it
+
+    Yields:
+        dict: Card id to its MoveStats so far
+    """
+    if payload is None:
+        payload = compact_state(game_state, voids)
+    if seed is None:
+        seed = random.getrandbits(32)
+    if _stopped(deadline, cancel):
+        return
+    exact = exact_move_stats(payload, deadline=deadline, cancel=cancel, seed=seed)
+    if exact is not None:
+        yield exact
+        return
+    if proposal:
+        players = list(game_state.players)
+        proposal = {index: proposal[players[index]]
+                    for index, *_ in payload[5] if players[index] in proposal}
+
+    pooled = pool.seat_worlds(game_state.players, num_worlds) if pool else []
+    sampled = None if num_worlds is None else num_worlds - len(pooled)
+
+    def chunks():
+        for start in range(0, len(pooled), chunk_size):
+            part = tuple(pooled[start:start + chunk_size])
+            yield (0, len(part), part)
+        index = 0
+        while sampled is None or index * chunk_size < sampled:
+            size = chunk_size
+            if sampled is not None:
+                size = min(chunk_size, sampled - index * chunk_size)
+            yield (seed * 1_000_003 + index, size)
+            index += 1
+
+    def stopped() -> bool:
+        return _stopped(deadline, cancel)
+
+    workers = workers or os.cpu_count() or 1
+    if num_worlds is not None:
+        workers = max(min(workers, -(-num_worlds // chunk_size)), 1)
+
+    totals = {}
+
+    def merge(result: dict) -> dict:
+        for card, values in result.items():
+            totals.setdefault(card, MoveStats()).merge(MoveStats(*values))
+        return totals
+
+    if workers <= 1:
+        _init_worker(payload, max_nodes, proposal)
+        for chunk in chunks():
+            if stopped():
+                return
+            yield merge(_evaluate_chunk(*chunk))
+        return
+
+    # the pool outlives the search, its workers only set the state up
+    # again when the first chunk of a new search reaches them
+    executor = _shared_executor(workers)
+    search = (next(_searches), payload, max_nodes, proposal)
+    pending = set()
+    try:
+        chunk_iter = chunks()
+        for chunk in islice(chunk_iter, 2 * workers):
+            pending.add(executor.submit(_pooled_chunk, search, *chunk))
+
+        while pending and not stopped():
+            timeout = _POLL_SECONDS
+            if deadline is not None:
+                timeout = min(timeout, max(deadline - time.monotonic(), 0))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield merge(future.result())
+                for chunk in islice(chunk_iter, 1):
+                    pending.add(executor.submit(_pooled_chunk, search, *chunk))
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def evaluate_move(card=None,
+                  game_state: GameState = None,
+                  num_worlds: int = 1000,
+                  voids: dict = None,
+                  seed: int = None,
+                  workers: int = None,
+                  max_nodes: int = 20000,
+                  pool: "WorldPool" = None):
+    """
+    Evaluates candidate cards for the local player over sampled worlds
+
+    Each world is a deal of the unseen cards to the opponents, solved
+    with the double dummy solver for every legal card. Worlds are spread
+    over a process pool sized to the machine. Once the hands are down to
+    endgame.ENDGAME_CARDS cards and few deals fit, every deal is solved
+    exactly instead of sampling num_worlds of them.
+
+    Args:
+        card (Card | str | int): Card to evaluate, None for every legal card
+        game_state (GameState): Current game state, local player to move
+        num_worlds (int): Number of worlds to sample
+        voids (dict): Suits each opponent is known to be void in, by name
+        seed (int): Optional seed, results are the same for any worker count
+        workers (int): Number of worker processes, defaults to the CPU count
+        max_nodes (int): Node budget of each double dummy solve
+        pool (WorldPool): Optional pool of worlds kept across the round,
+            topped up with new worlds up to num_worlds
+
+    Returns:
+        MoveStats | dict: Stats of the card, or card initials to the stats
+            of every legal card
+    """
+    totals = {}
+    for totals in iter_move_stats(game_state, num_worlds, voids, seed,
+                                  workers, max_nodes=max_nodes, pool=pool):
+        pass
+
+    check_weights(totals)
+    if card is None:
+        return {bitboard.id_to_initials(card_id): stats
+                for card_id, stats in sorted(totals.items())}
+
+    card_id = bitboard.to_id(card)
+    if card_id not in totals:
+        raise ValueError(f"{bitboard.id_to_initials(card_id)} is not a legal move")
+    return totals[card_id]
+
+
+class ISMCTS:
+    """
+    Single observer information set Monte Carlo tree search
+
+    Sampling worlds and solving each one double dummy lets every world
+    pick its own best line, which overrates cards that only work when the
+    hidden cards are known (strategy fusion). Here a single tree is shared
+    by every world: each iteration deals one world, walks the tree using
+    only the moves legal in that world, picking children by UCB on their
+    availability, adds one node and plays the rest of the round out at
+    random. Opponents play to stop the local player making their bid, as
+    in the double dummy solver.
+
+    Node statistics are kept in flat lists indexed by node number and the
+    children in a single dict keyed by node * 52 + card id, so the tree
+    costs a few list slots per node rather than an object. Call advance()
+    with every card played to the table and the next search of the round
+    starts from the subtree already built for the new position.
+
+    Attributes:
+        exploration (float): UCB exploration constant
+        max_nodes (int): Tree size past which no new node is added
+        policy (callable): Optional opponent_model reference policy used
+            for the playouts instead of random cards
+        iterations (int): Iterations run since the tree was last cleared
+    """
+
+    # worlds dealt at a time, then resampled by the likelihood of the bids
+    BATCH = 64
+
+    def __init__(self, exploration: float = 0.7, max_nodes: int = 500_000,
+                 policy=None, seed: int = None):
+        self.exploration = exploration
+        self.max_nodes = max_nodes
+        self.policy = policy
+        self.rng = random.Random(seed)
+        self.clear()
+
+    def clear(self):
+        """Drops the tree, node 0 is the new root"""
+        self.visits = [0]
+        self.available = [0]
+        self.wins = [0]
+        self.tricks = [0]
+        self.tricks_sq = [0]
+        self.children = {}
+        self.root = 0
+        self.root_key = None
+        self.num_seats = 0
+        self.origin_tricks = 0
+        self.iterations = 0
+
+    def advance(self, card):
+        """
+        Moves the root to the node reached by a card played to the table,
+        or drops the tree if the search never tried that card
+        """
+        if self.root_key is None:
+            return
+        card = bitboard.to_id(card)
+        trick, cards = self.root_key
+        child = self.children.get(self.root * bitboard.NUM_CARDS + card)
+        if child is None or not cards & bitboard.CARD_MASKS[card]:
+            self.clear()
+            return
+        trick += (card,)
+        if len(trick) == self.num_seats:
+            trick = ()
+        self.root = child
+        self.root_key = (trick, cards ^ bitboard.CARD_MASKS[card])
+
+    def search(self, game_state: GameState,
+               iterations: int = None,
+               deadline: float = None,
+               cancel=None,
+               voids: dict = None,
+               payload: tuple = None) -> dict:
+        """
+        Runs iterations from the current position and returns the stats
+        of every card of the local player searched so far
+
+        Args:
+            game_state (GameState): Current game state, local player to move
+            iterations (int): Number of iterations, None to run until stopped
+            deadline (float): Optional time.monotonic() time to stop at
+            cancel (threading.Event): Optional event that stops the search
+            voids (dict): Suits each opponent is known to be void in, by name
+            payload (tuple): compact_state of game_state and voids, if the
+                caller already has it
+
+        Returns:
+            dict: Card id to its MoveStats, counting one world per visit
+        """
+        if payload is None:
+            payload = compact_state(game_state, voids)
+        trump, seat, trick, hand, pool, opponents, need, reference = payload
+        local_tricks = game_state.tricks_won.get(
+            game_state.local_player or game_state.players[seat], 0)
+
+        key = (trick, hand | pool)
+        if key != self.root_key:
+            self.clear()
+            self.root_key = key
+            self.num_seats = len(opponents) + 1
+            self.origin_tricks = local_tricks
+        # tricks are counted from the position the tree was started at
+        base = local_tricks - self.origin_tricks
+
+        worlds = self._worlds(_payload_sampler(payload), opponents, trump, reference)
+        count = 0
+        while iterations is None or count < iterations:
+            if not count % 16 and (
+                    (cancel is not None and cancel.is_set())
+                    or (deadline is not None and time.monotonic() >= deadline)):
+                break
+            hands = list(next(worlds))
+            hands.insert(seat, hand)
+            self._iterate(hands, trick, seat, trump, need, base)
+            count += 1
+        self.iterations += count
+        return self.move_stats(base)
+
+    def move_stats(self, base: int = 0) -> dict:
+        """
+        Returns the MoveStats of every child of the root, with tricks
+        counted from the root rather than from where the tree was started
+        """
+        stats = {}
+        offset = self.root * bitboard.NUM_CARDS
+        for card in range(bitboard.NUM_CARDS):
+            child = self.children.get(offset + card)
+            if child is None:
+                continue
+            visits, wins = self.visits[child], self.wins[child]
+            tricks = self.tricks[child] - base * visits
+            tricks_sq = self.tricks_sq[child] - 2 * base * self.tricks[child] \
+                + base * base * visits
+            stats[card] = MoveStats(visits, wins, tricks, tricks_sq,
+                                    visits * WEIGHT_SCALE,
+                                    visits * WEIGHT_SCALE * WEIGHT_SCALE,
+                                    wins * WEIGHT_SCALE, tricks * WEIGHT_SCALE,
+                                    tricks_sq * WEIGHT_SCALE)
+        return stats
+
+    def _worlds(self, sampler: WorldSampler, opponents: tuple, trump: int,
+                reference: float = 0.0):
+        """Yields opponent hands in seat order, drawn in proportion to their weight"""
+        rng = self.rng
+        while True:
+            batch = []
+            for _ in range(self.BATCH):
+                world = sampler.sample(rng)
+                batch.append(tuple(world[index] for index, *_ in opponents))
+            weights = world_weights(batch, opponents, trump, reference)
+            if any(weights):
+                batch = rng.choices(batch, weights=weights, k=len(batch))
+            yield from batch
+
+    def _iterate(self, hands: list, trick: tuple, seat: int, trump: int,
+                 need: int, base: int):
+        """Plays one world out from the root and backs the result up the tree"""
+        rng = self.rng
+        children = self.children
+        visits, available, wins = self.visits, self.available, self.wins
+        exploration = self.exploration
+        policy = self.policy
+        num_cards = bitboard.NUM_CARDS
+        card_masks = bitboard.CARD_MASKS
+        num_seats = len(hands)
+
+        node = self.root
+        path = [node]
+        grow = len(visits) < self.max_nodes
+        trick = list(trick)
+        leader = 0
+        tricks = 0
+        best = -1
+        if trick and policy is not None:
+            best = max(opponent_model._score(card, trick[0] // RANKS, trump)
+                       for card in trick)
+
+        for _ in range(sum(hand.bit_count() for hand in hands)):
+            mover = (leader + len(trick)) % num_seats
+            hand = hands[mover]
+            led = trick[0] // RANKS if trick else bitboard.NO_SUIT
+            moves = bitboard.legal_moves(hand, led, trump)
+
+            if node >= 0:
+                # selection among the children available in this world
+                offset = node * num_cards
+                untried = []
+                choice = choice_card = -1
+                choice_value = -1.0
+                mask = moves
+                while mask:
+                    low = mask & -mask
+                    mask ^= low
+                    card = low.bit_length() - 1
+                    child = children.get(offset + card)
+                    if child is None:
+                        untried.append(card)
+                        continue
+                    available[child] += 1
+                    value = wins[child] / visits[child]
+                    if mover != seat:
+                        value = 1.0 - value
+                    value += exploration * sqrt(log(available[child]) / visits[child])
+                    if value > choice_value:
+                        choice, choice_card, choice_value = child, card, value
+
+                if untried and grow:
+                    card = untried[rng.randrange(len(untried))]
+                    node = len(visits)
+                    children[offset + card] = node
+                    visits.append(0)
+                    available.append(1)
+                    wins.append(0)
+                    self.tricks.append(0)
+                    self.tricks_sq.append(0)
+                    path.append(node)
+                    # the rest of the world is played out
+                    node = -1
+                elif choice >= 0:
+                    node, card = choice, choice_card
+                    path.append(node)
+                else:
+                    # the tree is full and this world has no searched move
+                    node = -1
+                    card = untried[rng.randrange(len(untried))]
+            elif policy is None:
+                ids = bitboard.mask_to_ids(moves)
+                card = ids[rng.randrange(len(ids))]
+            else:
+                card = policy(hand, led, best, trump)
+
+            hands[mover] = hand ^ card_masks[card]
+            trick.append(card)
+            if policy is not None:
+                best = max(best, opponent_model._score(card, trick[0] // RANKS, trump))
+            if len(trick) == num_seats:
+                leader = (leader + bitboard.trick_winner(trick, trump)) % num_seats
+                tricks += leader == seat
+                trick = []
+                best = -1
+
+        # only a bid made exactly scores
+        win = tricks == need
+        tricks += base
+        for node in path:
+            visits[node] += 1
+            wins[node] += win
+            self.tricks[node] += tricks
+            self.tricks_sq[node] += tricks * tricks
+
+
+class Recommendation:
+    """
+    Best card found by recommend and the stats behind it
+
+    Attributes:
+        card (str): Initials of the recommended card
+        stats (dict): Card initials to MoveStats of every legal card
+        worlds (int): Number of worlds evaluated
+        elapsed_ms (float): Wall-clock time spent
+        cancelled (bool): True if the search was cancelled by the caller
+        effective_worlds (float): Effective sample size of the weighted worlds
+        inexact_worlds (int): Worlds left out of the card's stats because
+            their solve was cut short by the node budget
+    """
+
+    def __init__(self, card: str, stats: dict, worlds: int,
+                 elapsed_ms: float, cancelled: bool):
+        self.card = card
+        self.stats = stats
+        self.worlds = worlds
+        self.elapsed_ms = elapsed_ms
+        self.cancelled = cancelled
+        self.effective_worlds = stats[card].effective_worlds if stats else 0.0
+        self.inexact_worlds = stats[card].inexact if stats else 0
+
+    def win_interval(self, card: str = None, z: float = 1.96) -> tuple:
+        """Returns the Wilson interval of the win rate of a card"""
+        return wilson_interval(self.stats[card or self.card], z)
+
+    def tricks_interval(self, card: str = None, z: float = 1.96) -> tuple:
+        """Returns the normal interval of the mean tricks of a card"""
+        stats = self.stats[card or self.card]
+        if not stats.worlds:
+            return (0.0, float(RANKS))
+        margin = z * stats.std_tricks / sqrt(max(stats.effective_worlds, 1))
+        return (stats.mean_tricks - margin, stats.mean_tricks + margin)
+
+    def __repr__(self) -> str:
+        low, high = self.win_interval()
+        return (f"Recommendation({self.card}, win {low:.2f}-{high:.2f}, "
+                f"worlds={self.worlds}, inexact={self.inexact_worlds}, "
+                f"{self.elapsed_ms:.0f} ms)")
+
+
+def wilson_interval(stats: MoveStats, z: float = 1.96) -> tuple:
+    """
+    Returns the Wilson score interval of the win rate in stats, using the
+    effective sample size of the weighted worlds
+    """
+    if not stats.weight:
+        return (0.0, 1.0)
+    return proportion_interval(stats.win_rate, stats.effective_worlds, z)
+
+
+def proportion_interval(p: float, n: float, z: float = 1.96) -> tuple:
+    """Returns the Wilson score interval of a proportion p observed over n samples"""
+    if not n:
+        return (0.0, 1.0)
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    margin = z * sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return (max(centre - margin, 0.0), min(centre + margin, 1.0))
+
+
+def best_card(totals: dict, need: int) -> int:
+    """
+    Returns the card id with the highest win rate, ties going to the card
+    whose mean tricks come closest to the tricks still needed
+    """
+    return max(totals, key=lambda card: (totals[card].win_rate,
+                                         -abs(totals[card].mean_tricks - need)))
+
+
+def recommend(game_state: GameState,
+              budget_ms: float = 1000,
+              cancel=None,
+              voids: dict = None,
+              seed: int = None,
+              workers: int = 1,
+              max_nodes: int = 5000,
+              pool: "WorldPool" = None,
+              engine: str = "sampling",
+              tree: ISMCTS = None,
+              proposal: dict = None) -> Recommendation:
+    """
+    Returns the best card found within a wall-clock budget
+
+    The sampling engine keeps sampling and solving worlds until the budget
+    runs out or cancel is set, then picks the card with the highest win
+    rate, breaking ties on how close its mean tricks come to the bid. The
+    overrun past the budget is at most one solve, which max_nodes bounds.
+    The ismcts engine grows a search tree for the same time and picks its
+    most visited card.
+
+    Args:
+        game_state (GameState): Current game state, local player to move
+        budget_ms (float): Time budget in milliseconds
+        cancel (threading.Event): Optional event to stop the search early
+        voids (dict): Suits each opponent is known to be void in, by name
+        seed (int): Optional seed for the sampled worlds
+        workers (int): Number of worker processes, 1 runs in this process
+        max_nodes (int): Node budget of each double dummy solve
+        pool (WorldPool): Optional pool of worlds kept across the round,
+            solved before any new world is sampled
+        engine (str): One of ENGINES
+        tree (ISMCTS): Optional tree kept across the round by the ismcts
+            engine, a new one is used if not given
+        proposal (dict): Optional probability of each card being in each
+            opponent's hand, by name, new worlds are sampled from by the
+            sampling engine, e.g. from InferenceTracker.proposal()
+
+    Returns:
+        Recommendation: Best card with the stats of every legal card
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    start = time.monotonic()
+    deadline = start + budget_ms / 1000
+
+    # sampled once, the reference worlds are shared with the search
+    payload = compact_state(game_state, voids)
+    trump, seat, trick, hand, _, _, need, _ = payload
+    led = bitboard.suit_of(trick[0]) if trick else bitboard.NO_SUIT
+    totals = {card: MoveStats()
+              for card in bitboard.mask_to_ids(bitboard.legal_moves(hand, led, trump))}
+
+    if engine == "ismcts":
+        tree = tree if tree is not None else ISMCTS(seed=seed)
+        totals.update(tree.search(game_state, deadline=deadline, cancel=cancel,
+                                  voids=voids, payload=payload))
+        best = max(totals, key=lambda card: (totals[card].worlds, totals[card].win_rate))
+    else:
+        for totals_so_far in iter_move_stats(game_state, None, voids, seed, workers,
+                                             chunk_size=1, max_nodes=max_nodes,
+                                             deadline=deadline, cancel=cancel,
+                                             pool=pool, proposal=proposal,
+                                             payload=payload):
+            totals.update(totals_so_far)
+        check_weights(totals)
+        best = best_card(totals, need)
+
+    return Recommendation(
+        card=bitboard.id_to_initials(best),
+        stats={bitboard.id_to_initials(card): stats for card, stats in sorted(totals.items())},
+        worlds=totals[best].worlds,
+        elapsed_ms=(time.monotonic() - start) * 1000,
+        cancelled=cancel is not None and cancel.is_set())
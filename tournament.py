@@ -0,0 +1,337 @@
+# Contents of the tournament runner which plays agent policies against each other
+#
+# Run a tournament from the command line with:
+#     python tournament.py random greedy bid_aware advisor:budget_ms=20 --deals 10000
+
+import argparse
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from math import sqrt
+import numpy as np
+import probability_engine as pe
+from Classes.HeadlessGame import (HeadlessGame, BitboardGame, RandomAgent, GreedyAgent,
+                                  BidAwareAgent, AdvisorAgent)
+
+POLICIES = {
+    "random": RandomAgent,
+    "greedy": GreedyAgent,
+    "bid_aware": BidAwareAgent,
+    "advisor": AdvisorAgent,
+}
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tournament_results")
+
+# one row per player per game
+RESULT_DTYPE = np.dtype([
+    ("deal", "<u8"),
+    ("rotation", "u1"),
+    ("seat", "u1"),
+    ("policy", "u1"),
+    ("score", "<i2"),
+    ("hits", "u1"),
+    ("rounds", "u1"),
+])
+
+# deals played by a worker before its results are sent back
+CHUNK_DEALS = 16
+
+
+def parse_policy(spec: str) -> tuple:
+    """
+    Returns the agent class and keyword arguments of a policy given as
+    name[:key=value,...], e.g. "advisor:engine=ismcts,budget_ms=20"
+    """
+    name, _, options = spec.partition(":")
+    if name not in POLICIES:
+        raise ValueError(f"Unknown policy: {name}, expected one of {', '.join(POLICIES)}")
+    kwargs = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        for cast in (int, float):
+            try:
+                value = cast(value)
+                break
+            except ValueError:
+                pass
+        kwargs[key] = value
+    return POLICIES[name], kwargs
+
+
+def distinct_policies(policies: list[str]) -> list[str]:
+    """Returns the distinct policy specs of a lineup, in order of first appearance"""
+    return list(dict.fromkeys(policies))
+
+
+def mix_seed(*parts: int) -> int:
+    """
+    Returns a 64 bit seed hashed from the parts, so seeds made from
+    different parts are independent rather than offsets of each other
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def seating(num_policies: int, rotation: int) -> list[int]:
+    """Returns the policy index of every seat in a rotation of the lineup"""
+    return [(seat + rotation) % num_policies for seat in range(num_policies)]
+
+
+def play_deals(policies: list[str], deals: range, seed: int = 0,
+               cards_per_round: list[int] = None) -> np.ndarray:
+    """
+    Plays every rotation of the lineup on each deal and returns one row of
+    RESULT_DTYPE for every player of every game
+
+    Every rotation of a deal shares the game seed, so the same cards are
+    dealt whichever policy sits in a seat, and differences in score come
+    from the policies rather than the cards.
+
+    Lineups whose agents all have bitboard methods play a BitboardGame,
+    which scores the same as a HeadlessGame many times faster.
+
+    The policy column indexes the distinct specs of the lineup, in order
+    of first appearance, so a policy may sit in several seats.
+
+    Args:
+        policies (list[str]): Policy of every seat in the lineup, see parse_policy
+        deals (range): Deal numbers to play
+        seed (int): Tournament seed
+        cards_per_round (list[int]): Round sizes, the game's if not given
+    """
+    parsed = [parse_policy(spec) for spec in policies]
+    distinct = distinct_policies(policies)
+    num_seats = len(parsed)
+    game_class = BitboardGame if all(agent.bitboard for agent, _ in parsed) else HeadlessGame
+    rows = np.zeros(len(deals) * num_seats * num_seats, dtype=RESULT_DTYPE)
+
+    row = 0
+    for deal in deals:
+        deal_seed = mix_seed(seed, deal)
+        for rotation in range(num_seats):
+            lineup = seating(num_seats, rotation)
+            agents = [parsed[policy][0](mix_seed(seed, deal, seat), **parsed[policy][1])
+                      for seat, policy in enumerate(lineup)]
+            names = [f"Seat {seat}" for seat in range(num_seats)]
+            game = game_class(agents, names, seed=deal_seed, cards_per_round=cards_per_round)
+            scores = game.play()
+            # the player queue turns between rounds, so results are read by name
+            for seat, name in enumerate(names):
+                policy = distinct.index(policies[lineup[seat]])
+                rows[row] = (deal, rotation, seat, policy, scores[name],
+                             game.hits[name], len(game.cards_per_round))
+                row += 1
+    return rows
+
+
+class ColumnWriter:
+    """
+    Appends rows to a columnar results directory, one raw file per column
+    and a schema.json describing them, so results can be streamed while a
+    tournament runs and each column read back on its own
+
+    Attributes:
+        path (str): Directory of the column files
+        dtype (np.dtype): Structured dtype of the rows
+        rows (int): Rows written so far
+    """
+
+    def __init__(self, path: str, dtype: np.dtype = RESULT_DTYPE, metadata: dict = None):
+        self.path = path
+        self.dtype = dtype
+        self.rows = 0
+        os.makedirs(path, exist_ok=True)
+        schema = {
+            "columns": {name: dtype[name].str for name in dtype.names},
+            "metadata": metadata or {},
+        }
+        with open(os.path.join(path, "schema.json"), "w") as file:
+            json.dump(schema, file, indent=2)
+        self.files = {name: open(os.path.join(path, f"{name}.bin"), "wb")
+                      for name in dtype.names}
+
+    def write(self, rows: np.ndarray):
+        for name, file in self.files.items():
+            file.write(np.ascontiguousarray(rows[name]).tobytes())
+        self.rows += len(rows)
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+    def __enter__(self) -> "ColumnWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_columns(path: str, columns: list[str] = None) -> tuple:
+    """
+    Returns the memory-mapped columns of a results directory and its metadata
+
+    Args:
+        path (str): Directory written by ColumnWriter
+        columns (list[str]): Columns to read, every column if not given
+
+    Returns:
+        tuple: (dict of column name to array, metadata dict)
+    """
+    with open(os.path.join(path, "schema.json")) as file:
+        schema = json.load(file)
+    data = {}
+    for name in columns or schema["columns"]:
+        file_path = os.path.join(path, f"{name}.bin")
+        dtype = np.dtype(schema["columns"][name])
+        if os.path.getsize(file_path):
+            data[name] = np.memmap(file_path, dtype=dtype, mode="r")
+        else:
+            data[name] = np.zeros(0, dtype=dtype)
+    return data, schema["metadata"]
+
+
+class PolicyStats:
+    """
+    Aggregated results of one policy over a tournament
+
+    Attributes:
+        policy (str): Policy spec
+        games (int): Games played
+        mean_score (float): Mean game score
+        score_interval (tuple): Confidence interval of the mean score
+        duplicate_score (float): Mean score above the average of the other
+            games on the same deal
+        duplicate_interval (tuple): Confidence interval of the duplicate score
+        hit_rate (float): Share of rounds in which the bid was made
+        hit_interval (tuple): Wilson interval of the hit rate
+    """
+
+    def __init__(self, policy: str, scores: np.ndarray, duplicate: np.ndarray,
+                 hits: int, rounds: int, z: float = 1.96):
+        self.policy = policy
+        self.games = len(scores)
+        self.mean_score, self.score_interval = _mean_interval(scores, z)
+        self.duplicate_score, self.duplicate_interval = _mean_interval(duplicate, z)
+        self.hit_rate = hits / rounds if rounds else 0.0
+        self.hit_interval = pe.proportion_interval(self.hit_rate, rounds, z)
+
+    def __repr__(self) -> str:
+        return (f"PolicyStats(policy={self.policy!r}, games={self.games}, "
+                f"mean_score={self.mean_score:.2f}, hit_rate={self.hit_rate:.3f})")
+
+
+def _mean_interval(values: np.ndarray, z: float) -> tuple:
+    if not len(values):
+        return 0.0, (0.0, 0.0)
+    mean = float(values.mean())
+    margin = z * float(values.std(ddof=1)) / sqrt(len(values)) if len(values) > 1 else 0.0
+    return mean, (mean - margin, mean + margin)
+
+
+def summarise(columns: dict, policies: list[str], z: float = 1.96) -> list[PolicyStats]:
+    """
+    Returns the stats of every policy from the result columns
+
+    The duplicate score compares each game with the average of every game
+    on the same deal, which removes most of the luck of the cards.
+    """
+    deal = np.asarray(columns["deal"])
+    score = np.asarray(columns["score"], dtype=float)
+    policy = np.asarray(columns["policy"])
+
+    _, deal_index = np.unique(deal, return_inverse=True)
+    deal_means = (np.bincount(deal_index, weights=score)
+                  / np.bincount(deal_index))
+    duplicate = score - deal_means[deal_index]
+
+    stats = []
+    for index, spec in enumerate(distinct_policies(policies)):
+        rows = policy == index
+        stats.append(PolicyStats(spec, score[rows], duplicate[rows],
+                                 int(np.asarray(columns["hits"])[rows].sum()),
+                                 int(np.asarray(columns["rounds"])[rows].sum()), z))
+    return stats
+
+
+def run_tournament(policies: list[str], num_deals: int, seed: int = 0,
+                   workers: int = None, output: str = DEFAULT_OUTPUT,
+                   cards_per_round: list[int] = None) -> list[PolicyStats]:
+    """
+    Plays num_deals duplicate deals between the policies, streaming every
+    result to a columnar directory, and returns the stats of each policy
+
+    Deals are played in chunks by worker processes. Chunks are collected
+    in order, so the output is the same for any number of workers.
+
+    Args:
+        policies (list[str]): Policy of every seat in the lineup, see parse_policy
+        num_deals (int): Number of deals, each played in every rotation
+        seed (int): Tournament seed
+        workers (int): Worker processes, every core if not given, 1 runs
+            in this process
+        output (str): Directory of the result columns
+        cards_per_round (list[int]): Round sizes, the game's if not given
+    """
+    for spec in policies:
+        parse_policy(spec)
+    workers = workers or os.cpu_count() or 1
+    chunks = (range(start, min(start + CHUNK_DEALS, num_deals))
+              for start in range(0, num_deals, CHUNK_DEALS))
+    metadata = {"policies": policies, "seed": seed, "deals": num_deals,
+                "cards_per_round": cards_per_round}
+
+    with ColumnWriter(output, metadata=metadata) as writer:
+        if workers == 1:
+            for chunk in chunks:
+                writer.write(play_deals(policies, chunk, seed, cards_per_round))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # a bounded window of chunks in flight keeps memory flat
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(
+                        play_deals, policies, chunk, seed, cards_per_round))
+                    if len(pending) >= 2 * workers:
+                        writer.write(pending.popleft().result())
+                while pending:
+                    writer.write(pending.popleft().result())
+
+    columns, _ = read_columns(output)
+    return summarise(columns, policies)
+
+
+def format_report(stats: list[PolicyStats]) -> str:
+    lines = [f"{'policy':<32}{'games':>8}{'score':>18}{'duplicate':>20}{'bid hit rate':>22}"]
+    for policy in stats:
+        low, high = policy.score_interval
+        dup_low, dup_high = policy.duplicate_interval
+        hit_low, hit_high = policy.hit_interval
+        lines.append(
+            f"{policy.policy:<32}{policy.games:>8}"
+            f"{policy.mean_score:>8.2f} [{low:.2f}, {high:.2f}]"
+            f"{policy.duplicate_score:>+8.2f} [{dup_low:+.2f}, {dup_high:+.2f}]"
+            f"{policy.hit_rate:>8.1%} [{hit_low:.1%}, {hit_high:.1%}]")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play agent policies against each other")
+    parser.add_argument("policies", nargs="+",
+                        help="policy of every seat, name[:key=value,...] with name in "
+                             + ", ".join(POLICIES))
+    parser.add_argument("--deals", type=int, default=1000,
+                        help="deals, each played once in every seat rotation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes, every core by default")
+    parser.add_argument("--rounds", type=int, nargs="+", default=None,
+                        help="cards in each round, the game's rounds by default")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    arguments = parser.parse_args()
+
+    results = run_tournament(arguments.policies, arguments.deals, arguments.seed,
+                             arguments.workers, arguments.output, arguments.rounds)
+    print(format_report(results))
+    print(f"Results saved to {arguments.output}")